@@ -0,0 +1,33 @@
+"""Add LLM token usage columns to audit_log
+
+Revision ID: d4e1c9a7b3f2
+Revises: b72a8f3a5c10
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e1c9a7b3f2"
+down_revision: Union[str, None] = "b72a8f3a5c10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_log", sa.Column("llm_prompt_tokens", sa.Integer(), nullable=True))
+    op.add_column("audit_log", sa.Column("llm_completion_tokens", sa.Integer(), nullable=True))
+    op.add_column("audit_log", sa.Column("llm_prompt_eval_ms", sa.Integer(), nullable=True))
+    op.add_column("audit_log", sa.Column("llm_eval_ms", sa.Integer(), nullable=True))
+    op.add_column("audit_log", sa.Column("llm_load_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_log", "llm_load_ms")
+    op.drop_column("audit_log", "llm_eval_ms")
+    op.drop_column("audit_log", "llm_prompt_eval_ms")
+    op.drop_column("audit_log", "llm_completion_tokens")
+    op.drop_column("audit_log", "llm_prompt_tokens")
@@ -0,0 +1,25 @@
+"""Add pipeline stage timings to audit_log
+
+Revision ID: e7b2d5f8a1c4
+Revises: d4e1c9a7b3f2
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b2d5f8a1c4"
+down_revision: Union[str, None] = "d4e1c9a7b3f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_log", sa.Column("stage_timings_ms", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_log", "stage_timings_ms")
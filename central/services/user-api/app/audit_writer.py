@@ -0,0 +1,152 @@
+"""
+Asynchronous, batched audit log writer
+
+Intent requests hand their audit row to a bounded in-memory queue and
+return at once. A background task inserts the queued rows in bulk (one
+multi-row INSERT per batch) when AUDIT_BATCH_SIZE rows are waiting or
+every AUDIT_FLUSH_INTERVAL_SECONDS, and drains the queue on shutdown, so
+Postgres latency (or an outage) never reaches the voice path. Rows that
+do not fit the queue or keep failing to insert are dropped and counted.
+"""
+
+import asyncio
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Optional
+
+import structlog
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import AuditLog
+from app.prometheus_metrics import (
+    record_audit_dropped,
+    record_audit_queue_depth,
+    record_audit_written,
+)
+
+logger = structlog.get_logger()
+
+# Failed inserts of the same batch before it is dropped (e.g. a row Postgres rejects)
+MAX_WRITE_ATTEMPTS = 3
+
+
+class AuditWriter:
+    """Bounded audit row queue with a background bulk writer"""
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._failed_attempts = 0
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """
+        Queue one audit row; never blocks
+
+        Args:
+            row: AuditLog column values
+        """
+        if len(self._queue) >= self.max_size:
+            record_audit_dropped("queue_full")
+            logger.warning(
+                "audit_record_dropped", reason="queue_full", request_id=row.get("request_id")
+            )
+            return
+        self._queue.append(row)
+        record_audit_queue_depth(len(self._queue))
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Start the background writer"""
+        if self._task is not None:
+            return
+        # Created here so they bind to the running loop
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Write what is still queued (within AUDIT_SHUTDOWN_TIMEOUT_SECONDS) and stop"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=settings.audit_shutdown_timeout_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._task = None
+        if self._queue:
+            logger.error("audit_records_lost_on_shutdown", rows=len(self._queue))
+            record_audit_dropped("shutdown", len(self._queue))
+            self._queue.clear()
+            record_audit_queue_depth(0)
+
+    async def flush(self) -> None:
+        """Insert all queued rows, one batch per round trip"""
+        async with self._flush_lock:
+            while self._queue:
+                batch = list(islice(self._queue, self.batch_size))
+                start_time = time.perf_counter()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(insert(AuditLog), batch)
+                        await db.commit()
+                except Exception as e:
+                    self._failed_attempts += 1
+                    logger.error(
+                        "audit_flush_failed",
+                        rows=len(batch),
+                        attempt=self._failed_attempts,
+                        error=str(e),
+                    )
+                    if self._failed_attempts < MAX_WRITE_ATTEMPTS:
+                        # Rows stay queued for the next flush
+                        return
+                    record_audit_dropped("write_failed", len(batch))
+                else:
+                    record_audit_written(len(batch), time.perf_counter() - start_time)
+                # Rows are removed only now: new ones are appended meanwhile
+                for _ in batch:
+                    self._queue.popleft()
+                self._failed_attempts = 0
+                record_audit_queue_depth(len(self._queue))
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("audit_writer_error", error=str(e))
+            if self._failed_attempts and not self._closing:
+                # Back off for a full interval: a full queue must not turn into a retry storm
+                await asyncio.sleep(self.flush_interval)
+        # Shutdown: one last attempt for rows that were kept after a failure
+        if self._queue and self._failed_attempts:
+            await self.flush()
+
+
+audit_writer = AuditWriter(
+    max_size=settings.audit_queue_max_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+)
@@ -0,0 +1,142 @@
+"""
+Circuit breaker for external services
+"""
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Tuple, Type
+
+import structlog
+
+from app.constants import CircuitState
+from app.exceptions import CircuitOpenError
+from app.prometheus_metrics import record_circuit_transition
+
+logger = structlog.get_logger()
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service and fail fast instead
+
+    Closed: calls go through; failures within the sliding window are
+    counted. Once ``failure_threshold`` failures fall inside
+    ``window_seconds``, the breaker opens. Open: calls fail immediately
+    with CircuitOpenError for ``open_seconds``. Half-open: a single probe
+    call is let through; its success closes the breaker, its failure
+    opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        window_seconds: float,
+        open_seconds: float,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.failure_exceptions = failure_exceptions
+        self._state = CircuitState.CLOSED
+        self._failures: Deque[float] = deque()
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        record_circuit_transition(name, None, self._state.value)
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state (an expired open period reads as half-open)"""
+        if self._state != CircuitState.OPEN:
+            return self._state
+        if time.monotonic() - self._opened_at >= self.open_seconds:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    def reject_if_open(self) -> None:
+        """
+        Fail fast before doing any preparatory work (e.g. queueing)
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if self.state == CircuitState.OPEN:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """
+        Run the block through the breaker
+
+        Raises:
+            CircuitOpenError: If the breaker is open (or a half-open probe
+                is already running)
+        """
+        probe = self._admit()
+        try:
+            yield
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or unrelated error: neither a success nor a failure
+            if probe:
+                self._probe_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def _admit(self) -> bool:
+        """Let a call through or raise; returns True if the call is the half-open probe"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return False
+        if state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._transition(CircuitState.HALF_OPEN)
+            self._probe_in_flight = True
+            return True
+        raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        if self._state != CircuitState.CLOSED:
+            self._failures.clear()
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        self._probe_in_flight = False
+        if self._state == CircuitState.HALF_OPEN:
+            self._open(now)
+            return
+
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window_seconds:
+            self._failures.popleft()
+        if self._state == CircuitState.CLOSED and len(self._failures) >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._transition(CircuitState.OPEN)
+        logger.warning(
+            "circuit_opened",
+            circuit=self.name,
+            failures=len(self._failures),
+            open_seconds=self.open_seconds,
+        )
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self._state:
+            return
+        record_circuit_transition(self.name, self._state.value, state.value)
+        logger.info(
+            "circuit_state_changed",
+            circuit=self.name,
+            from_state=self._state.value,
+            to_state=state.value,
+        )
+        self._state = state
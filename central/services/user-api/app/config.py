@@ -3,7 +3,7 @@ Configuration management using Pydantic Settings
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 from cryptography.fernet import Fernet
 
@@ -36,25 +36,91 @@ class Settings(BaseSettings):
     
     # LLM (Ollama)
     ollama_base_url: str = "http://localhost:11434"
+    ollama_base_urls: List[str] = []  # Multiple Ollama nodes; overrides ollama_base_url when set
     ollama_model: str = "ministral-3:3b-instruct-2512-q4_K_M"
     llm_timeout_seconds: int = 30
-    llm_context_window: int = 10
+    llm_adaptive_timeout_enabled: bool = True  # Deadline from observed p99 (at most 2x the timeout)
+    llm_timeout_p99_multiplier: float = 3.0
+    llm_timeout_min_seconds: float = 5.0
+    llm_latency_window: int = 200  # Recent calls kept per model and prompt size bucket
+    llm_latency_min_samples: int = 20  # Below this the fixed timeout is used
+    llm_hedging_enabled: bool = False  # Re-send calls past the hedge quantile to an idle slot
+    llm_hedge_quantile: float = 0.95
+    llm_context_window: int = 10  # Max stored turns per session
+    llm_history_token_budget: int = 400  # Estimated tokens of session turns kept for the prompt
+    llm_history_summary_max_tokens: int = 100  # Cap of the summary older turns are compacted into
     llm_temperature: float = 0.15  # Lower = more deterministic
+    ollama_pool_max_connections: int = 10
+    ollama_pool_max_keepalive: int = 10
+    ollama_keepalive_expiry_seconds: float = 60.0
+    ollama_connect_timeout_seconds: float = 2.0
+    ollama_health_timeout_seconds: float = 2.0
+    ollama_eject_after_failures: int = 3  # Consecutive failures before a backend is ejected
+    ollama_eject_seconds: float = 10.0  # Ejection period before a backend is re-probed
+    ollama_probe_interval_seconds: float = 5.0
+    ollama_latency_ewma_alpha: float = 0.2
+    ollama_sticky_max_skew: float = 3.0  # Drop session affinity when its node is this much busier
+    ollama_keep_alive: str = "30m"  # Keeps the model and its cached prompt prefix resident
+    ollama_warmup_enabled: bool = True  # Load the model at startup; /ready waits until resident
+    ollama_warmup_timeout_seconds: float = 120.0  # Cold model load on a slow disk
+    ollama_residency_check_seconds: float = 30.0  # Interval of the /api/ps residency check
+    ollama_residency_idle_seconds: float = 0.0  # Unload the model after this long idle (0 = never)
+    llm_structured_output_enabled: bool = True  # Constrain output to the intent JSON schema
+    llm_num_predict: int = 256  # Output token cap, sized to the intent schema
+    llm_response_generation_enabled: bool = False  # Extra LLM call for replies no template covers
+    llm_streaming_enabled: bool = True  # Stream tokens and stop once the intent JSON closes
+    llm_session_context_enabled: bool = True  # Carry Ollama context tokens across session turns
+    llm_context_max_tokens: int = 2048  # Larger stored contexts fall back to a full rebuild
+    ollama_num_parallel: int = 2  # Per node; must match OLLAMA_NUM_PARALLEL on the Ollama servers
+    llm_queue_max_size: int = 100
+    llm_user_weights: Dict[str, float] = {}  # user_id -> fair-share weight (default 1.0)
+    llm_circuit_failure_threshold: int = 10  # Failures within the window that open the breaker
+    llm_circuit_window_seconds: int = 300
+    llm_circuit_open_seconds: int = 30  # Fail fast this long before a half-open probe
+    llm_single_flight_enabled: bool = True  # Coalesce identical in-flight intent requests
+    single_flight_lock_ttl_seconds: int = 60
+    single_flight_result_ttl_seconds: int = 10
+    single_flight_poll_interval_ms: int = 50
     
     # Home Assistant
-    ha_default_domain: str = "http://localhost:8123"
-    ha_api_timeout_seconds: int = 5
-    ha_retry_count: int = 3
+    ha_default_domain: str = "http://localhost:8123"  # URL of users with a token but no URL
+    ha_api_timeout_seconds: int = 5  # Per attempt
+    ha_retry_count: int = 3  # Retries after the first attempt
     ha_retry_backoff_factor: float = 2.0
+    ha_retry_base_delay_ms: int = 50  # Upper bound of the first (jittered) retry delay
+    ha_request_deadline_seconds: float = 3.0  # All attempts of one command together
+    ha_pool_max_instances: int = 64  # Per-user HA clients kept; LRU idle ones are closed
+    ha_pool_max_connections: int = 4  # Keep-alive connections per HA instance
+    ha_pool_keepalive_seconds: float = 60.0  # Idle connections are closed after this long
+    ha_entity_index_top_k: int = 8  # Entities retrieved into the prompt per utterance
+    ha_entity_index_refresh_seconds: int = 300
+    ha_entity_index_max_users: int = 256  # Per-user indexes kept in memory
+    ha_entity_index_build_wait_seconds: float = 0.5  # First request skips the index after this
+    ha_entity_resolution_min_score: float = 0.6  # Below this the target stays unresolved
+    ha_entity_resolution_min_margin: float = 0.1  # Lead over the runner-up unless its area was said
     
     # Audit & Security
     audit_retention_days: int = 90
+    audit_async_enabled: bool = True  # Bulk-write audit rows in the background, not in the request
+    audit_queue_max_size: int = 10000  # Rows beyond this are dropped (counted), never block
+    audit_batch_size: int = 200  # Rows per multi-row INSERT; a full batch triggers a flush
+    audit_flush_interval_seconds: float = 1.0
+    audit_shutdown_timeout_seconds: float = 10.0  # Drain time for queued rows on shutdown
     rate_limit_per_user_per_minute: int = 10
     rate_limit_global_per_second: int = 100
     cors_allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
     # Feature Flags
     feature_llm_caching: bool = True
+    feature_intent_grammar: bool = True  # Deterministic fast path before the LLM
+    intent_cache_max_entries: int = 1024  # In-process LRU tier
+    intent_cache_ttl_seconds: int = 3600  # Redis tier (and local entry lifetime)
+    intent_batch_max_items: int = 50
+    intent_batch_concurrency: int = 4  # Batch items (sessions) processed at once
+    ws_auth_timeout_seconds: float = 5.0  # Wait for the auth message on a new WebSocket
+    ws_heartbeat_seconds: float = 20.0
+    ws_idle_timeout_seconds: float = 60.0  # Close sockets silent this long (no frames, no intents)
+    ws_max_in_flight: int = 4  # Per connection; reading pauses beyond this
     feature_ha_fallback_mode: bool = True
     debug_mode: bool = False
     
@@ -17,6 +17,7 @@ class IntentStatus(str, Enum):
     ERROR = "error"
     TIMEOUT = "timeout"
     NOT_IMPLEMENTED = "not_implemented"
+    NEEDS_CLARIFICATION = "needs_clarification"  # Not executed; the user was asked back
 
 
 class ComponentStatus(str, Enum):
@@ -27,6 +28,19 @@ class ComponentStatus(str, Enum):
     UNKNOWN = "unknown"
 
 
+class CircuitState(str, Enum):
+    """Circuit breaker state"""
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+class RequestPriority(str, Enum):
+    """LLM scheduling priority class"""
+    INTERACTIVE = "interactive"  # Live voice commands
+    BATCH = "batch"  # Replayed/bulk commands
+
+
 class TokenType(str, Enum):
     """Token types"""
     BEARER = "bearer"
@@ -46,6 +60,9 @@ TOKEN_JTI_LENGTH = 36
 TEXT_MIN_LENGTH = 1
 TEXT_MAX_LENGTH = 1000
 
+# Intents below this confidence are never cached or executed (the user is asked back)
+INTENT_MIN_CONFIDENCE = 0.5
+
 # Validation messages
 VALIDATION_EMAIL_REQUIRED = "Email is required"
 VALIDATION_PASSWORD_REQUIRED = "Password is required"
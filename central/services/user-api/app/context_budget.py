@@ -0,0 +1,135 @@
+"""
+Token-budgeted session history: estimation, selection and compaction
+
+Session entries carry a token estimate taken when they are stored. The
+newest turns are kept within a token budget; turns pushed out of it are
+folded into a single, size-capped summary entry at the head of the
+history, so the prompt stays bounded however long the utterances are.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+SUMMARY_ROLE = "summary"
+
+# Conservative for Hungarian on small-model tokenizers (long agglutinated words)
+CHARS_PER_TOKEN = 3.0
+# Role label and line break per rendered message
+ENTRY_OVERHEAD_TOKENS = 3
+
+_SUMMARY_SEPARATOR = "; "
+_ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the prompt tokens a message costs"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + ENTRY_OVERHEAD_TOKENS
+
+
+def entry_tokens(entry: Any) -> int:
+    """Token estimate of a stored entry (estimated now for entries stored without one)"""
+    if isinstance(entry, dict):
+        tokens = entry.get("tokens")
+        if isinstance(tokens, int):
+            return tokens
+        return estimate_tokens(str(entry.get("content", "")))
+    return estimate_tokens(str(entry))
+
+
+def select_history(session_context: Optional[List[Any]], budget_tokens: int) -> List[Any]:
+    """
+    Pick the history that goes into the prompt
+
+    Keeps the summary entry (if any) and the newest turns whose combined
+    estimate fits the budget, oldest first.
+
+    Args:
+        session_context: Stored session entries, oldest first
+        budget_tokens: Token budget for the turns (the summary is capped separately)
+
+    Returns:
+        Selected entries, oldest first
+    """
+    entries = list(session_context or [])
+    summary = None
+    if entries and _is_summary(entries[0]):
+        summary = entries.pop(0)
+
+    selected: List[Any] = []
+    used = 0
+    for entry in reversed(entries):
+        cost = entry_tokens(entry)
+        if used + cost > budget_tokens:
+            break
+        selected.append(entry)
+        used += cost
+    selected.reverse()
+
+    if summary is not None:
+        selected.insert(0, summary)
+    return selected
+
+
+def compact_history(
+    session_context: List[Any],
+    budget_tokens: int,
+    summary_max_tokens: int,
+    max_entries: int,
+) -> List[Any]:
+    """
+    Fold turns that no longer fit the budget into the summary entry
+
+    Args:
+        session_context: Stored session entries, oldest first
+        budget_tokens: Token budget for the kept turns
+        summary_max_tokens: Size cap of the summary entry
+        max_entries: Hard cap on kept turns regardless of size
+
+    Returns:
+        The compacted history: optional summary entry, then the kept turns
+    """
+    entries = list(session_context)
+    summary = entries.pop(0) if entries and _is_summary(entries[0]) else None
+
+    kept = select_history(entries, budget_tokens)[-max_entries:] if max_entries > 0 else []
+    evicted = entries[: len(entries) - len(kept)]
+    if not evicted:
+        return ([summary] if summary is not None else []) + kept
+
+    pieces = summary["content"].split(_SUMMARY_SEPARATOR) if summary is not None else []
+    for entry in evicted:
+        role = entry.get("role") if isinstance(entry, dict) else "user"
+        if role == "user":
+            # Only user turns: the assistant's confirmations add little context
+            pieces.append(str(entry.get("content", "")) if isinstance(entry, dict) else str(entry))
+
+    content = _fit_summary(pieces, summary_max_tokens)
+    if not content:
+        return kept
+    return [build_summary_entry(content)] + kept
+
+
+def build_summary_entry(content: str) -> Dict[str, Any]:
+    """Build the summary entry that stands in for compacted turns"""
+    return {"role": SUMMARY_ROLE, "content": content, "tokens": estimate_tokens(content)}
+
+
+def _is_summary(entry: Any) -> bool:
+    return isinstance(entry, dict) and entry.get("role") == SUMMARY_ROLE
+
+
+def _fit_summary(pieces: List[str], max_tokens: int) -> str:
+    """Join pieces, dropping the oldest until the result fits the cap"""
+    pieces = [piece.strip() for piece in pieces if piece and piece.strip()]
+    max_chars = int((max_tokens - ENTRY_OVERHEAD_TOKENS) * CHARS_PER_TOKEN)
+    if max_chars <= 0:
+        return ""
+    while pieces:
+        content = _SUMMARY_SEPARATOR.join(pieces)
+        if len(content) <= max_chars:
+            return content
+        if len(pieces) == 1:
+            # Keep the end of an oversized single piece (its most recent part)
+            return _ELLIPSIS + content[-(max_chars - len(_ELLIPSIS)):]
+        pieces.pop(0)
+    return ""
@@ -0,0 +1,377 @@
+"""
+Per-user Home Assistant entity index for prompt context retrieval
+
+Only the entities relevant to the utterance go into the prompt, so the
+prompt stays the same size however large the home is. Entities are
+indexed by accent-folded character trigrams of their friendly name,
+aliases, area, object ID and Hungarian domain words, and ranked with
+BM25. Trigrams match across Hungarian suffixes ("lámpát", "nappaliban")
+without a stemmer.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from app.config import settings
+from app.ha_client import HAInstance, fetch_entities
+from app.intent_grammar import is_command_verb
+from app.prometheus_metrics import record_entity_context, record_entity_index_refresh
+
+logger = structlog.get_logger()
+
+NGRAM_SIZE = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Drop matches scoring below this fraction of the best one (stray shared trigrams)
+MIN_RELATIVE_SCORE = 0.25
+
+# Hungarian words users say for each domain ("kapcsold fel a lámpát")
+DOMAIN_WORDS = {
+    "light": ("lámpa", "világítás", "fény"),
+    "switch": ("kapcsoló", "konnektor"),
+    "climate": ("termosztát", "fűtés", "klíma", "hőmérséklet"),
+    "cover": ("redőny", "árnyékoló", "függöny", "garázskapu"),
+    "fan": ("ventilátor",),
+    "lock": ("zár", "ajtózár"),
+    "media_player": ("tévé", "tv", "hangszóró", "lejátszó", "zene"),
+    "sensor": ("érzékelő", "szenzor"),
+    "binary_sensor": ("érzékelő", "szenzor"),
+    "vacuum": ("porszívó", "robotporszívó"),
+    "scene": ("jelenet",),
+    "script": ("szkript",),
+    "camera": ("kamera",),
+}
+
+# Utterance words that never name an entity (accent-folded): articles,
+# verb particles, conjunctions and fillers. Command verbs are dropped too,
+# otherwise "kapcsold" matches the "kapcsoló" domain word of every switch.
+_QUERY_STOPWORDS = frozenset({
+    "a", "az", "egy", "fel", "le", "ki", "be", "at", "el", "meg", "es", "majd", "is",
+    "legyen", "van", "mi", "milyen", "hany", "mennyi", "kerlek", "most", "legyszi",
+})
+
+# Wait before retrying a failed refresh (an unreachable HA is not hit on every request)
+_RETRY_SECONDS = 30.0
+
+# Term frequency weight per field: names and aliases matter most
+_NAME_WEIGHT = 2
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents (á -> a, ő -> o) and reduce to words"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join("".join(char if char.isalnum() else " " for char in stripped).split())
+
+
+def query_text(text: str) -> str:
+    """The words of an utterance that may name an entity ("kapcsold le a tévét" -> "tevet")"""
+    return " ".join(
+        word for word in fold_text(text).split()
+        if word not in _QUERY_STOPWORDS and not is_command_verb(word)
+    )
+
+
+def char_ngrams(text: str) -> Counter:
+    """Character n-grams of each folded word, padded so word edges count"""
+    grams: Counter = Counter()
+    for word in fold_text(text).split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - NGRAM_SIZE + 1)):
+            grams[padded[i:i + NGRAM_SIZE]] += 1
+    return grams
+
+
+def _entity_terms(entity: Dict[str, Any]) -> Counter:
+    terms: Counter = Counter()
+    for _ in range(_NAME_WEIGHT):
+        terms.update(char_ngrams(entity.get("name") or ""))
+        for alias in entity.get("aliases") or []:
+            terms.update(char_ngrams(alias))
+    terms.update(char_ngrams(entity.get("area") or ""))
+    terms.update(char_ngrams(entity["entity_id"].partition(".")[2].replace("_", " ")))
+    for word in DOMAIN_WORDS.get(entity.get("domain", ""), ()):
+        terms.update(char_ngrams(word))
+    return terms
+
+
+def name_variants(entity: Dict[str, Any]) -> List[str]:
+    """Ways a user (or the LLM) may name an entity, for fuzzy resolution"""
+    name = entity.get("name") or ""
+    object_name = entity["entity_id"].partition(".")[2].replace("_", " ")
+    variants = [name, object_name, *(entity.get("aliases") or [])]
+    area = entity.get("area")
+    if area:
+        folded_area = fold_text(area)
+        if folded_area not in fold_text(name):
+            variants.append(f"{area} {name}")
+        for word in DOMAIN_WORDS.get(entity.get("domain", ""), ()):
+            variants.append(f"{area} {word}")
+    return [variant for variant in variants if variant.strip()]
+
+
+def _signature(entity: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(entity, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def render_entities(entities: List[Dict[str, Any]]) -> str:
+    """Render entities for the prompt, one ``entity_id | name | area`` line each"""
+    lines = []
+    for entity in entities:
+        parts = [entity["entity_id"], entity.get("name") or ""]
+        if entity.get("area"):
+            parts.append(entity["area"])
+        lines.append(" | ".join(parts))
+    return "\n".join(lines)
+
+
+class EntityIndex:
+    """BM25 index over character n-grams of one home's entities"""
+
+    def __init__(self):
+        self._entities: Dict[str, Dict[str, Any]] = {}
+        self._signatures: Dict[str, str] = {}
+        self._terms: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._variants: Dict[str, List[Counter]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def get(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Entity by ID, or None if not indexed"""
+        return self._entities.get(entity_id)
+
+    def variant_ngrams(self, entity_id: str) -> List[Counter]:
+        """Precomputed n-grams of each name variant of an entity"""
+        return self._variants.get(entity_id, [])
+
+    def find(self, domain: str, area: Optional[str] = None) -> List[str]:
+        """IDs of the entities of a domain, optionally only those in an area (accent-folded)"""
+        folded_area = fold_text(area) if area else None
+        return sorted(
+            entity_id
+            for entity_id, entity in self._entities.items()
+            if entity.get("domain") == domain
+            and (folded_area is None or fold_text(entity.get("area") or "") == folded_area)
+        )
+
+    def candidates(self, text: str) -> List[str]:
+        """IDs of entities sharing at least one n-gram with the text"""
+        found = set()
+        for term in char_ngrams(text):
+            found.update(self._postings.get(term, ()))
+        return sorted(found)
+
+    def update(self, entities: List[Dict[str, Any]]) -> int:
+        """
+        Bring the index in line with a fresh entity list
+
+        Only added, changed and removed entities are (re)indexed.
+
+        Returns:
+            Number of entities that were added, changed or removed
+        """
+        incoming = {entity["entity_id"]: entity for entity in entities}
+        changed = 0
+        for entity_id in list(self._entities):
+            if entity_id not in incoming:
+                self._remove(entity_id)
+                changed += 1
+        for entity_id, entity in incoming.items():
+            signature = _signature(entity)
+            if self._signatures.get(entity_id) == signature:
+                continue
+            if entity_id in self._entities:
+                self._remove(entity_id)
+            self._add(entity, signature)
+            changed += 1
+        return changed
+
+    def _add(self, entity: Dict[str, Any], signature: str) -> None:
+        entity_id = entity["entity_id"]
+        terms = _entity_terms(entity)
+        self._entities[entity_id] = entity
+        self._signatures[entity_id] = signature
+        self._terms[entity_id] = terms
+        self._variants[entity_id] = [char_ngrams(variant) for variant in name_variants(entity)]
+        self._lengths[entity_id] = sum(terms.values())
+        self._total_length += self._lengths[entity_id]
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[entity_id] = count
+
+    def _remove(self, entity_id: str) -> None:
+        for term in self._terms.pop(entity_id):
+            postings = self._postings[term]
+            del postings[entity_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(entity_id)
+        del self._variants[entity_id]
+        del self._entities[entity_id]
+        del self._signatures[entity_id]
+
+    def search(self, text: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Rank entities against an utterance
+
+        Args:
+            text: User utterance; command words are ignored (see query_text)
+            k: Maximum number of entities to return
+
+        Returns:
+            Up to k matching entities, best first; weak matches far below
+            the best one are left out
+        """
+        if not self._entities:
+            return []
+        count = len(self._entities)
+        average_length = self._total_length / count
+        scores: Dict[str, float] = {}
+        for term in char_ngrams(query_text(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for entity_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[entity_id] / average_length)
+                score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                scores[entity_id] = scores.get(entity_id, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        if not ranked:
+            return []
+        cutoff = ranked[0][1] * MIN_RELATIVE_SCORE
+        return [self._entities[entity_id] for entity_id, score in ranked if score >= cutoff]
+
+
+class _UserIndex:
+    __slots__ = ("index", "base_url", "built", "next_refresh_at", "refresh_task")
+
+    def __init__(self, base_url: str):
+        self.index = EntityIndex()
+        self.base_url = base_url
+        self.built = False
+        self.next_refresh_at = 0.0
+        self.refresh_task: Optional[asyncio.Task] = None
+
+
+class EntityIndexCache:
+    """
+    Entity indexes of recently active users, refreshed in the background
+
+    The first request of a user waits a short while for the index to be
+    built and goes on without it if HA is slow; the build continues in the
+    background. After that, a stale index keeps serving while a background
+    refresh applies only the entity changes.
+    """
+
+    def __init__(
+        self, max_users: int, refresh_seconds: float, top_k: int, build_wait_seconds: float
+    ):
+        self.max_users = max_users
+        self.refresh_seconds = refresh_seconds
+        self.top_k = top_k
+        self.build_wait_seconds = build_wait_seconds
+        self._indexes: "OrderedDict[str, _UserIndex]" = OrderedDict()
+
+    async def get_index(self, instance: Optional[HAInstance]) -> Optional[EntityIndex]:
+        """
+        The user's entity index, built on first use
+
+        Args:
+            instance: The user's HA instance (see ha_client.load_instance)
+
+        Returns:
+            The index, or None if the user has no HA instance, it has never
+            been reachable or the first build is still running
+        """
+        if instance is None:
+            return None
+        entry = await self._get_index(instance)
+        return entry.index if entry is not None else None
+
+    def build_ha_context(self, index: EntityIndex, text: str) -> Optional[str]:
+        """
+        Entity context for the prompt: the top-k entities for this utterance
+
+        Returns:
+            Rendered entity lines, or None if nothing matches
+        """
+        matches = index.search(text, self.top_k)
+        record_entity_context(len(matches))
+        return render_entities(matches) or None
+
+    async def _get_index(self, instance: HAInstance) -> Optional[_UserIndex]:
+        user_id = instance.user_id
+        entry = self._indexes.get(user_id)
+        if entry is None or entry.base_url != instance.base_url:
+            entry = _UserIndex(instance.base_url)
+            self._indexes[user_id] = entry
+            while len(self._indexes) > self.max_users:
+                _, evicted = self._indexes.popitem(last=False)
+                if evicted.refresh_task is not None:
+                    evicted.refresh_task.cancel()
+        self._indexes.move_to_end(user_id)
+
+        if time.monotonic() >= entry.next_refresh_at and entry.refresh_task is None:
+            entry.refresh_task = asyncio.create_task(self._refresh(instance, entry))
+
+        if not entry.built and entry.refresh_task is not None:
+            # Never built: wait briefly for the first build (shared with concurrent requests)
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(entry.refresh_task), timeout=self.build_wait_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.info("entity_index_build_pending", user_id=user_id)
+        return entry if entry.built else None
+
+    async def _refresh(self, instance: HAInstance, entry: _UserIndex) -> None:
+        user_id = instance.user_id
+        start_time = time.monotonic()
+        mode = "incremental" if entry.built else "full"
+        try:
+            # No request waits for this task beyond the build wait, so every
+            # attempt may use its full timeout
+            entities = await fetch_entities(
+                instance,
+                deadline=settings.ha_api_timeout_seconds * (settings.ha_retry_count + 1),
+            )
+            changed = entry.index.update(entities)
+            entry.built = True
+            entry.next_refresh_at = time.monotonic() + self.refresh_seconds
+            record_entity_index_refresh(mode, time.monotonic() - start_time, changed)
+            logger.info(
+                "entity_index_refreshed",
+                user_id=user_id,
+                mode=mode,
+                entities=len(entry.index),
+                changed=changed,
+            )
+        except Exception as e:
+            # Keep serving the previous index, if any
+            entry.next_refresh_at = time.monotonic() + min(self.refresh_seconds, _RETRY_SECONDS)
+            record_entity_index_refresh("failed", time.monotonic() - start_time, 0)
+            logger.warning("entity_index_refresh_failed", user_id=user_id, error=str(e))
+        finally:
+            entry.refresh_task = None
+
+
+# Singleton instance
+entity_index_cache = EntityIndexCache(
+    max_users=settings.ha_entity_index_max_users,
+    refresh_seconds=settings.ha_entity_index_refresh_seconds,
+    top_k=settings.ha_entity_index_top_k,
+    build_wait_seconds=settings.ha_entity_index_build_wait_seconds,
+)
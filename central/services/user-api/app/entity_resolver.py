@@ -0,0 +1,140 @@
+"""
+Resolution of free-text intent targets to concrete Home Assistant entities
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.entity_index import EntityIndex, char_ngrams, fold_text
+from app.prometheus_metrics import record_entity_resolution
+
+# Score bonus for a candidate whose area is mentioned in the utterance
+AREA_BONUS = 0.1
+# Score bonus when the LLM's entity_id-like target has the candidate's domain
+DOMAIN_BONUS = 0.1
+
+
+class EntityResolution(NamedTuple):
+    """Outcome of resolving an intent target"""
+    entity_id: Optional[str]
+    score: float
+    method: str  # exact, fuzzy, unresolved
+
+
+def _dice(a: Counter, b: Counter) -> float:
+    total = sum(a.values()) + sum(b.values())
+    if not total:
+        return 0.0
+    return 2 * sum((a & b).values()) / total
+
+
+def rank_entities(index: EntityIndex, name: str, utterance: str = "") -> List[Tuple[str, float]]:
+    """
+    Rank indexed entities by similarity to a target name
+
+    Similarity is the best Dice coefficient between the name's character
+    trigrams and those of any of the entity's name variants (friendly
+    name, aliases, object ID, area + name, area + domain word), plus
+    bonuses for an area mentioned in the utterance and a matching domain.
+
+    Args:
+        index: The user's entity index
+        name: Target name as produced by the grammar or the LLM
+        utterance: Original user text (for area disambiguation)
+
+    Returns:
+        (entity_id, score) pairs, best first, scores capped at 1.0
+    """
+    domain, dot, object_id = name.partition(".")
+    if not dot or " " in name:
+        domain, query = "", name
+    else:
+        query = object_id.replace("_", " ")
+
+    query_grams = char_ngrams(query)
+    utterance_words = f" {fold_text(utterance)} "
+    ranked = []
+    for entity_id in index.candidates(query):
+        entity = index.get(entity_id)
+        variants = index.variant_ngrams(entity_id)
+        score = max((_dice(query_grams, grams) for grams in variants), default=0.0)
+        area = entity.get("area")
+        if area and f" {fold_text(area)}" in utterance_words:
+            score += AREA_BONUS
+        if domain and entity.get("domain") == domain:
+            score += DOMAIN_BONUS
+        ranked.append((entity_id, min(score, 1.0)))
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked
+
+
+def _is_clear_winner(index: EntityIndex, ranked: List[Tuple[str, float]], utterance: str) -> bool:
+    """Whether the best candidate leads the runner-up by the minimum margin, or its area was said"""
+    if len(ranked) < 2 or ranked[0][1] - ranked[1][1] >= settings.ha_entity_resolution_min_margin:
+        return True
+    best, runner_up = (index.get(entity_id) for entity_id, _ in ranked[:2])
+    area = best.get("area")
+    if not area or area == runner_up.get("area"):
+        return False
+    return f" {fold_text(area)}" in f" {fold_text(utterance)} "
+
+
+def match_entity(index: EntityIndex, name: str, utterance: str = "") -> EntityResolution:
+    """
+    Find the entity a target name clearly refers to
+
+    A fuzzy match is only accepted if it is clearly better than the
+    runner-up (by HA_ENTITY_RESOLUTION_MIN_MARGIN) or in the area the user
+    named.
+
+    Args:
+        index: The user's entity index
+        name: Target name (or entity ID)
+        utterance: Original user text (for area disambiguation)
+
+    Returns:
+        The resolution; ``entity_id`` is None if no entity is clearly named
+    """
+    if index.get(name) is not None:
+        return EntityResolution(name, 1.0, "exact")
+    ranked = rank_entities(index, name, utterance)
+    if ranked and ranked[0][1] >= settings.ha_entity_resolution_min_score and _is_clear_winner(
+        index, ranked, utterance
+    ):
+        return EntityResolution(ranked[0][0], round(ranked[0][1], 3), "fuzzy")
+    best = round(ranked[0][1], 3) if ranked else 0.0
+    return EntityResolution(None, best, "unresolved")
+
+
+def resolve_target(
+    index: Optional[EntityIndex],
+    intent_data: Dict[str, Any],
+    utterance: str,
+) -> Optional[EntityResolution]:
+    """
+    Resolve the intent's target to an entity_id
+
+    On success the entity ID is stored as ``target["entity_id"]``. Area
+    targets are left alone (they address every entity in the area). If no
+    entity is clearly named (see match_entity) the target stays
+    unresolved, so the user can be asked.
+
+    Args:
+        index: The user's entity index (None if the user has no HA instance)
+        intent_data: Recognized intent (modified in place)
+        utterance: Original user text
+
+    Returns:
+        The resolution, or None if there was nothing to resolve
+    """
+    target = intent_data.get("target") or {}
+    name = (target.get("name") or "").strip()
+    if index is None or not name or target.get("type") == "area":
+        return None
+
+    resolution = match_entity(index, name, utterance)
+    if resolution.entity_id is not None:
+        target["entity_id"] = resolution.entity_id
+    record_entity_resolution(resolution.method, resolution.score)
+    return resolution
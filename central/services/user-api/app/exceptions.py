@@ -56,6 +56,11 @@ class LLMError(ExternalServiceError):
         super().__init__(detail=detail, service="Ollama")
 
 
+class CircuitOpenError(LLMError):
+    """LLM call rejected without trying because the circuit breaker is open"""
+    def __init__(self, detail: str = "LLM circuit breaker is open"):
+        super().__init__(detail=detail)
+
 
 class LLMServiceError(ExternalServiceError):
     """LLM service error"""
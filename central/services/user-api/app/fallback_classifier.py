@@ -0,0 +1,174 @@
+"""
+Rule-based intent classifier for degraded mode (LLM unavailable)
+
+Looser than the grammar fast path: it only looks for command verb
+phrases, numbers and units, and takes the target from the remaining
+words, accepted only if they clearly name an entity of the index. Used
+when Ollama is down or its circuit breaker is open, so voice commands
+still get an answer in milliseconds.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.entity_index import EntityIndex, fold_text, query_text
+from app.entity_resolver import match_entity
+from app.intent_grammar import parse_hungarian_number, split_target
+
+FALLBACK_CONFIDENCE = 0.6
+FALLBACK_UNKNOWN_RESPONSE = (
+    "Most csak egyszerű parancsokat értek, például: kapcsold fel a nappali lámpát."
+)
+
+# Command verb phrases on accent-folded words. Whole phrases only: a bare
+# particle ("ki", "le", "át") says nothing without its verb ("nyisd ki").
+_VERB_PHRASES: Dict[Tuple[str, ...], Tuple[str, str]] = {
+    **{(verb, particle): ("turn_on", "on")
+       for verb in ("kapcsold", "kapcsolj") for particle in ("fel", "be")},
+    **{(verb, particle): ("turn_off", "off")
+       for verb in ("kapcsold", "kapcsolj", "oltsd") for particle in ("ki", "le")},
+    **{(verb, "at"): ("toggle", "toggle") for verb in ("kapcsold", "kapcsolj", "valtsd")},
+    ("nyisd", "ki"): ("turn_on", "on"),
+    ("nyisd", "fel"): ("turn_on", "on"),
+    ("gyujtsd", "fel"): ("turn_on", "on"),
+    ("inditsd", "el"): ("turn_on", "on"),
+    ("allitsd", "le"): ("turn_off", "off"),
+    ("zard", "be"): ("turn_off", "off"),
+    ("zard", "le"): ("turn_off", "off"),
+    ("csukd", "be"): ("turn_off", "off"),
+    ("csukd", "le"): ("turn_off", "off"),
+    ("nyisd",): ("turn_on", "on"),
+    ("inditsd",): ("turn_on", "on"),
+    ("zard",): ("turn_off", "off"),
+    ("valtsd",): ("toggle", "toggle"),
+}
+_MAX_PHRASE_WORDS = max(len(phrase) for phrase in _VERB_PHRASES)
+
+# Negated commands are never guessed at: the LLM (or the user) must decide
+_NEGATION_WORDS = frozenset({"ne", "nem", "se", "sem", "soha", "sose"})
+_STATUS_WORDS = frozenset({"milyen", "mennyi", "hany", "allapot", "allapota", "allapotban"})
+_PERCENT_WORDS = frozenset({"szazalek", "szazalekra", "%"})
+_DEGREE_WORDS = frozenset({"fok", "fokra", "fokos", "°"})
+# Words of a status question or a setting that are not part of the target
+_NON_TARGET_WORDS = (
+    _NEGATION_WORDS | _STATUS_WORDS | _PERCENT_WORDS | _DEGREE_WORDS
+    | {"allasban", "fenyereje", "fenyerejet"}
+)
+
+
+def _unknown() -> Dict[str, Any]:
+    return {
+        "intent": "unknown",
+        "target": {"type": "unknown", "name": ""},
+        "action": "unknown",
+        "parameters": {},
+        "confidence": 0.0,
+        "response": FALLBACK_UNKNOWN_RESPONSE,
+    }
+
+
+def _find_verb_phrases(folded: List[str]) -> List[Tuple[int, int, Tuple[str, str]]]:
+    """(start, end, (intent, action)) of each verb phrase, longest match first at each position"""
+    found = []
+    position = 0
+    while position < len(folded):
+        for size in range(_MAX_PHRASE_WORDS, 0, -1):
+            match = _VERB_PHRASES.get(tuple(folded[position:position + size]))
+            if match is not None:
+                found.append((position, position + size, match))
+                position += size
+                break
+        else:
+            position += 1
+    return found
+
+
+def _find_number(words: List[str], folded: List[str]) -> Optional[Tuple[int, float]]:
+    for position, (word, folded_word) in enumerate(zip(words, folded)):
+        # Digits as said ("21,5"); number words accent-folded ("huszonkettő")
+        value = parse_hungarian_number(word if word[:1].isdigit() else folded_word)
+        if value is not None:
+            return position, value
+    return None
+
+
+def classify(text: str, entity_index: Optional[EntityIndex] = None) -> Dict[str, Any]:
+    """
+    Classify an utterance without the LLM
+
+    Args:
+        text: User utterance
+        entity_index: The user's entity index, used to check the target
+
+    Returns:
+        Intent dictionary in the same shape as the LLM parser produces;
+        ``unknown`` with confidence 0.0 if no rule applies, the utterance
+        is negated or holds more than one command, or no entity (or area)
+        is clearly named
+    """
+    spaced = text.lower().replace("%", " % ").replace("°", " ° ")
+    words = [word.strip(".,!?;:") for word in spaced.split()]
+    words = [word for word in words if word in ("%", "°") or fold_text(word)]
+    folded = [fold_text(word).replace(" ", "") or word for word in words]
+    word_set = set(folded)
+    if word_set & _NEGATION_WORDS:
+        # "a lámpát ne kapcsold fel": executing the verb would do the opposite
+        return _unknown()
+    skipped = set()
+
+    phrases = _find_verb_phrases(folded)
+    for start, end, _ in phrases:
+        skipped.update(range(start, end))
+    number = _find_number(words, folded)
+    if number is not None:
+        skipped.add(number[0])
+
+    parameters: Dict[str, Any] = {}
+    accusative = True
+    if len({match for _, _, match in phrases}) > 1:
+        # "kapcsold fel a lámpát és kapcsold le a tévét": one command only
+        return _unknown()
+    if number is not None and word_set & _PERCENT_WORDS and 0 <= number[1] <= 100:
+        intent, action = "set_brightness", "set"
+        parameters["brightness_pct"] = int(number[1])
+    elif number is not None and word_set & _DEGREE_WORDS:
+        intent, action = "set_temperature", "set"
+        parameters["temperature"] = number[1]
+    elif word_set & _STATUS_WORDS:
+        intent, action = "get_status", "unknown"
+        accusative = False
+    elif phrases:
+        intent, action = phrases[0][2]
+    else:
+        return _unknown()
+
+    # The target is what is left once verbs, numbers, units and fillers are gone
+    remaining = [
+        word for position, word in enumerate(words)
+        if position not in skipped
+        and folded[position] not in _NON_TARGET_WORDS
+        and query_text(word)
+    ]
+    name, area = split_target(" ".join(remaining), accusative)
+    if name:
+        if entity_index is None:
+            return _unknown()
+        resolution = match_entity(entity_index, f"{area} {name}" if area else name, text)
+        if resolution.entity_id is None:
+            return _unknown()
+        target = {"type": "entity", "name": resolution.entity_id}
+    elif area:
+        target = {"type": "area", "name": area}
+    elif intent == "set_temperature":
+        # "legyen 22 fok": the executor picks the only thermostat
+        target = {"type": "unknown", "name": ""}
+    else:
+        return _unknown()
+
+    return {
+        "intent": intent,
+        "target": target,
+        "action": action,
+        "parameters": parameters,
+        "confidence": FALLBACK_CONFIDENCE,
+        "response": None,
+    }
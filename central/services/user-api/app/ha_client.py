@@ -0,0 +1,329 @@
+"""
+Home Assistant REST API access for per-user instances
+
+Each user's instance gets one pooled HTTP client: keep-alive connections
+and a token decrypted once, instead of a new connection (and TLS
+handshake) per command. At most HA_POOL_MAX_INSTANCES clients are kept;
+beyond that the least recently used idle one is closed.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.exceptions import AuthenticationError, HomeAssistantError
+from app.models import User
+from app.prometheus_metrics import record_ha_client_pools, record_ha_request, record_ha_retry
+from app.security import decrypt_token
+
+logger = structlog.get_logger()
+
+# Entity ID -> area name, one "entity_id<TAB>area" line per entity that has an area
+_AREA_TEMPLATE = (
+    "{% for s in states %}{% set a = area_name(s.entity_id) %}"
+    "{% if a %}{{ s.entity_id }}\t{{ a }}\n{% endif %}{% endfor %}"
+)
+
+# Domains that are never the target of a voice command
+_SKIPPED_DOMAINS = frozenset({
+    "conversation",
+    "event",
+    "persistent_notification",
+    "stt",
+    "sun",
+    "tts",
+    "update",
+    "zone",
+})
+
+
+class HAInstance(NamedTuple):
+    """A user's Home Assistant instance"""
+    user_id: str
+    base_url: str
+    encrypted_token: str
+
+
+async def load_instance(db: AsyncSession, user_id: str) -> Optional[HAInstance]:
+    """
+    The user's HA instance from the users table
+
+    HA_DEFAULT_DOMAIN stands in for a missing instance URL.
+
+    Returns:
+        The instance, or None if the user has no HA token or cannot be loaded
+    """
+    try:
+        user = await db.get(User, uuid.UUID(user_id))
+    except Exception as e:
+        logger.warning("ha_instance_load_failed", user_id=user_id, error=str(e))
+        return None
+    if user is None or not user.ha_token_encrypted:
+        return None
+    return HAInstance(
+        user_id, user.ha_instance_url or settings.ha_default_domain, user.ha_token_encrypted
+    )
+
+
+async def fetch_entities(
+    instance: HAInstance, deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the controllable entities of a Home Assistant instance
+
+    Args:
+        instance: The user's HA instance
+        deadline: Time budget in seconds for all attempts of each call
+            (default: HA_REQUEST_DEADLINE_SECONDS)
+
+    Returns:
+        List of entities: entity_id, domain, name (friendly name), area
+        (None if unassigned) and aliases
+
+    Raises:
+        HomeAssistantError: If the states cannot be fetched
+    """
+    response = await ha_client_pool.request(
+        instance, "GET", "/api/states", "fetch_states", deadline=deadline
+    )
+    states = response.json()
+    areas = await _fetch_areas(instance, deadline)
+
+    entities = []
+    for state in states:
+        entity_id = state.get("entity_id", "")
+        domain, _, object_id = entity_id.partition(".")
+        if not object_id or domain in _SKIPPED_DOMAINS:
+            continue
+        attributes = state.get("attributes") or {}
+        aliases = attributes.get("aliases")
+        entities.append({
+            "entity_id": entity_id,
+            "domain": domain,
+            "name": attributes.get("friendly_name") or object_id.replace("_", " "),
+            "area": areas.get(entity_id),
+            "aliases": [str(alias) for alias in aliases] if isinstance(aliases, list) else [],
+        })
+    return entities
+
+
+async def _fetch_areas(instance: HAInstance, deadline: Optional[float]) -> Dict[str, str]:
+    """Entity areas via the template API (areas are not part of /api/states)"""
+    try:
+        response = await ha_client_pool.request(
+            instance,
+            "POST",
+            "/api/template",
+            "fetch_areas",
+            json={"template": _AREA_TEMPLATE},
+            deadline=deadline,
+        )
+    except HomeAssistantError as e:
+        logger.warning("ha_area_fetch_failed", error=str(e))
+        return {}
+
+    areas = {}
+    for line in response.text.splitlines():
+        entity_id, _, area = line.partition("\t")
+        if entity_id and area:
+            areas[entity_id.strip()] = area.strip()
+    return areas
+
+
+class _InstanceClient:
+    __slots__ = ("instance", "label", "client", "in_flight", "retired")
+
+    def __init__(self, instance: HAInstance):
+        self.instance = instance
+        # Metric label: the instance host
+        self.label = urlsplit(instance.base_url).netloc or instance.base_url
+        self.client = httpx.AsyncClient(
+            base_url=instance.base_url,
+            headers={"Authorization": f"Bearer {decrypt_token(instance.encrypted_token)}"},
+            timeout=settings.ha_api_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.ha_pool_max_connections,
+                max_keepalive_connections=settings.ha_pool_max_connections,
+                keepalive_expiry=settings.ha_pool_keepalive_seconds,
+            ),
+        )
+        self.in_flight = 0
+        # Replaced or evicted while calls were in flight: the last one closes it
+        self.retired = False
+
+
+class HAClientPool:
+    """
+    Pooled HTTP clients of the users' HA instances, with retries
+
+    A failed call is retried up to HA_RETRY_COUNT times after a random
+    (full jitter) delay of up to HA_RETRY_BASE_DELAY_MS *
+    HA_RETRY_BACKOFF_FACTOR ** (attempt - 1), as long as the next attempt
+    still starts within the call's deadline. Calls that are not idempotent
+    (e.g. toggle) are only retried if HA cannot have received them:
+    connection errors and 429.
+    """
+
+    def __init__(self, max_instances: int):
+        self.max_instances = max_instances
+        self._clients: "OrderedDict[str, _InstanceClient]" = OrderedDict()
+        self._retired: Set[_InstanceClient] = set()
+        self._closing: Set[asyncio.Task] = set()
+
+    async def request(
+        self,
+        instance: HAInstance,
+        method: str,
+        path: str,
+        operation: str,
+        json: Optional[Dict[str, Any]] = None,
+        idempotent: bool = True,
+        deadline: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        Call the HA REST API
+
+        Args:
+            instance: The user's HA instance
+            method: HTTP method
+            path: API path
+            operation: Metric label (call_service, get_state, ...)
+            json: Request body
+            idempotent: Whether repeating the call after HA may have
+                received it is harmless
+            deadline: Time budget in seconds for all attempts
+                (default HA_REQUEST_DEADLINE_SECONDS)
+
+        Returns:
+            The successful (2xx/3xx) response
+
+        Raises:
+            HomeAssistantError: On a non-retryable failure, or when attempts
+                or the deadline are exhausted
+        """
+        entry = self._client(instance)
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or settings.ha_request_deadline_seconds)
+        attempt = 0
+        entry.in_flight += 1
+        try:
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    response = await entry.client.request(
+                        method,
+                        path,
+                        json=json,
+                        timeout=max(
+                            0.001, min(settings.ha_api_timeout_seconds, deadline_at - loop.time())
+                        ),
+                    )
+                except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                    # The request never reached HA
+                    reason, retryable, error = "connect", True, f"Cannot connect: {e!r}"
+                except httpx.TimeoutException as e:
+                    reason, retryable, error = "timeout", idempotent, f"Timed out: {e!r}"
+                except httpx.HTTPError as e:
+                    reason, retryable, error = "transport", idempotent, f"Request failed: {e!r}"
+                else:
+                    if response.status_code < 400:
+                        record_ha_request(entry.label, operation, time.perf_counter() - start_time)
+                        return response
+                    reason = f"http_{response.status_code}"
+                    retryable = response.status_code == 429 or (
+                        response.status_code >= 500 and idempotent
+                    )
+                    error = f"Home Assistant returned status {response.status_code}"
+                record_ha_request(
+                    entry.label, operation, time.perf_counter() - start_time, error=reason
+                )
+
+                attempt += 1
+                backoff = settings.ha_retry_backoff_factor ** (attempt - 1)
+                delay = random.uniform(0, settings.ha_retry_base_delay_ms / 1000 * backoff)
+                if (
+                    not retryable
+                    or attempt > settings.ha_retry_count
+                    or loop.time() + delay >= deadline_at
+                ):
+                    raise HomeAssistantError(error)
+                record_ha_retry(entry.label, operation)
+                logger.info(
+                    "ha_request_retry",
+                    instance=entry.label,
+                    operation=operation,
+                    attempt=attempt,
+                    error=error,
+                )
+                await asyncio.sleep(delay)
+        finally:
+            entry.in_flight -= 1
+            if entry.retired and not entry.in_flight:
+                self._close(entry)
+
+    async def close(self) -> None:
+        """Close all clients"""
+        for entry in [*self._clients.values(), *self._retired]:
+            await entry.client.aclose()
+        self._clients.clear()
+        self._retired.clear()
+        record_ha_client_pools(0)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _client(self, instance: HAInstance) -> _InstanceClient:
+        entry = self._clients.get(instance.user_id)
+        if entry is not None and entry.instance != instance:
+            # New URL or token: the old connections belong to the old instance
+            self._discard(instance.user_id)
+            entry = None
+        if entry is None:
+            try:
+                entry = _InstanceClient(instance)
+            except AuthenticationError as e:
+                raise HomeAssistantError(f"Unusable Home Assistant token: {e.detail}")
+            self._clients[instance.user_id] = entry
+            self._evict(keep=instance.user_id)
+            record_ha_client_pools(len(self._clients))
+        self._clients.move_to_end(instance.user_id)
+        return entry
+
+    def _evict(self, keep: str) -> None:
+        # Least recently used first; the caller's client and clients with calls in flight are kept
+        excess = len(self._clients) - self.max_instances
+        if excess <= 0:
+            return
+        idle = [
+            user_id for user_id, entry in self._clients.items()
+            if user_id != keep and not entry.in_flight
+        ]
+        for user_id in idle[:excess]:
+            self._discard(user_id)
+
+    def _discard(self, user_id: str) -> None:
+        entry = self._clients.pop(user_id)
+        if entry.in_flight:
+            # Closing now would fail the running calls
+            entry.retired = True
+            self._retired.add(entry)
+            return
+        self._close(entry)
+
+    def _close(self, entry: _InstanceClient) -> None:
+        self._retired.discard(entry)
+        task = asyncio.ensure_future(entry.client.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+# Singleton instance
+ha_client_pool = HAClientPool(max_instances=settings.ha_pool_max_instances)
@@ -0,0 +1,167 @@
+"""
+Execution of recognized intents on the user's Home Assistant instance
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.entity_index import EntityIndex
+from app.exceptions import HomeAssistantError
+from app.ha_client import HAInstance, ha_client_pool
+
+logger = structlog.get_logger()
+
+# Intent -> (HA service, service data parameter); the domain is the target entity's
+_ACTIONS = {
+    "turn_on": ("turn_on", None),
+    "turn_off": ("turn_off", None),
+    "toggle": ("toggle", None),
+    "set_brightness": ("turn_on", "brightness_pct"),
+    "set_temperature": ("set_temperature", "temperature"),
+}
+
+# Domains whose services are not called turn_on/turn_off
+_DOMAIN_SERVICES = {
+    ("cover", "turn_on"): "open_cover",
+    ("cover", "turn_off"): "close_cover",
+}
+
+# Domain addressed by an intent whose target is an area, or missing
+_INTENT_DOMAINS = {
+    "turn_on": "light",
+    "turn_off": "light",
+    "toggle": "light",
+    "set_brightness": "light",
+    "set_temperature": "climate",
+}
+
+# Services that must not be repeated once HA may have received them
+_NON_IDEMPOTENT_SERVICES = frozenset({"toggle"})
+
+
+def _target_domain(intent_data: Dict[str, Any]) -> Optional[str]:
+    intent = intent_data.get("intent")
+    if intent == "get_status":
+        # "hány fok van a nappaliban": the room's thermostat
+        parameters = intent_data.get("parameters") or {}
+        return "climate" if parameters.get("attribute") == "temperature" else None
+    return _INTENT_DOMAINS.get(intent)
+
+
+def _target_entities(intent_data: Dict[str, Any], entity_index: Optional[EntityIndex]) -> List[str]:
+    """Entity IDs the intent addresses: the resolved entity, or the matching entities of an area"""
+    target = intent_data.get("target") or {}
+    if target.get("entity_id"):
+        return [target["entity_id"]]
+    domain = _target_domain(intent_data)
+    if entity_index is None or domain is None:
+        return []
+    name = (target.get("name") or "").strip()
+    if target.get("type") == "area" and name:
+        return entity_index.find(domain, name)
+    if not name:
+        # No target at all ("legyen 22 fok"): only unambiguous with a single such entity
+        found = entity_index.find(domain)
+        return found if len(found) == 1 else []
+    return []
+
+
+def _service_call(
+    intent_data: Dict[str, Any], entity_ids: List[str]
+) -> Tuple[str, str, Dict[str, Any]]:
+    """(domain, service, service data) of an action intent"""
+    intent = intent_data["intent"]
+    service, parameter = _ACTIONS[intent]
+    domain = entity_ids[0].split(".", 1)[0]
+    service = _DOMAIN_SERVICES.get((domain, intent), service)
+    data: Dict[str, Any] = {"entity_id": entity_ids[0] if len(entity_ids) == 1 else entity_ids}
+    if parameter is not None:
+        value = (intent_data.get("parameters") or {}).get(parameter)
+        if value is None:
+            raise HomeAssistantError(f"Missing parameter: {parameter}")
+        data[parameter] = value
+    return domain, service, data
+
+
+async def _read_state(
+    instance: HAInstance, entity_id: str, intent_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """State fields of a status query result"""
+    response = await ha_client_pool.request(
+        instance, "GET", f"/api/states/{entity_id}", "get_state"
+    )
+    data = response.json()
+    attributes = data.get("attributes") or {}
+    fields: Dict[str, Any] = {"state": data.get("state")}
+    parameters = intent_data.get("parameters") or {}
+    current_temperature = attributes.get("current_temperature")
+    if parameters.get("attribute") == "temperature" and current_temperature is not None:
+        fields.update(state=current_temperature, unit_of_measurement="fok")
+    elif attributes.get("unit_of_measurement"):
+        fields["unit_of_measurement"] = attributes["unit_of_measurement"]
+        # HA reports measurements as strings; numbers are spoken in Hungarian format
+        try:
+            fields["state"] = float(fields["state"])
+        except (TypeError, ValueError):
+            pass
+    if attributes.get("friendly_name"):
+        fields["friendly_name"] = attributes["friendly_name"]
+    return fields
+
+
+async def execute_intent(
+    instance: Optional[HAInstance],
+    intent_data: Dict[str, Any],
+    entity_index: Optional[EntityIndex],
+    expected: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Execute an intent on the user's HA instance
+
+    Args:
+        instance: The user's HA instance (None if not configured)
+        intent_data: Recognized intent, target resolved
+        entity_index: The user's entity index (for area targets)
+        expected: The result of a successful execution as far as it is
+            known in advance (``success``, ``entity_id``, ``friendly_name``)
+
+    Returns:
+        ``expected``, updated with ``state``/``unit_of_measurement`` for a
+        status query, or with ``success`` False and ``error`` on failure.
+        Intents without an HA action (e.g. unknown) return it unchanged.
+    """
+    intent = intent_data.get("intent")
+    result = dict(expected)
+    if intent not in _ACTIONS and intent != "get_status":
+        return result
+
+    try:
+        if instance is None:
+            raise HomeAssistantError("No Home Assistant instance configured")
+        entity_ids = _target_entities(intent_data, entity_index)
+        if not entity_ids:
+            raise HomeAssistantError("Target entity not found")
+
+        if intent == "get_status":
+            state = await _read_state(instance, entity_ids[0], intent_data)
+            # The resolved name wins over HA's, so the response names what the user said
+            if result.get("friendly_name"):
+                state.pop("friendly_name", None)
+            result.update(state)
+        else:
+            domain, service, data = _service_call(intent_data, entity_ids)
+            await ha_client_pool.request(
+                instance,
+                "POST",
+                f"/api/services/{domain}/{service}",
+                "call_service",
+                json=data,
+                idempotent=service not in _NON_IDEMPOTENT_SERVICES,
+            )
+    except HomeAssistantError as e:
+        logger.warning(
+            "ha_execution_failed", intent=intent, entity_id=result.get("entity_id"), error=e.detail
+        )
+        result.update(success=False, error=e.detail)
+    return result
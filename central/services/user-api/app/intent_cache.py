@@ -0,0 +1,159 @@
+"""
+Two-tier exact-match intent cache (in-process LRU + Redis)
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+from app.constants import INTENT_MIN_CONFIDENCE
+from app.prompt_builder import PROMPT_VERSION, prompt_history
+from app.prometheus_metrics import (
+    record_intent_cache_eviction,
+    record_intent_cache_hit,
+    record_intent_cache_miss,
+)
+
+logger = structlog.get_logger()
+
+INTENT_CACHE_PREFIX = "intent_cache:"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " .,!?;:"
+
+
+def normalize_utterance(text: str) -> str:
+    """Fold case and whitespace (and edge punctuation added by STT) of an utterance"""
+    return _WHITESPACE_RE.sub(" ", text.casefold()).strip(_EDGE_PUNCTUATION)
+
+
+def hash_context(
+    session_context: Optional[List[Dict[str, Any]]] = None,
+    ha_context: Optional[str] = None,
+) -> str:
+    """
+    Hash the parts of the context that actually reach the prompt
+
+    Only role and content of the messages within the prompt's history
+    budget are used, so timestamps and older history do not split the cache.
+    """
+    turns = []
+    for msg in prompt_history(session_context):
+        if isinstance(msg, dict):
+            turns.append([msg.get("role"), msg.get("content")])
+        else:
+            turns.append(["user", str(msg)])
+    payload = json.dumps({"turns": turns, "ha": ha_context or ""}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def build_cache_key(
+    text: str,
+    session_context: Optional[List[Dict[str, Any]]] = None,
+    ha_context: Optional[str] = None,
+) -> str:
+    """Build the cache key from normalized text, prompt version and context hash"""
+    context_hash = hash_context(session_context, ha_context)
+    raw = f"{PROMPT_VERSION}\x00{normalize_utterance(text)}\x00{context_hash}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IntentCache:
+    """
+    Exact-match cache of recognized intents
+
+    Lookups go to a bounded in-process LRU first, then to Redis (shared by
+    all workers). Redis hits are promoted into the local tier. Redis errors
+    are logged and treated as misses so the cache never fails a request.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, client: redis.Redis, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached intent
+
+        Args:
+            client: Redis client
+            key: Key from build_cache_key()
+
+        Returns:
+            A fresh copy of the cached intent dict, or None on miss
+        """
+        raw = self._get_local(key)
+        if raw is not None:
+            record_intent_cache_hit("local")
+            return json.loads(raw)
+
+        try:
+            raw = await client.get(f"{INTENT_CACHE_PREFIX}{key}")
+        except Exception as e:
+            logger.warning("intent_cache_redis_get_failed", error=str(e))
+            raw = None
+
+        if raw is None:
+            record_intent_cache_miss()
+            return None
+
+        record_intent_cache_hit("redis")
+        self._set_local(key, raw)
+        return json.loads(raw)
+
+    async def set(self, client: redis.Redis, key: str, intent_data: Dict[str, Any]) -> bool:
+        """
+        Store an intent if it is worth reusing
+
+        Unknown and low-confidence intents are not cached, since the user
+        will most likely rephrase them.
+
+        Returns:
+            True if the intent was stored
+        """
+        if intent_data.get("intent") in (None, "unknown"):
+            return False
+        if (intent_data.get("confidence") or 0.0) < INTENT_MIN_CONFIDENCE:
+            return False
+
+        raw = json.dumps(intent_data, ensure_ascii=False)
+        self._set_local(key, raw)
+        try:
+            await client.set(f"{INTENT_CACHE_PREFIX}{key}", raw, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning("intent_cache_redis_set_failed", error=str(e))
+        return True
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, raw = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            record_intent_cache_eviction("expired")
+            return None
+        self._local.move_to_end(key)
+        return raw
+
+    def _set_local(self, key: str, raw: str) -> None:
+        self._local[key] = (time.monotonic() + self.ttl_seconds, raw)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            record_intent_cache_eviction("capacity")
+
+
+# Singleton instance
+intent_cache = IntentCache(
+    max_entries=settings.intent_cache_max_entries,
+    ttl_seconds=settings.intent_cache_ttl_seconds,
+)
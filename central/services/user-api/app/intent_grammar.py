@@ -0,0 +1,308 @@
+"""
+Deterministic Hungarian command grammar - fast path in front of the LLM
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+# Accent folding keeps string length, so match offsets map back onto the original text
+_ACCENT_FOLD = str.maketrans("áéíóöőúüű", "aeiooouuu")
+_PUNCTUATION_RE = re.compile(r"[^\w%° ]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_POLITE_PREFIX_RE = re.compile(
+    r"^(?:(?:kerlek|legyszi|legy szives|legyen szives|most|hey|hello|szia)\s+)+"
+)
+_POLITE_SUFFIX_RE = re.compile(r"(?:\s+(?:kerlek|legyszi|legy szives|koszi|koszonom|most))+$")
+
+_ARTICLES = {"a", "az"}
+
+# Target phrases with these are compound, negated or qualified commands, left to the LLM
+_CONJUNCTIONS = frozenset({"es", "meg", "majd", "aztan", "vagy"})
+_NEGATIONS = frozenset({"ne", "nem", "se", "sem", "soha", "sose", "semmit"})
+_QUALIFIERS = frozenset({
+    "is", "csak", "mar", "most", "azonnal", "mindjart", "kesobb", "mulva", "utan", "mig", "amig",
+    "ha", "amikor", "ma", "holnap", "holnaputan", "reggel", "este", "ejjel", "ejszaka", "delben",
+    "delutan", "perc", "percre", "percig", "ora", "orara", "oraig", "masodperc",
+})
+# Imperative verbs, accent-folded ("oltsd", "nyisd", "tedd", "kapcsold", "zárd"); not "zöld"
+_COMMAND_VERB_RE = re.compile(r"\w+(?:sd|dd)|kapcsol(?:d|j|jad|nad|nal)|zar[dj]|huzd|emeld|novold")
+_DIGIT_RE = re.compile(r"\d")
+
+# Number words (accent-folded)
+_UNITS = {
+    "nulla": 0, "egy": 1, "ketto": 2, "ket": 2, "harom": 3, "negy": 4,
+    "ot": 5, "hat": 6, "het": 7, "nyolc": 8, "kilenc": 9,
+}
+_TENS = {
+    "tiz": 10, "husz": 20, "harminc": 30, "negyven": 40, "otven": 50,
+    "hatvan": 60, "hetven": 70, "nyolcvan": 80, "kilencven": 90, "szaz": 100,
+}
+_TENS_PREFIX = {
+    "tizen": 10, "huszon": 20, "harminc": 30, "negyven": 40, "otven": 50,
+    "hatvan": 60, "hetven": 70, "nyolcvan": 80, "kilencven": 90, "szaz": 100,
+}
+_NUMBER_SUFFIX_RE = re.compile(r"(?:ra|re|ig|on|en|nal|nel)$")
+
+# Reusable template fragments
+_FRAGMENTS = {
+    "on_verb": r"(?:(?:kapcsold|kapcsolj|kapcsoljad|kapcsolnad) (?:fel|be)|gyujtsd fel|inditsd el)",
+    "off_verb": (
+        r"(?:(?:kapcsold|kapcsolj|kapcsoljad|kapcsolnad) (?:le|ki)|oltsd (?:le|ki)|allitsd le)"
+    ),
+    "toggle_verb": r"(?:kapcsold at|valtsd(?: at)?)",
+    "set_verb": r"(?:(?:allitsd|allits|tedd|vedd)(?: (?:be|at|fel|le))?)",
+    "target": r"(?P<target>[\w ]+?)",
+    "number": r"(?P<number>\d+(?:[.,]\d+)?|[a-z]+(?: (?:es fel|egesz [a-z]+))?)",
+    "percent": r"(?: ?(?:%|szazalek)\w*(?: (?:ra|re|on|os))?)",
+    "degree": r"(?: ?(?:°|fok|celsius)\w*(?: (?:ra|re|on|os))?)",
+    "area": r"(?:az? )?(?P<area>\w+(?:ban|ben))",
+}
+
+# (intent, action, template, target is accusative, extra parameters)
+_TEMPLATES: List[Tuple[str, str, str, bool, Dict[str, Any]]] = [
+    ("set_brightness", "set", r"{set_verb} {target} fenyer\w* {number}{percent}", True, {}),
+    ("set_brightness", "set", r"{set_verb} {target} {number}{percent}", True, {}),
+    ("set_brightness", "set", r"{target} fenyer\w* (?:legyen )?{number}{percent}", False, {}),
+    (
+        "set_brightness", "set",
+        r"{set_verb} (?:a )?fenyer\w* {number}{percent}?(?: {area})?", False, {},
+    ),
+    (
+        "set_temperature", "set",
+        r"{set_verb} (?:a )?(?:homerseklet|futes)\w* {number}{degree}(?: {area})?", False, {},
+    ),
+    ("set_temperature", "set", r"{set_verb} {target} {number}{degree}", True, {}),
+    ("set_temperature", "set", r"legyen {number}{degree}(?: {area})?", False, {}),
+    ("turn_on", "on", r"{on_verb} {target}", True, {}),
+    ("turn_on", "on", r"{target} {on_verb}", True, {}),
+    ("turn_off", "off", r"{off_verb} {target}", True, {}),
+    ("turn_off", "off", r"{target} {off_verb}", True, {}),
+    ("toggle", "toggle", r"{toggle_verb} {target}", True, {}),
+    ("get_status", "unknown", r"milyen (?:allapotban|allasban) van {target}", False, {}),
+    ("get_status", "unknown", r"(?:mi|milyen) (?:az? )?{target} allapota", False, {}),
+    ("get_status", "unknown", r"be van kapcsolva {target}", False, {}),
+    (
+        "get_status", "unknown",
+        r"(?:hany fok van|mennyi a homerseklet)(?: {area})?", False, {"attribute": "temperature"},
+    ),
+]
+
+_COMPILED: List[Tuple[str, str, Pattern, bool, Dict[str, Any]]] = [
+    (intent, action, re.compile("^" + template.format(**_FRAGMENTS) + "$"), accusative, params)
+    for intent, action, template, accusative, params in _TEMPLATES
+]
+
+_RESPONSES = {
+    "turn_on": "Rendben, bekapcsolom: {name}.",
+    "turn_off": "Rendben, kikapcsolom: {name}.",
+    "toggle": "Rendben, átkapcsolom: {name}.",
+    "set_brightness": "Rendben, {name} fényereje {value:g} százalék lesz.",
+    "set_temperature": "Rendben, a hőmérsékletet {value:g} fokra állítom.",
+    "get_status": "Máris megnézem: {name}.",
+}
+
+
+def parse_hungarian_number(text: str) -> Optional[float]:
+    """
+    Parse a number written with digits or Hungarian number words
+
+    Handles compounds ("huszonkettő"), halves ("huszonkét és fél"),
+    decimals ("huszonkettő egész öt", "22,5") and case suffixes ("ötvenre").
+    Input is expected accent-folded and lowercase.
+
+    Returns:
+        The value, or None if the text is not a number
+    """
+    text = text.strip()
+    if not text:
+        return None
+    if re.fullmatch(r"\d+(?:[.,]\d+)?", text):
+        return float(text.replace(",", "."))
+
+    words = text.split()
+    if len(words) == 3 and words[1] == "es" and words[2] == "fel":
+        whole = _parse_number_word(words[0])
+        return whole + 0.5 if whole is not None else None
+    if len(words) == 3 and words[1] == "egesz":
+        whole = _parse_number_word(words[0])
+        fraction = _parse_number_word(words[2])
+        if whole is None or fraction is None:
+            return None
+        return whole + fraction / (10 ** len(str(int(fraction))))
+    if len(words) == 1:
+        return _parse_number_word(words[0])
+    return None
+
+
+def _parse_number_word(word: str) -> Optional[float]:
+    for candidate in (word, _NUMBER_SUFFIX_RE.sub("", word)):
+        if not candidate:
+            continue
+        if candidate in _UNITS:
+            return float(_UNITS[candidate])
+        if candidate in _TENS:
+            return float(_TENS[candidate])
+        for prefix, tens in _TENS_PREFIX.items():
+            if candidate.startswith(prefix) and candidate[len(prefix):] in _UNITS:
+                return float(tens + _UNITS[candidate[len(prefix):]])
+    return None
+
+
+def _normalize(text: str) -> str:
+    text = _PUNCTUATION_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _strip_accusative(word: str) -> str:
+    """Best-effort removal of the accusative -t suffix ("lámpát" -> "lámpa")"""
+    folded = word.translate(_ACCENT_FOLD)
+    if len(word) < 3 or not folded.endswith("t"):
+        return word
+    if word.endswith("át"):
+        return word[:-2] + "a"
+    if word.endswith("ét"):
+        # "tévét", "kávét": é-final device words are far more common than a
+        # lengthened -e ("kefét"), and the entity index folds accents anyway
+        return word[:-1]
+    if word[-2] in "aeoö" and folded[-3] not in "aeiou":
+        # Linking vowel: "lámpákat", "robotot", "zárat"
+        return word[:-2]
+    return word[:-1]
+
+
+def _strip_inessive(word: str) -> str:
+    """Turn an area word into its base form ("konyhában" -> "konyha")"""
+    stem = word[:-3]
+    if stem.endswith("á"):
+        return stem[:-1] + "a"
+    if stem.endswith("é"):
+        return stem[:-1] + "e"
+    return stem
+
+
+def is_command_verb(word: str) -> bool:
+    """Whether an accent-folded word is an imperative command verb ("kapcsold", "oltsd")"""
+    return _COMMAND_VERB_RE.fullmatch(word) is not None
+
+
+def _is_area_word(word: str) -> bool:
+    return word.translate(_ACCENT_FOLD).endswith(("ban", "ben")) and len(word) > 4
+
+
+def _is_plain_target(phrase: str, accusative: bool) -> bool:
+    """
+    Whether an accent-folded target phrase names one thing and nothing more
+
+    Conjunctions, negations, time and deferral qualifiers, numbers and
+    command verbs anywhere make it a longer sentence than the templates
+    cover. An accusative target must end with its device word ("lámpát"),
+    followed at most by an area ("a konyhában"); any other tail word is
+    unrecognised ("a lámpát ne", "a tévét holnapig").
+    """
+    words = phrase.split()
+    for word in words:
+        if word in _CONJUNCTIONS or word in _NEGATIONS or word in _QUALIFIERS:
+            return False
+        if _DIGIT_RE.search(word) or is_command_verb(word):
+            return False
+        if parse_hungarian_number(word) is not None:
+            return False
+    if not accusative:
+        return True
+    heads = [
+        position for position, word in enumerate(words) if word.endswith("t") and len(word) >= 3
+    ]
+    if not heads:
+        return False
+    return all(word in _ARTICLES or _is_area_word(word) for word in words[heads[-1] + 1:])
+
+
+def split_target(phrase: str, accusative: bool) -> Tuple[str, Optional[str]]:
+    """
+    Split a target phrase into (device name, area)
+
+    Articles are dropped and an inessive area word ("nappaliban") becomes
+    the area; with ``accusative`` the -t suffix of the last word is removed.
+    """
+    area = None
+    device: List[str] = []
+    for word in phrase.split():
+        if word in _ARTICLES:
+            continue
+        if _is_area_word(word):
+            area = _strip_inessive(word)
+            continue
+        device.append(word)
+    if accusative and device:
+        device[-1] = _strip_accusative(device[-1])
+    return " ".join(device), area
+
+
+def match_intent(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Match an utterance against the precompiled command templates
+
+    Args:
+        text: User input text
+
+    Returns:
+        Intent dictionary in the same shape as the LLM parser produces
+        (confidence 1.0), or None if no template matched
+    """
+    original = _normalize(text)
+    folded = original.translate(_ACCENT_FOLD)
+
+    prefix = _POLITE_PREFIX_RE.match(folded)
+    start = prefix.end() if prefix else 0
+    suffix = _POLITE_SUFFIX_RE.search(folded, start)
+    end = suffix.start() if suffix else len(folded)
+    original, folded = original[start:end], folded[start:end]
+
+    for intent, action, pattern, accusative, extra in _COMPILED:
+        match = pattern.match(folded)
+        if not match:
+            continue
+
+        groups = match.groupdict()
+        parameters: Dict[str, Any] = dict(extra)
+        value = None
+        if groups.get("number") is not None:
+            value = parse_hungarian_number(groups["number"])
+            if value is None:
+                continue
+            key = "brightness_pct" if intent == "set_brightness" else "temperature"
+            parameters[key] = int(value) if value.is_integer() else value
+            if intent == "set_brightness" and not 0 <= value <= 100:
+                continue
+
+        name, area = "", None
+        if groups.get("target") is not None:
+            if not _is_plain_target(groups["target"], accusative):
+                continue
+            phrase = original[match.start("target"):match.end("target")]
+            name, area = split_target(phrase, accusative)
+            if not name:
+                continue
+        if groups.get("area") is not None:
+            area = _strip_inessive(original[match.start("area"):match.end("area")])
+
+        if area and name:
+            name = f"{area} {name}"
+            target_type = "entity"
+        elif area:
+            name = area
+            target_type = "area"
+        else:
+            target_type = "entity" if name else "unknown"
+
+        return {
+            "intent": intent,
+            "target": {"type": target_type, "name": name},
+            "action": action,
+            "parameters": parameters,
+            "confidence": 1.0,
+            "response": _RESPONSES[intent].format(name=name or "otthon", value=value or 0),
+        }
+
+    return None
@@ -0,0 +1,99 @@
+"""
+JSON schema of the intent object the LLM must produce
+
+Sent as Ollama's structured-output ``format`` so generation is
+grammar-constrained to a parseable object, and used to coerce whatever
+comes back into the shape the rest of the pipeline expects.
+"""
+
+from typing import Any, Dict
+
+INTENT_TYPES = (
+    "turn_on",
+    "turn_off",
+    "get_status",
+    "toggle",
+    "set_brightness",
+    "set_temperature",
+    "get_info",
+    "unknown",
+)
+TARGET_TYPES = ("entity", "device", "area", "unknown")
+ACTIONS = ("on", "off", "toggle", "increase", "decrease", "set", "unknown")
+
+# Length caps keep the constrained output (and num_predict) bounded
+TARGET_NAME_MAX_LENGTH = 100
+RESPONSE_MAX_LENGTH = 200
+
+INTENT_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": list(INTENT_TYPES)},
+        "target": {
+            "type": "object",
+            "properties": {
+                "type": {"type": "string", "enum": list(TARGET_TYPES)},
+                "name": {"type": "string", "maxLength": TARGET_NAME_MAX_LENGTH},
+            },
+            "required": ["type", "name"],
+        },
+        "action": {"type": "string", "enum": list(ACTIONS)},
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "brightness_pct": {"type": "integer", "minimum": 0, "maximum": 100},
+                "temperature": {"type": "number"},
+                "attribute": {"type": "string"},
+            },
+        },
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "response": {"type": "string", "maxLength": RESPONSE_MAX_LENGTH},
+    },
+    "required": ["intent", "target", "action", "parameters", "confidence", "response"],
+}
+
+def coerce_intent(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Force a parsed intent object into the schema's shape
+
+    Missing fields get neutral defaults, unknown enum values become
+    ``unknown``, confidence is clamped to [0, 1] and a ``target.entity_id``
+    is dropped.
+
+    Args:
+        data: Parsed (possibly repaired or unconstrained) LLM output
+
+    Returns:
+        The same dict, normalized in place
+    """
+    if data.get("intent") not in INTENT_TYPES:
+        data["intent"] = "unknown"
+
+    target = data.get("target")
+    if isinstance(target, str):
+        target = {"type": "entity" if "." in target else "unknown", "name": target}
+    elif not isinstance(target, dict):
+        target = {}
+    if target.get("type") not in TARGET_TYPES:
+        target["type"] = "unknown"
+    target["name"] = str(target.get("name") or "")
+    # Set only by entity resolution: a model-chosen entity ID is never executed unchecked
+    target.pop("entity_id", None)
+    data["target"] = target
+
+    if data.get("action") not in ACTIONS:
+        data["action"] = "unknown"
+
+    if not isinstance(data.get("parameters"), dict):
+        data["parameters"] = {}
+
+    try:
+        confidence = float(data.get("confidence") or 0.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    data["confidence"] = min(max(confidence, 0.0), 1.0)
+
+    if not isinstance(data.get("response"), str):
+        data["response"] = None
+
+    return data
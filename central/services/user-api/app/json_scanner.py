@@ -0,0 +1,142 @@
+"""
+Incremental JSON object scanner for streamed LLM output
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONObjectScanner:
+    """
+    Track container nesting across streamed chunks
+
+    Text before the first ``{`` (e.g. a markdown code fence) is ignored.
+    Brackets inside string literals are skipped, so the scanner reports
+    completion exactly when the first top-level object is balanced; any
+    trailing text after it is ignored. A truncated object can be repaired
+    with ``repaired()``.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._length = 0
+        # Last position where the prefix is valid JSON once closed: (offset, closers)
+        self._cut: Optional[Tuple[int, str]] = None
+
+    @property
+    def complete(self) -> bool:
+        """True once the first top-level object has been closed"""
+        return self._end is not None
+
+    @property
+    def started(self) -> bool:
+        """True once the opening brace has been seen"""
+        return self._start is not None
+
+    @property
+    def buffer(self) -> str:
+        """Everything fed so far"""
+        return "".join(self._parts)
+
+    @property
+    def text(self) -> str:
+        """The object text if complete, otherwise everything from the opening brace"""
+        if self._start is None:
+            return ""
+        buffer = self.buffer
+        if self._end is None:
+            return buffer[self._start:]
+        return buffer[self._start:self._end]
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume a chunk of streamed text
+
+        Args:
+            chunk: Next piece of model output
+
+        Returns:
+            True if the top-level object is now complete
+        """
+        if self._end is not None:
+            return True
+
+        offset = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+
+        for i, char in enumerate(chunk):
+            if self._start is None:
+                if char == "{":
+                    self._start = offset + i
+                    self._stack = ["}"]
+                    self._mark_cut(offset + i + 1)
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(_CLOSERS[char])
+                self._mark_cut(offset + i + 1)
+            elif char in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self._end = offset + i + 1
+                    return True
+            elif char == ",":
+                self._mark_cut(offset + i)
+
+        return False
+
+    def _mark_cut(self, position: int) -> None:
+        self._cut = (position, "".join(reversed(self._stack)))
+
+    def repaired(self) -> Optional[str]:
+        """
+        Best-effort valid JSON for the object seen so far
+
+        A complete object is returned as is. A truncated one is closed:
+        first by terminating the open string and containers (keeps a
+        half-written response text), otherwise by cutting back to the last
+        complete member.
+
+        Returns:
+            JSON text that parses, or None if nothing usable was seen
+        """
+        if self._end is not None:
+            return self.text
+        if self._start is None:
+            return None
+
+        candidates = []
+        tail = self.text.rstrip()
+        if self._in_string:
+            tail = (tail[:-1] if self._escape else tail) + '"'
+        candidates.append(tail + "".join(reversed(self._stack)))
+        if self._cut is not None:
+            position, closers = self._cut
+            candidates.append(self.buffer[self._start:position] + closers)
+
+        for candidate in candidates:
+            try:
+                json.loads(candidate)
+            except ValueError:
+                continue
+            return candidate
+        return None
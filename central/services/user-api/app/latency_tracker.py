@@ -0,0 +1,80 @@
+"""
+Rolling latency distributions for adaptive timeouts and hedging
+"""
+
+import bisect
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.prometheus_metrics import record_llm_latency_quantiles
+
+# Upper bounds (estimated prompt tokens) of the prompt size buckets
+PROMPT_SIZE_BUCKETS = (256, 512, 1024, 2048)
+
+# Quantiles exported as gauges after each observation
+EXPORTED_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def prompt_size_bucket(prompt_tokens: int) -> str:
+    """Bucket label of a prompt size, e.g. "512" for 257-512 tokens"""
+    index = bisect.bisect_left(PROMPT_SIZE_BUCKETS, prompt_tokens)
+    if index == len(PROMPT_SIZE_BUCKETS):
+        return f"{PROMPT_SIZE_BUCKETS[-1]}+"
+    return str(PROMPT_SIZE_BUCKETS[index])
+
+
+class LatencyTracker:
+    """
+    Latency of the last ``window`` successful calls per model and prompt size
+
+    A size bucket with fewer than ``min_samples`` observations borrows
+    the model-wide distribution; with fewer than that too, no quantile is
+    reported and callers keep their fixed defaults.
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def observe(self, model: str, prompt_tokens: int, seconds: float) -> None:
+        """Add one successful call's latency"""
+        size = prompt_size_bucket(prompt_tokens)
+        for key in ((model, size), (model, "all")):
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+        samples = self._samples[(model, size)]
+        if len(samples) >= self.min_samples:
+            ordered = sorted(samples)
+            record_llm_latency_quantiles(
+                model,
+                size,
+                {q: self._pick(ordered, q) for q in EXPORTED_QUANTILES},
+            )
+
+    def quantile(self, model: str, prompt_tokens: int, q: float) -> Optional[float]:
+        """
+        Latency quantile for a call of this size
+
+        Args:
+            model: Model name
+            prompt_tokens: Estimated prompt size
+            q: Quantile in (0, 1]
+
+        Returns:
+            Seconds, or None if there are not enough observations yet
+        """
+        for key in ((model, prompt_size_bucket(prompt_tokens)), (model, "all")):
+            samples = self._samples.get(key)
+            if samples is not None and len(samples) >= self.min_samples:
+                return self._pick(sorted(samples), q)
+        return None
+
+    @staticmethod
+    def _pick(ordered: List[float], q: float) -> float:
+        # Nearest-rank quantile
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
@@ -0,0 +1,185 @@
+"""
+Fair-share scheduler for LLM requests
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.config import settings
+from app.constants import RequestPriority
+from app.exceptions import LLMError
+from app.ollama_pool import configured_backend_urls
+from app.prometheus_metrics import (
+    record_llm_queue_depth,
+    record_llm_queue_wait,
+    record_llm_slots_in_use,
+)
+
+logger = structlog.get_logger()
+
+# Lower rank is served first; a waiting interactive request always beats batch work
+PRIORITY_RANK = {
+    RequestPriority.INTERACTIVE: 0,
+    RequestPriority.BATCH: 1,
+}
+
+
+class _Waiter:
+    __slots__ = ("user_id", "priority", "future", "enqueued_at", "cancelled")
+
+    def __init__(self, user_id: str, priority: RequestPriority, future: "asyncio.Future[None]"):
+        self.user_id = user_id
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+
+class _PriorityClass:
+    """Weighted fair queue for one priority class (start-time fair queuing)"""
+
+    def __init__(self):
+        self.heap: List[Tuple[float, int, _Waiter]] = []
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.depth = 0
+
+
+class LLMScheduler:
+    """
+    Bound concurrent LLM calls and share the slots fairly between users
+
+    At most ``capacity`` calls run at once (Ollama's parallel slots).
+    Waiting requests are grouped by priority class; within a class each
+    user gets a share of the slots proportional to their weight, so one
+    chatty household cannot starve the others.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, weights: Optional[Dict[str, float]] = None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.weights = weights or {}
+        self._active = 0
+        self._seq = itertools.count()
+        self._classes: Dict[RequestPriority, _PriorityClass] = {
+            priority: _PriorityClass() for priority in PRIORITY_RANK
+        }
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot"""
+        return sum(cls.depth for cls in self._classes.values())
+
+    @property
+    def active(self) -> int:
+        """Number of slots in use"""
+        return self._active
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: str,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> AsyncIterator[None]:
+        """
+        Hold one LLM slot for the duration of the block
+
+        Args:
+            user_id: User the call is made for (fair-share key)
+            priority: Priority class of the call
+
+        Raises:
+            LLMError: If the wait queue is full
+        """
+        await self.acquire(user_id, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(
+        self, user_id: str, priority: RequestPriority = RequestPriority.INTERACTIVE
+    ) -> None:
+        """Wait for a free slot"""
+        if self._active < self.capacity and self.queued == 0:
+            self._active += 1
+            record_llm_slots_in_use(self._active)
+            record_llm_queue_wait(priority.value, 0.0)
+            return
+
+        if self.queued >= self.max_queue:
+            logger.warning("llm_queue_full", user_id=user_id, queued=self.queued)
+            raise LLMError("LLM request queue is full")
+
+        cls = self._classes[priority]
+        weight = self.weights.get(user_id, 1.0)
+        start = max(cls.virtual_time, cls.last_finish.get(user_id, 0.0))
+        finish = start + 1.0 / weight
+        cls.last_finish[user_id] = finish
+
+        waiter = _Waiter(user_id, priority, asyncio.get_running_loop().create_future())
+        heapq.heappush(cls.heap, (finish, next(self._seq), waiter))
+        cls.depth += 1
+        record_llm_queue_depth(priority.value, cls.depth)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just before cancellation; hand it on
+                self.release()
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                cls.depth -= 1
+                record_llm_queue_depth(priority.value, cls.depth)
+            raise
+
+    def try_acquire(self) -> bool:
+        """Take a free slot only if nobody is waiting (for opportunistic work like hedged calls)"""
+        if self._active >= self.capacity or self.queued:
+            return False
+        self._active += 1
+        record_llm_slots_in_use(self._active)
+        return True
+
+    def release(self) -> None:
+        """Return a slot and hand it to the next waiter, if any"""
+        self._active -= 1
+        waiter = self._next_waiter()
+        if waiter is not None:
+            self._active += 1
+            record_llm_queue_wait(waiter.priority.value, time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+        record_llm_slots_in_use(self._active)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in sorted(self._classes, key=PRIORITY_RANK.__getitem__):
+            cls = self._classes[priority]
+            while cls.heap:
+                finish, _, waiter = heapq.heappop(cls.heap)
+                if waiter.cancelled:
+                    continue
+                cls.depth -= 1
+                weight = self.weights.get(waiter.user_id, 1.0)
+                cls.virtual_time = max(cls.virtual_time, finish - 1.0 / weight)
+                record_llm_queue_depth(priority.value, cls.depth)
+                if not cls.heap:
+                    # Idle class: forget old finish tags so returning users start fresh
+                    cls.last_finish.clear()
+                    cls.virtual_time = 0.0
+                return waiter
+        return None
+
+
+# Singleton instance
+llm_scheduler = LLMScheduler(
+    capacity=settings.ollama_num_parallel * len(configured_backend_urls()),
+    max_queue=settings.llm_queue_max_size,
+    weights=settings.llm_user_weights,
+)
@@ -2,39 +2,396 @@
 LLM Service - Ollama integration for intent processing
 """
 
+import asyncio
 import structlog
 import httpx
 import json
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+from app.circuit_breaker import CircuitBreaker
 from app.config import settings
+from app.context_budget import estimate_tokens
 from app.exceptions import LLMError
-from app.prometheus_metrics import record_llm_request
+from app.intent_schema import INTENT_JSON_SCHEMA, coerce_intent
+from app.json_scanner import JSONObjectScanner
+from app.latency_tracker import LatencyTracker
+from app.llm_scheduler import llm_scheduler
+from app.ollama_pool import OllamaBackend, OllamaBackendPool, build_timeout, configured_backend_urls
+from app.prompt_builder import build_intent_prompt, build_user_prompt
+from app.prometheus_metrics import (
+    record_llm_hedge,
+    record_llm_parse,
+    record_llm_request,
+    record_llm_stream,
+    record_llm_timeout,
+    record_llm_timeout_budget,
+    record_llm_usage,
+)
 
 logger = structlog.get_logger()
 
 
+def _ns_to_ms(value: Optional[int]) -> Optional[int]:
+    return int(value / 1_000_000) if value is not None else None
+
+
+def extract_token_usage(response: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """
+    Token accounting from a final Ollama /api/generate response
+
+    Ollama reports durations in nanoseconds; they are converted to
+    milliseconds. ``prompt_eval_count`` is missing when the whole prompt
+    came from the KV cache, which is reported as 0 prompt tokens.
+
+    Args:
+        response: Non-streaming body or final ``done`` chunk
+
+    Returns:
+        Dict with prompt_tokens, completion_tokens, total_tokens,
+        prompt_eval_ms, eval_ms and load_ms (None where not reported)
+    """
+    completion_tokens = response.get("eval_count")
+    prompt_tokens = response.get("prompt_eval_count")
+    if prompt_tokens is None and response.get("done"):
+        prompt_tokens = 0
+    total = None
+    if prompt_tokens is not None or completion_tokens is not None:
+        total = (prompt_tokens or 0) + (completion_tokens or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total,
+        "prompt_eval_ms": _ns_to_ms(response.get("prompt_eval_duration")),
+        "eval_ms": _ns_to_ms(response.get("eval_duration")),
+        "load_ms": _ns_to_ms(response.get("load_duration")),
+    }
+
+
 class OllamaService:
     """Service for interacting with Ollama LLM"""
     
     def __init__(self):
-        self.base_url = settings.ollama_base_url
         self.model = settings.ollama_model
         self.timeout = settings.llm_timeout_seconds
+        self.pool = OllamaBackendPool(configured_backend_urls())
+        self.breaker = CircuitBreaker(
+            "ollama",
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            window_seconds=settings.llm_circuit_window_seconds,
+            open_seconds=settings.llm_circuit_open_seconds,
+            failure_exceptions=(LLMError,),
+        )
+        self.latency = LatencyTracker(settings.llm_latency_window, settings.llm_latency_min_samples)
+        self._probe_task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """Open backend clients and start re-probing ejected backends (called at app startup)"""
+        for backend in self.pool.backends:
+            backend.ensure_client()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+        logger.info(
+            "Ollama HTTP clients started",
+            backends=[backend.url for backend in self.pool.backends],
+            max_connections=settings.ollama_pool_max_connections,
+        )
+    
+    async def close(self) -> None:
+        """Stop probing and close all backend clients and their pooled connections"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        await self.pool.close()
+        logger.info("Ollama HTTP clients closed")
+    
+    async def _probe_loop(self) -> None:
+        """Re-admit ejected backends once check_health succeeds again"""
+        while True:
+            await asyncio.sleep(settings.ollama_probe_interval_seconds)
+            for backend in self.pool.due_for_probe():
+                if await self.check_health(backend):
+                    backend.readmit()
+                else:
+                    backend.eject()
+    
+    def _check_status(self, backend: OllamaBackend, response: httpx.Response) -> None:
+        """Raise LLMError on a non-200 response; server errors count against the backend"""
+        if response.status_code != 200:
+            if response.status_code >= 500:
+                backend.record_failure()
+            raise LLMError(f"Ollama returned status {response.status_code}")
+    
+    async def _post(
+        self,
+        backend: OllamaBackend,
+        path: str,
+        payload: Dict[str, Any],
+        timeout: float,
+    ) -> httpx.Response:
+        """POST to one Ollama backend over its shared client; LLMError on a non-200 response"""
+        backend.last_generate_at = time.monotonic()
+        async with backend.request() as extensions:
+            response = await backend.client.post(
+                path,
+                json=payload,
+                timeout=build_timeout(timeout),
+                extensions=extensions,
+            )
+            # Inside the block: a failed call must not count as a success
+            self._check_status(backend, response)
+        return response
+    
+    async def _generate_streaming(
+        self,
+        backend: OllamaBackend,
+        payload: Dict[str, Any],
+        timeout: float,
+        stop_early: bool = True,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Stream a generation and stop as soon as the top-level JSON object closes
+        
+        Reads Ollama's NDJSON token stream, feeding each token into an
+        incremental scanner. Leaving the stream early closes the connection,
+        which makes Ollama abort the rest of the generation.
+        
+        Args:
+            backend: Ollama backend to call
+            payload: /api/generate request body (``stream`` is forced on)
+            timeout: Read timeout between streamed chunks
+            stop_early: Stop once the JSON closes; disable when the final
+                chunk is needed (it carries ``context`` and the stats)
+            
+        Returns:
+            Tuple of the complete JSON object text (or the raw output if none
+            closed) and the final ``done`` chunk; if stopped early, only an
+            ``eval_count`` of the tokens streamed so far
+        """
+        scanner = JSONObjectScanner()
+        start_time = time.time()
+        streamed_tokens = 0
+        first_token_at: Optional[float] = None
+        json_complete_at: Optional[float] = None
+        early_stop = False
+        final: Dict[str, Any] = {}
+        backend.last_generate_at = time.monotonic()
+        
+        try:
+            async with backend.request() as extensions:
+                async with backend.client.stream(
+                    "POST",
+                    "/api/generate",
+                    json={**payload, "stream": True},
+                    timeout=build_timeout(timeout),
+                    extensions=extensions,
+                ) as response:
+                    self._check_status(backend, response)
+                    
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise LLMError(f"Ollama stream error: {chunk['error']}")
+                        
+                        token = chunk.get("response", "")
+                        if token:
+                            streamed_tokens += 1
+                            if first_token_at is None:
+                                first_token_at = time.time()
+                        
+                        if chunk.get("done"):
+                            final = chunk
+                        
+                        if json_complete_at is None and scanner.feed(token):
+                            json_complete_at = time.time()
+                            if stop_early and not chunk.get("done", False):
+                                early_stop = True
+                                # The stats chunk never arrives; count the tokens seen instead
+                                final = {"eval_count": streamed_tokens}
+                                break
+                        if chunk.get("done"):
+                            break
+        finally:
+            record_llm_stream(
+                model=self.model,
+                time_to_first_token=first_token_at - start_time if first_token_at else None,
+                time_to_json_complete=json_complete_at - start_time if json_complete_at else None,
+                early_stop=early_stop,
+            )
+        
+        return (scanner.text if scanner.complete else scanner.buffer.strip()), final
+    
+    async def _generate(
+        self,
+        backend: OllamaBackend,
+        payload: Dict[str, Any],
+        timeout: float,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Run a non-streaming generation and return the response text and full response body"""
+        response = await self._post(
+            backend,
+            "/api/generate",
+            {**payload, "stream": False},
+            timeout=timeout,
+        )
+        data = response.json()
+        return data.get("response", "").strip(), data
+    
+    def _generation_deadline(self, prompt_tokens: int) -> Tuple[float, str]:
+        """Deadline of one generation and its source: a multiple of observed p99, or the default"""
+        ceiling = self.timeout * 2
+        if settings.llm_adaptive_timeout_enabled:
+            p99 = self.latency.quantile(self.model, prompt_tokens, 0.99)
+            if p99 is not None:
+                deadline = max(
+                    p99 * settings.llm_timeout_p99_multiplier, settings.llm_timeout_min_seconds
+                )
+                return min(deadline, ceiling), "adaptive"
+        return ceiling, "fixed"
     
-    async def check_health(self) -> bool:
+    async def _generate_once(
+        self,
+        backend: OllamaBackend,
+        payload: Dict[str, Any],
+        return_context: bool,
+        prompt_tokens: int,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Run one generation and add its latency to the rolling distribution"""
+        start_time = time.monotonic()
+        if settings.llm_streaming_enabled:
+            result = await self._generate_streaming(
+                backend,
+                payload,
+                timeout=self.timeout * 2,
+                stop_early=not return_context,
+            )
+        else:
+            result = await self._generate(backend, payload, timeout=self.timeout * 2)
+        self.latency.observe(self.model, prompt_tokens, time.monotonic() - start_time)
+        return result
+    
+    async def _generate_hedged(
+        self,
+        backend: OllamaBackend,
+        payload: Dict[str, Any],
+        return_context: bool,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Run a generation under an adaptive deadline, hedging the slow tail
+        
+        The deadline follows the latency distribution of calls of this
+        model and prompt size. With hedging enabled, a call still running
+        at the hedge quantile (p95 by default) is duplicated onto an idle
+        scheduler slot and backend, and the first successful result wins;
+        the other call is cancelled, which closes its connection and makes
+        Ollama abort it.
+        
+        Args:
+            backend: Backend for the first call
+            payload: /api/generate request body
+            return_context: Read the generation to the end (see process_intent)
+            
+        Returns:
+            Response text and final chunk, as from _generate_streaming
+            
+        Raises:
+            asyncio.TimeoutError: If no call finished within the deadline
+        """
+        prompt_tokens = estimate_tokens(payload.get("system", "") + payload["prompt"])
+        prompt_tokens += len(payload.get("context") or [])
+        deadline, source = self._generation_deadline(prompt_tokens)
+        record_llm_timeout_budget(self.model, source, deadline)
+        
+        def attempt(target: OllamaBackend) -> asyncio.Future:
+            return asyncio.ensure_future(
+                self._generate_once(target, payload, return_context, prompt_tokens)
+            )
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        pending = {attempt(backend)}
+        hedge: Optional[asyncio.Future] = None
+        try:
+            hedge_after = None
+            if settings.llm_hedging_enabled:
+                hedge_after = self.latency.quantile(
+                    self.model, prompt_tokens, settings.llm_hedge_quantile
+                )
+            if hedge_after is not None and hedge_after < deadline:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    hedge_backend = self.pool.select_idle(exclude=backend)
+                    if hedge_backend is not None and llm_scheduler.try_acquire():
+                        hedge = attempt(hedge_backend)
+                        pending.add(hedge)
+                        record_llm_hedge(self.model, "fired")
+                        logger.info(
+                            "llm_request_hedged",
+                            backend=backend.url,
+                            hedge_backend=hedge_backend.url,
+                            after_ms=int(hedge_after * 1000),
+                        )
+                    else:
+                        record_llm_hedge(self.model, "no_capacity")
+            
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = deadline - (loop.time() - started)
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(remaining, 0.0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    record_llm_timeout(self.model, source)
+                    raise asyncio.TimeoutError(
+                        f"no response within {deadline:.1f}s ({source} deadline)"
+                    )
+                for task in done:
+                    if task.exception() is None:
+                        if hedge is not None:
+                            record_llm_hedge(self.model, "won" if task is hedge else "lost")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            if hedge is not None:
+                llm_scheduler.release()
+    
+    async def check_health(self, backend: Optional[OllamaBackend] = None) -> bool:
         """
         Check if Ollama service is healthy
         
+        Args:
+            backend: Backend to probe; if omitted, all backends are probed
+            
         Returns:
-            True if healthy, False otherwise
+            True if healthy (any backend healthy when probing all), False otherwise
         """
+        if backend is None:
+            results = await asyncio.gather(*(self.check_health(b) for b in self.pool.backends))
+            return any(results)
+        
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            async with backend.request() as extensions:
+                response = await backend.client.get(
+                    "/api/tags",
+                    timeout=build_timeout(settings.ollama_health_timeout_seconds),
+                    extensions=extensions,
+                )
+                self._check_status(backend, response)
+            return True
         except Exception as e:
-            logger.warning("Ollama health check failed", error=str(e))
+            logger.warning("Ollama health check failed", backend=backend.url, error=str(e))
             return False
     
     async def process_intent(
@@ -42,14 +399,23 @@ class OllamaService:
         user_text: str,
         ha_context: Optional[str] = None,
         session_context: Optional[list] = None,
+        llm_context: Optional[List[int]] = None,
+        return_context: bool = False,
+        affinity_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Process user input to extract intent using LLM
         
         Args:
             user_text: User input text from edge device
-            ha_context: Optional Home Assistant device/entity context
+            ha_context: Optional Home Assistant entities relevant to the utterance
             session_context: Optional list of previous messages for context
+            llm_context: Ollama ``context`` tokens from the previous turn of
+                this session; when given, only the new user turn is sent
+            return_context: Read the generation to the end and return the
+                new ``context`` tokens under ``llm_context``
+            affinity_key: Session key; keeps the session on one backend so
+                its KV-cache prefix stays warm
             
         Returns:
             Dictionary with intent information:
@@ -59,50 +425,90 @@ class OllamaService:
                 "action": "on|off|toggle|...",
                 "parameters": {...},
                 "confidence": 0.0-1.0,
-                "response": "Human-readable response text"
+                "response": "Human-readable response text",
+                "llm_usage": {...}  # extract_token_usage(); caller-private
             }
+            
+        Raises:
+            CircuitOpenError: Without calling Ollama while the breaker is open
+            LLMError: If the call fails
         """
+        async with self.breaker.guard():
+            return await self._process_intent(
+                user_text,
+                ha_context=ha_context,
+                session_context=session_context,
+                llm_context=llm_context,
+                return_context=return_context,
+                affinity_key=affinity_key,
+            )
+    
+    async def _process_intent(
+        self,
+        user_text: str,
+        ha_context: Optional[str],
+        session_context: Optional[list],
+        llm_context: Optional[List[int]],
+        return_context: bool,
+        affinity_key: Optional[str],
+    ) -> Dict[str, Any]:
+        """Run intent recognition against Ollama (see process_intent)"""
+        start_time = time.time()
+        success = False
+        
         try:
-            # Build prompt with context
-            prompt = self._build_prompt(user_text, ha_context, session_context)
+            backend = self.pool.select(affinity_key)
+            logger.info(
+                "Processing intent with LLM",
+                user_text=user_text[:50],
+                backend=backend.url,
+                context_tokens=len(llm_context) if llm_context else 0,
+            )
+            
+            # Call Ollama API; the model's own (Ministral-3) chat template is
+            # applied server-side, and keep_alive keeps the evaluated prefix warm
+            payload = {
+                "model": self.model,
+                "keep_alive": settings.ollama_keep_alive,
+                "options": {
+                    "temperature": settings.llm_temperature,
+                    "num_predict": settings.llm_num_predict,
+                }
+            }
+            if settings.llm_structured_output_enabled:
+                # Grammar-constrained decoding: the output always matches the intent schema
+                payload["format"] = INTENT_JSON_SCHEMA
+            if llm_context:
+                # Follow-up turn: system prompt and history are already in the context tokens
+                payload["prompt"] = build_user_prompt(user_text, ha_context=ha_context)
+                payload["context"] = llm_context
+            else:
+                # Build prompt with context: stable system prefix, volatile tail last
+                prompt = build_intent_prompt(user_text, ha_context, session_context)
+                payload["system"] = prompt.system
+                payload["prompt"] = prompt.prompt
             
-            logger.info("Processing intent with LLM", user_text=user_text[:50])
+            response_text, final = await self._generate_hedged(backend, payload, return_context)
             
-            start_time = time.time()
-            success = False
+            # Parse LLM response to extract intent
+            intent_data = self._parse_intent_response(response_text, user_text)
+            if return_context and final.get("context"):
+                intent_data["llm_context"] = final["context"]
             
-            # Call Ollama API with Ministral-3 parameters
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": settings.llm_temperature,
-                        }
-                    },
-                    timeout=self.timeout * 2  # Allow longer timeout for generation
-                )
-                
-                if response.status_code != 200:
-                    raise LLMError(f"Ollama returned status {response.status_code}")
-                
-                data = response.json()
-                response_text = data.get("response", "").strip()
-                
-                # Parse LLM response to extract intent
-                intent_data = self._parse_intent_response(response_text, user_text)
-                
-                success = True
-                logger.info("Intent processed successfully", 
-                           intent=intent_data.get("intent"),
-                           confidence=intent_data.get("confidence"))
-                
-                return intent_data
-                
-        except httpx.TimeoutException as e:
+            usage = extract_token_usage(final)
+            record_llm_usage(self.model, usage)
+            intent_data["llm_usage"] = usage
+            
+            success = True
+            logger.info("Intent processed successfully", 
+                       intent=intent_data.get("intent"),
+                       confidence=intent_data.get("confidence"),
+                       prompt_tokens=usage["prompt_tokens"],
+                       completion_tokens=usage["completion_tokens"])
+            
+            return intent_data
+            
+        except (httpx.TimeoutException, asyncio.TimeoutError) as e:
             logger.error("Ollama timeout", user_text=user_text[:50])
             raise LLMError(f"LLM timeout: {str(e)}")
         except Exception as e:
@@ -113,79 +519,13 @@ class OllamaService:
             duration = time.time() - start_time
             record_llm_request(model=self.model, duration=duration, success=success)
     
-    def _build_prompt(
-        self,
-        user_text: str,
-        ha_context: Optional[str] = None,
-        session_context: Optional[list] = None,
-    ) -> str:
-        """
-        Build prompt for LLM with context using Ministral-3 chat template
-        
-        Template format follows Ministral-3-3B-Instruct chat template:
-        - [SYSTEM_PROMPT]...[/SYSTEM_PROMPT] for system message
-        - [INST]...[/INST] for user messages
-        
-        Args:
-            user_text: User input
-            ha_context: Home Assistant context (available entities/devices)
-            session_context: Previous messages in this session
-            
-        Returns:
-            Formatted prompt string using Ministral-3 chat template
-        """
-        system_prompt = """You are a Home Assistant voice command interpreter specialized in Hungarian smart home control.
-
-Your task is to understand user voice commands and convert them into structured Home Assistant intents.
-
-You must respond ONLY with a valid JSON object (no markdown, no explanation, no code blocks) with this exact structure:
-{
-  "intent": "turn_on|turn_off|get_status|toggle|set_brightness|set_temperature|get_info|unknown",
-  "target": {"type": "entity|device|area|unknown", "name": "entity_id_or_name_or_empty_string"},
-  "action": "on|off|increase|decrease|set|unknown",
-  "parameters": {},
-  "confidence": 0.0-1.0,
-  "response": "Response text in Hungarian to speak back to user"
-}
-
-Rules:
-- Always respond with valid JSON, no extra text
-- If unsure, set confidence to 0.0 and ask for clarification in the response field
-- Use Hungarian language for all responses
-- Keep responses concise (1-2 sentences)
-- Be context-aware from previous messages"""
-
-        # Build prompt using Ministral-3 chat template format
-        prompt_parts = []
-        
-        # System prompt (required first)
-        prompt_parts.append(f"[SYSTEM_PROMPT]{system_prompt}[/SYSTEM_PROMPT]")
-        
-        # Add session context (previous messages)
-        if session_context and len(session_context) > 0:
-            for msg in session_context[-5:]:  # Last 5 messages for context window
-                if isinstance(msg, dict):
-                    if msg.get("role") == "user":
-                        prompt_parts.append(f"[INST]{msg.get('content', '')}[/INST]")
-                    elif msg.get("role") == "assistant":
-                        prompt_parts.append(msg.get('content', ''))
-                else:
-                    # Simple string format
-                    prompt_parts.append(f"[INST]{msg}[/INST]")
-        
-        # Add HA context if available
-        if ha_context:
-            prompt_parts.append(f"[INST]Available Home Assistant entities:\n{ha_context}[/INST]")
-        
-        # Add current user command (last [INST] block)
-        prompt_parts.append(f"[INST]{user_text}[/INST]")
-        
-        return "\n".join(prompt_parts)
-    
     def _parse_intent_response(self, response_text: str, original_input: str) -> Dict[str, Any]:
         """
         Parse LLM JSON response into intent structure
         
+        Tolerates markdown fences and trailing text, and repairs output cut
+        off by the token cap or an early stream stop.
+        
         Args:
             response_text: LLM response text
             original_input: Original user input (fallback)
@@ -193,30 +533,22 @@ Rules:
         Returns:
             Structured intent dictionary
         """
-        try:
-            # Try to extract JSON from response
-            json_str = response_text.strip()
-            
-            # If response contains markdown code blocks, extract the JSON
-            if "```json" in json_str:
-                json_str = json_str.split("```json")[1].split("```")[0].strip()
-            elif "```" in json_str:
-                json_str = json_str.split("```")[1].split("```")[0].strip()
-            
-            intent_data = json.loads(json_str)
-            
-            # Validate required fields
-            required_fields = ["intent", "target", "confidence", "response"]
-            for field in required_fields:
-                if field not in intent_data:
-                    intent_data[field] = None if field != "confidence" else 0.0
-            
-            return intent_data
-            
-        except json.JSONDecodeError as e:
+        scanner = JSONObjectScanner()
+        scanner.feed(response_text)
+        json_str = scanner.repaired()
+        
+        intent_data = None
+        if json_str is not None:
+            try:
+                intent_data = json.loads(json_str)
+            except json.JSONDecodeError:
+                intent_data = None
+        
+        if not isinstance(intent_data, dict):
+            record_llm_parse(self.model, "failed")
             logger.warning("Failed to parse LLM JSON response", 
                           response_text=response_text[:100],
-                          error=str(e))
+                          user_text=original_input[:50])
             # Return a fallback intent with low confidence
             return {
                 "intent": "unknown",
@@ -226,6 +558,31 @@ Rules:
                 "confidence": 0.0,
                 "response": "I didn't understand that command. Could you rephrase?"
             }
+        
+        if scanner.complete:
+            record_llm_parse(self.model, "ok")
+        else:
+            record_llm_parse(self.model, "repaired")
+            logger.info("Repaired truncated LLM JSON response", response_text=response_text[-50:])
+        
+        return coerce_intent(intent_data)
+    
+    def _response_payload(
+        self, intent: str, result: str, user_text: str, stream: bool
+    ) -> Dict[str, Any]:
+        prompt = f"""Given a Home Assistant command execution, generate a brief natural response in Hungarian.
+
+Command intent: {intent}
+Execution result: {result}
+User asked: {user_text}
+
+Provide a single sentence response to tell the user what was done. Be concise and natural."""  # noqa: E501
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": settings.ollama_keep_alive,
+        }
     
     async def generate_response(
         self,
@@ -245,33 +602,54 @@ Rules:
             Natural language response string
         """
         try:
-            prompt = f"""Given a Home Assistant command execution, generate a brief natural response in Hungarian.
-
-Command intent: {intent}
-Execution result: {result}
-User asked: {user_text}
-
-Provide a single sentence response to tell the user what was done. Be concise and natural."""
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                    },
-                    timeout=self.timeout * 2
-                )
-                
-                if response.status_code == 200:
-                    return response.json().get("response", "Kész.").strip()
-                else:
-                    return "Kész."
-                    
+            response = await self._post(
+                self.pool.select(),
+                "/api/generate",
+                self._response_payload(intent, result, user_text, stream=False),
+                timeout=self.timeout * 2
+            )
+            return response.json().get("response", "Kész.").strip()
         except Exception as e:
             logger.warning("Response generation failed", error=str(e))
             return "Parancs végrehajtva."
+    
+    async def stream_response(
+        self,
+        intent: str,
+        result: str,
+        user_text: str,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response of generate_response token by token
+        
+        Yields:
+            Text fragments as Ollama produces them
+            
+        Raises:
+            LLMError: On a non-200 response or a stream error
+            httpx.HTTPError: On transport errors
+        """
+        backend = self.pool.select()
+        backend.last_generate_at = time.monotonic()
+        async with backend.request() as extensions:
+            async with backend.client.stream(
+                "POST",
+                "/api/generate",
+                json=self._response_payload(intent, result, user_text, stream=True),
+                timeout=build_timeout(self.timeout * 2),
+                extensions=extensions,
+            ) as response:
+                self._check_status(backend, response)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise LLMError(f"Ollama stream error: {chunk['error']}")
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
 
 
 # Singleton instance
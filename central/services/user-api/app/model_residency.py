@@ -0,0 +1,224 @@
+"""
+Model warm-up and residency management for the Ollama backends
+
+Ollama unloads a model once its keep_alive expires, and the next request
+pays the full model load (seconds on a Raspberry Pi class disk). The
+keeper loads the model on every backend at startup, re-checks residency
+via /api/ps and refreshes keep_alive while the service is in use, so the
+load never lands on a voice command.
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import structlog
+
+from app.config import settings
+from app.llm_service import OllamaService, ollama_service
+from app.ollama_pool import OllamaBackend, build_timeout
+from app.prompt_builder import build_system_prompt, build_user_prompt
+from app.prometheus_metrics import record_model_load, record_model_residency
+
+logger = structlog.get_logger()
+
+# Utterance of the warm-up generation (also puts the system prefix into the KV cache)
+WARMUP_UTTERANCE = "kapcsold fel a nappali lámpát"
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def keep_alive_seconds(value: str) -> Optional[float]:
+    """
+    Parse an Ollama keep_alive value
+
+    Args:
+        value: Seconds ("300") or a Go duration ("30m", "1h30m")
+
+    Returns:
+        Seconds, or None if the model is kept loaded indefinitely
+        (negative values) or the value is not understood
+    """
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        if not parts or "".join(number + unit for number, unit in parts) != value.lstrip("-"):
+            return None
+        seconds = sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+        if value.startswith("-"):
+            seconds = -seconds
+    return seconds if seconds >= 0 else None
+
+
+class ModelResidencyKeeper:
+    """
+    Keep the model loaded on every Ollama backend
+
+    Startup warm-up runs in the background so liveness is answered at
+    once; ``ready`` stays False until some backend has the model loaded.
+    Every check interval each healthy backend is asked which models it has
+    loaded: an evicted model is reloaded with a full warm-up, and a
+    resident one gets a cheap empty-prompt load to refresh its keep_alive
+    when no request has done so for half the keep_alive period.
+    """
+
+    def __init__(self, service: OllamaService):
+        self.service = service
+        self._task: Optional[asyncio.Task] = None
+        self._refreshed_at: Dict[str, float] = {}
+        self._started_at = 0.0
+        self._warmed_up = False
+        self._released = False
+
+    @property
+    def ready(self) -> bool:
+        """True once the model is resident on at least one backend"""
+        if not settings.ollama_warmup_enabled:
+            return True
+        return self._warmed_up and bool(self.service.pool.resident_backends())
+
+    async def start(self) -> None:
+        """Start warm-up and the residency loop (called from the app lifespan)"""
+        if not settings.ollama_warmup_enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        self._started_at = start_time = time.monotonic()
+        await asyncio.gather(*(self._load(b, "startup") for b in self.service.pool.backends))
+        self._warmed_up = True
+        logger.info(
+            "model_warmup_finished",
+            model=self.service.model,
+            resident=[b.url for b in self.service.pool.resident_backends()],
+            duration_ms=int((time.monotonic() - start_time) * 1000),
+        )
+        while True:
+            await asyncio.sleep(settings.ollama_residency_check_seconds)
+            await self.check()
+
+    async def check(self) -> None:
+        """One residency pass over the healthy backends"""
+        backends = self.service.pool.healthy_backends()
+        idle_limit = settings.ollama_residency_idle_seconds
+        if idle_limit:
+            last_traffic = max(b.last_generate_at for b in self.service.pool.backends)
+            idle = time.monotonic() - max(last_traffic, self._started_at) > idle_limit
+            if idle != self._released:
+                self._released = idle
+                event = "model_residency_released" if idle else "model_residency_resumed"
+                logger.info(event, idle_limit=idle_limit)
+            if idle:
+                return
+        await asyncio.gather(*(self._check_backend(b) for b in backends))
+
+    async def _check_backend(self, backend: OllamaBackend) -> None:
+        resident = await self._is_resident(backend)
+        self._set_resident(backend, resident)
+        if not resident:
+            logger.warning("model_not_resident", backend=backend.url, model=self.service.model)
+            await self._load(backend, "evicted")
+            return
+
+        period = keep_alive_seconds(settings.ollama_keep_alive)
+        last_used = max(backend.last_generate_at, self._refreshed_at.get(backend.url, 0.0))
+        if period is not None and time.monotonic() - last_used > period / 2:
+            await self._load(backend, "refresh")
+
+    async def _is_resident(self, backend: OllamaBackend) -> bool:
+        try:
+            response = await backend.client.get(
+                "/api/ps",
+                timeout=build_timeout(settings.ollama_health_timeout_seconds),
+            )
+            if response.status_code != 200:
+                return False
+            models = response.json().get("models") or []
+        except httpx.TransportError as e:
+            backend.record_failure()
+            logger.warning("model_residency_check_failed", backend=backend.url, error=str(e))
+            return False
+        except Exception as e:
+            logger.warning("model_residency_check_failed", backend=backend.url, error=str(e))
+            return False
+        return any(self.service.model in (m.get("name"), m.get("model")) for m in models)
+
+    async def _load(self, backend: OllamaBackend, reason: str) -> None:
+        """
+        Load the model on a backend
+
+        Startup and post-eviction loads run a one-token generation with the
+        system prompt, which also caches the shared prompt prefix; a
+        refresh only sends an empty prompt, which loads the model (a no-op
+        when resident) and restarts its keep_alive timer.
+        """
+        payload: Dict[str, Any] = {
+            "model": self.service.model,
+            "keep_alive": settings.ollama_keep_alive,
+            "stream": False,
+        }
+        if reason == "refresh":
+            payload["prompt"] = ""
+        else:
+            payload["system"] = build_system_prompt()
+            payload["prompt"] = build_user_prompt(WARMUP_UTTERANCE)
+            payload["options"] = {"temperature": settings.llm_temperature, "num_predict": 1}
+
+        start_time = time.monotonic()
+        success = False
+        try:
+            # Bypasses backend.request(): load time must not skew the routing latency
+            response = await backend.client.post(
+                "/api/generate",
+                json=payload,
+                timeout=build_timeout(settings.ollama_warmup_timeout_seconds),
+            )
+            success = response.status_code == 200
+            if not success:
+                logger.warning(
+                    "model_load_failed",
+                    backend=backend.url,
+                    reason=reason,
+                    status_code=response.status_code,
+                )
+        except httpx.TransportError as e:
+            # An unreachable backend is ejected like on a failed request
+            backend.record_failure()
+            logger.warning("model_load_failed", backend=backend.url, reason=reason, error=str(e))
+        except Exception as e:
+            logger.warning("model_load_failed", backend=backend.url, reason=reason, error=str(e))
+        duration = time.monotonic() - start_time
+        record_model_load(backend.url, reason, duration, success)
+
+        self._refreshed_at[backend.url] = time.monotonic()
+        self._set_resident(backend, success)
+        if success and reason != "refresh":
+            logger.info(
+                "model_loaded",
+                backend=backend.url,
+                reason=reason,
+                duration_ms=int(duration * 1000),
+            )
+
+    @staticmethod
+    def _set_resident(backend: OllamaBackend, resident: bool) -> None:
+        backend.resident = resident
+        record_model_residency(backend.url, resident)
+
+
+# Singleton instance
+model_keeper = ModelResidencyKeeper(ollama_service)
@@ -58,7 +58,14 @@ class AuditLog(Base):
     ha_response = Column(JSON, nullable=True)
     status = Column(String(STATUS_MAX_LENGTH), nullable=False)
     latency_ms = Column(Integer, nullable=True)
-    llm_tokens = Column(Integer, nullable=True)
+    llm_tokens = Column(Integer, nullable=True)  # prompt + completion
+    llm_prompt_tokens = Column(Integer, nullable=True)
+    llm_completion_tokens = Column(Integer, nullable=True)
+    llm_prompt_eval_ms = Column(Integer, nullable=True)
+    llm_eval_ms = Column(Integer, nullable=True)
+    llm_load_ms = Column(Integer, nullable=True)
+    # Pipeline stage -> wall time, for the stages before the audit write
+    stage_timings_ms = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
     request_id = Column(String(REQUEST_ID_LENGTH), unique=True, index=True)
 
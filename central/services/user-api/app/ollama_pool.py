@@ -0,0 +1,234 @@
+"""
+Ollama backend pool with health-weighted, session-sticky routing
+"""
+
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import structlog
+
+from app.config import settings
+from app.prometheus_metrics import (
+    record_llm_pool_acquire,
+    record_llm_pool_release,
+    record_ollama_backend_ejection,
+    record_ollama_backend_request,
+    record_ollama_backend_state,
+)
+
+logger = structlog.get_logger()
+
+# Latency assumed for a backend before it has served anything
+_DEFAULT_LATENCY_SECONDS = 1.0
+
+
+def configured_backend_urls() -> List[str]:
+    """Ollama endpoints from settings (OLLAMA_BASE_URLS, else OLLAMA_BASE_URL)"""
+    return list(settings.ollama_base_urls) or [settings.ollama_base_url]
+
+
+def build_timeout(read_seconds: float) -> httpx.Timeout:
+    """Per-call timeout: short connect phase, caller-specific read/pool budget"""
+    return httpx.Timeout(
+        read_seconds,
+        connect=settings.ollama_connect_timeout_seconds,
+        pool=read_seconds,
+    )
+
+
+class OllamaBackend:
+    """One Ollama node: its keep-alive HTTP client plus routing statistics"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        # Maintained by the model residency keeper
+        self.resident = False
+        self.last_generate_at = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client; created lazily when used outside the app lifespan"""
+        return self.ensure_client()
+
+    def ensure_client(self) -> httpx.AsyncClient:
+        """Create the HTTP client if it does not exist yet, and return it"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                limits=httpx.Limits(
+                    max_connections=settings.ollama_pool_max_connections,
+                    max_keepalive_connections=settings.ollama_pool_max_keepalive,
+                    keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+                ),
+                timeout=build_timeout(settings.llm_timeout_seconds),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def score(self) -> float:
+        """Expected cost of sending one more request here (lower is better)"""
+        latency = self.latency_ewma if self.latency_ewma is not None else _DEFAULT_LATENCY_SECONDS
+        return latency * (self.in_flight + 1)
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Account one request against this backend
+
+        Tracks in-flight count and latency, marks transport errors as
+        failures, and yields httpx request extensions with a trace hook that
+        detects whether the request opened a new TCP connection or reused a
+        keep-alive one. Only a block that exits without an exception counts
+        as a success, so callers check the response status inside it.
+        """
+        waited = self.in_flight >= settings.ollama_pool_max_connections
+        self.in_flight += 1
+        record_llm_pool_acquire(backend=self.url, in_use=self.in_flight, waited=waited)
+        record_ollama_backend_state(self.url, self.in_flight, self.latency_ewma, self.healthy)
+        opened = False
+        start_time = time.monotonic()
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            nonlocal opened
+            if event_name == "connection.connect_tcp.started":
+                opened = True
+
+        try:
+            yield {"trace": trace}
+        except httpx.TransportError:
+            self.record_failure()
+            raise
+        else:
+            self.record_success(time.monotonic() - start_time)
+        finally:
+            self.in_flight -= 1
+            record_llm_pool_release(backend=self.url, in_use=self.in_flight, new_connection=opened)
+            record_ollama_backend_state(self.url, self.in_flight, self.latency_ewma, self.healthy)
+
+    def record_success(self, duration: float) -> None:
+        alpha = settings.ollama_latency_ewma_alpha
+        if self.latency_ewma is None:
+            self.latency_ewma = duration
+        else:
+            self.latency_ewma = alpha * duration + (1 - alpha) * self.latency_ewma
+        self.consecutive_failures = 0
+        record_ollama_backend_request(self.url, success=True)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        record_ollama_backend_request(self.url, success=False)
+        if self.healthy and self.consecutive_failures >= settings.ollama_eject_after_failures:
+            self.eject()
+
+    def eject(self) -> None:
+        self.ejected_until = time.monotonic() + settings.ollama_eject_seconds
+        if not self.healthy:
+            # Failed re-probe: just extend the ejection
+            return
+        self.healthy = False
+        record_ollama_backend_ejection(self.url)
+        record_ollama_backend_state(self.url, self.in_flight, self.latency_ewma, self.healthy)
+        logger.warning(
+            "ollama_backend_ejected", backend=self.url, failures=self.consecutive_failures
+        )
+
+    def readmit(self) -> None:
+        self.healthy = True
+        self.consecutive_failures = 0
+        record_ollama_backend_state(self.url, self.in_flight, self.latency_ewma, self.healthy)
+        logger.info("ollama_backend_readmitted", backend=self.url)
+
+
+class OllamaBackendPool:
+    """
+    Route requests across Ollama nodes
+
+    Requests with an affinity key (the session) stick to one node chosen by
+    rendezvous hashing, so the node's KV-cache prefix for that session stays
+    warm. Affinity is dropped when the sticky node is far busier than the
+    best one. Requests without a key go to the node with the lowest
+    latency x in-flight score. Unhealthy nodes are ejected and re-probed;
+    nodes without the model loaded are skipped while any node has it.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.backends = [OllamaBackend(url) for url in urls]
+
+    def healthy_backends(self) -> List[OllamaBackend]:
+        return [backend for backend in self.backends if backend.healthy]
+
+    def resident_backends(self) -> List[OllamaBackend]:
+        """Healthy backends with the model loaded"""
+        return [backend for backend in self.backends if backend.healthy and backend.resident]
+
+    def due_for_probe(self) -> List[OllamaBackend]:
+        """Ejected backends whose ejection period has passed"""
+        now = time.monotonic()
+        return [b for b in self.backends if not b.healthy and b.ejected_until <= now]
+
+    def select(self, affinity_key: Optional[str] = None) -> OllamaBackend:
+        """
+        Pick the backend for one request
+
+        Args:
+            affinity_key: Session key for sticky routing, or None
+
+        Returns:
+            The chosen backend: preferably one with the model loaded (a
+            cold node would make this request pay the model load); falls
+            back to all nodes if none is healthy
+        """
+        candidates = self.resident_backends() or self.healthy_backends() or self.backends
+        if len(candidates) == 1:
+            return candidates[0]
+
+        best = min(candidates, key=OllamaBackend.score)
+        if affinity_key is None:
+            return best
+
+        sticky = max(candidates, key=lambda backend: self._rendezvous(affinity_key, backend.url))
+        if sticky.score() > best.score() * settings.ollama_sticky_max_skew:
+            return best
+        return sticky
+
+    def select_idle(self, exclude: OllamaBackend) -> Optional[OllamaBackend]:
+        """
+        Pick a backend with a free parallel slot for a hedged duplicate
+
+        Args:
+            exclude: Backend already serving the call; used only if no
+                other node has a free slot
+
+        Returns:
+            The least loaded such backend, or None if all slots are busy
+        """
+        candidates = [
+            backend for backend in (self.resident_backends() or self.healthy_backends())
+            if backend.in_flight < settings.ollama_num_parallel
+        ]
+        others = [backend for backend in candidates if backend is not exclude]
+        candidates = others or candidates
+        return min(candidates, key=OllamaBackend.score) if candidates else None
+
+    @staticmethod
+    def _rendezvous(key: str, url: str) -> int:
+        digest = hashlib.blake2b(f"{key}\x00{url}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    async def close(self) -> None:
+        for backend in self.backends:
+            await backend.close()
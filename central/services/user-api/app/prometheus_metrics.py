@@ -7,6 +7,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 import time
+from typing import Dict, Optional
 import structlog
 
 logger = structlog.get_logger()
@@ -26,7 +27,7 @@ REQUEST_LATENCY = Histogram(
     'http_request_duration_seconds',
     'HTTP request latency in seconds',
     ['method', 'endpoint'],
-    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 5.0, 10.0, 30.0),
     registry=REGISTRY
 )
 
@@ -59,6 +60,383 @@ LLM_REQUEST_COUNT = Counter(
     registry=REGISTRY
 )
 
+LLM_TOKENS = Histogram(
+    'llm_tokens_per_request',
+    'Tokens per LLM request (prompt = evaluated prompt tokens, completion = generated tokens)',
+    ['model', 'kind'],
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096),
+    registry=REGISTRY
+)
+
+LLM_TOKENS_PER_SECOND = Histogram(
+    'llm_tokens_per_second',
+    'LLM throughput per request (prompt_eval = prefill, eval = decoding)',
+    ['model', 'phase'],
+    buckets=(5, 10, 20, 40, 80, 160, 320, 640, 1280, 2560),
+    registry=REGISTRY
+)
+
+LLM_MODEL_LOAD = Histogram(
+    'llm_model_load_seconds',
+    'Time Ollama spent loading the model for a request',
+    ['model'],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=REGISTRY
+)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds',
+    'Time from streaming request start to the first generated token',
+    ['model'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+    registry=REGISTRY
+)
+
+LLM_TIME_TO_JSON_COMPLETE = Histogram(
+    'llm_time_to_json_complete_seconds',
+    'Time from streaming request start to a balanced top-level JSON object',
+    ['model'],
+    buckets=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0),
+    registry=REGISTRY
+)
+
+LLM_STREAM_EARLY_STOPS = Counter(
+    'llm_stream_early_stops_total',
+    'Streaming generations cut off once the intent JSON was complete',
+    ['model'],
+    registry=REGISTRY
+)
+
+ENTITY_INDEX_REFRESH = Histogram(
+    'ha_entity_index_refresh_seconds',
+    'Time to fetch and (re)index a user\'s Home Assistant entities',
+    ['mode'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=REGISTRY
+)
+
+ENTITY_INDEX_CHANGES = Counter(
+    'ha_entity_index_changes_total',
+    'Entities added, changed or removed by index refreshes',
+    registry=REGISTRY
+)
+
+ENTITY_CONTEXT_SIZE = Histogram(
+    'ha_entity_context_entities',
+    'Entities included in the LLM prompt context per request',
+    buckets=(0, 1, 2, 4, 8, 16, 32),
+    registry=REGISTRY
+)
+
+ENTITY_RESOLUTION = Counter(
+    'ha_entity_resolution_total',
+    'Intent target resolutions to an entity_id (exact, fuzzy, unresolved)',
+    ['method'],
+    registry=REGISTRY
+)
+
+ENTITY_RESOLUTION_SCORE = Histogram(
+    'ha_entity_resolution_score',
+    'Similarity score of the best entity for an intent target',
+    buckets=(0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+    registry=REGISTRY
+)
+
+RESPONSE_RENDER_PATH = Counter(
+    'response_render_path_total',
+    'How spoken responses were produced (template, llm, intent, fallback)',
+    ['path'],
+    registry=REGISTRY
+)
+
+CIRCUIT_STATE = Gauge(
+    'circuit_breaker_state',
+    'Circuit breaker state (0 = closed, 1 = half-open, 2 = open)',
+    ['circuit'],
+    registry=REGISTRY
+)
+
+CIRCUIT_TRANSITIONS = Counter(
+    'circuit_breaker_transitions_total',
+    'Circuit breaker state transitions',
+    ['circuit', 'from_state', 'to_state'],
+    registry=REGISTRY
+)
+
+LLM_LATENCY_QUANTILE = Gauge(
+    'llm_latency_quantile_seconds',
+    'Rolling LLM call latency quantiles per prompt size bucket (estimated tokens)',
+    ['model', 'prompt_size', 'quantile'],
+    registry=REGISTRY
+)
+
+LLM_TIMEOUT_BUDGET = Histogram(
+    'llm_timeout_budget_seconds',
+    'Generation deadline given to LLM calls (adaptive from the latency distribution, or fixed)',
+    ['model', 'source'],
+    buckets=(1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0),
+    registry=REGISTRY
+)
+
+LLM_TIMEOUTS = Counter(
+    'llm_timeouts_total',
+    'LLM calls that ran past their generation deadline',
+    ['model', 'source'],
+    registry=REGISTRY
+)
+
+LLM_HEDGED_REQUESTS = Counter(
+    'llm_hedged_requests_total',
+    'Hedged LLM calls (fired: duplicate sent; won/lost: duplicate finished first or not; '
+    'no_capacity: nothing idle)',
+    ['model', 'outcome'],
+    registry=REGISTRY
+)
+
+INTENT_STREAM_LATENCY = Histogram(
+    'intent_stream_latency_seconds',
+    'Streaming intent requests: time to the intent event, to the first response sentence '
+    '(time to first audio) and to completion',
+    ['event'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0),
+    registry=REGISTRY
+)
+
+INTENT_STAGE_LATENCY = Histogram(
+    'intent_stage_duration_seconds',
+    'Wall time of each intent pipeline stage (auth, session_load, entity_index, llm, ha_exec, '
+    'render_draft, render, audit, session_write)',
+    ['stage'],
+    # Millisecond Redis/DB stages up to multi-second LLM calls; 2.0 is the end-to-end target
+    buckets=(
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+        1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0,
+    ),
+    registry=REGISTRY
+)
+
+HA_REQUEST_LATENCY = Histogram(
+    'ha_request_duration_seconds',
+    'Home Assistant API call latency per attempt, by instance host and operation',
+    ['instance', 'operation'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY
+)
+
+HA_REQUEST_ERRORS = Counter(
+    'ha_request_errors_total',
+    'Failed Home Assistant API attempts (connect, timeout, transport, http_<status>)',
+    ['instance', 'operation', 'reason'],
+    registry=REGISTRY
+)
+
+HA_RETRIES = Counter(
+    'ha_request_retries_total',
+    'Home Assistant API calls retried',
+    ['instance', 'operation'],
+    registry=REGISTRY
+)
+
+HA_CLIENT_POOLS = Gauge(
+    'ha_client_pools',
+    'Per-user Home Assistant connection pools kept open',
+    registry=REGISTRY
+)
+
+AUDIT_QUEUE_DEPTH = Gauge(
+    'audit_queue_depth',
+    'Audit rows waiting for the background writer',
+    registry=REGISTRY
+)
+
+AUDIT_RECORDS_DROPPED = Counter(
+    'audit_records_dropped_total',
+    'Audit rows dropped (queue_full, write_failed, shutdown)',
+    ['reason'],
+    registry=REGISTRY
+)
+
+AUDIT_RECORDS_WRITTEN = Counter(
+    'audit_records_written_total',
+    'Audit rows inserted by the background writer',
+    registry=REGISTRY
+)
+
+AUDIT_FLUSH_DURATION = Histogram(
+    'audit_flush_duration_seconds',
+    'Duration of one bulk audit INSERT',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY
+)
+
+WS_CONNECTIONS = Gauge(
+    'ws_connections',
+    'Open authenticated edge WebSocket connections',
+    registry=REGISTRY
+)
+
+WS_MESSAGES = Counter(
+    'ws_messages_total',
+    'Edge WebSocket frames by type '
+    '(received: intent, ping, pong, auth, invalid; sent: result, error)',
+    ['type'],
+    registry=REGISTRY
+)
+
+OLLAMA_MODEL_RESIDENT = Gauge(
+    'ollama_model_resident',
+    'Whether the model is loaded on an Ollama backend (1) or not (0)',
+    ['backend'],
+    registry=REGISTRY
+)
+
+OLLAMA_MODEL_LOADS = Counter(
+    'ollama_model_loads_total',
+    'Model loads and keep-alive refreshes issued by the residency keeper',
+    ['backend', 'reason', 'outcome'],
+    registry=REGISTRY
+)
+
+OLLAMA_MODEL_LOAD_DURATION = Histogram(
+    'ollama_model_load_duration_seconds',
+    'Duration of keeper-issued model loads (startup warm-up, reload after eviction)',
+    ['backend', 'reason'],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0),
+    registry=REGISTRY
+)
+
+LLM_PARSE_RESULTS = Counter(
+    'llm_parse_results_total',
+    'LLM intent output parse outcomes (ok, repaired, failed)',
+    ['model', 'outcome'],
+    registry=REGISTRY
+)
+
+LLM_POOL_CONNECTIONS_IN_USE = Gauge(
+    'llm_pool_connections_in_use',
+    'Ollama requests currently holding a pooled HTTP connection',
+    ['backend'],
+    registry=REGISTRY
+)
+
+LLM_POOL_WAITS = Counter(
+    'llm_pool_waits_total',
+    'Ollama requests that had to wait for a free pooled HTTP connection',
+    ['backend'],
+    registry=REGISTRY
+)
+
+LLM_POOL_CONNECTIONS = Counter(
+    'llm_pool_connections_total',
+    'Ollama requests by connection origin (new or reused keep-alive connection)',
+    ['backend', 'origin'],
+    registry=REGISTRY
+)
+
+LLM_POOL_REUSE_RATIO = Gauge(
+    'llm_pool_connection_reuse_ratio',
+    'Share of Ollama requests served over a reused keep-alive connection',
+    ['backend'],
+    registry=REGISTRY
+)
+
+OLLAMA_BACKEND_IN_FLIGHT = Gauge(
+    'ollama_backend_in_flight',
+    'Requests in flight per Ollama backend',
+    ['backend'],
+    registry=REGISTRY
+)
+
+OLLAMA_BACKEND_LATENCY = Gauge(
+    'ollama_backend_latency_ewma_seconds',
+    'Exponentially weighted request latency per Ollama backend',
+    ['backend'],
+    registry=REGISTRY
+)
+
+OLLAMA_BACKEND_HEALTHY = Gauge(
+    'ollama_backend_healthy',
+    'Whether an Ollama backend is in rotation (1) or ejected (0)',
+    ['backend'],
+    registry=REGISTRY
+)
+
+OLLAMA_BACKEND_REQUESTS = Counter(
+    'ollama_backend_requests_total',
+    'Requests per Ollama backend by outcome',
+    ['backend', 'status'],
+    registry=REGISTRY
+)
+
+OLLAMA_BACKEND_EJECTIONS = Counter(
+    'ollama_backend_ejections_total',
+    'Times an Ollama backend was ejected from rotation',
+    ['backend'],
+    registry=REGISTRY
+)
+
+LLM_SESSION_CONTEXT = Counter(
+    'llm_session_context_total',
+    'Session LLM calls by prompt mode (reused Ollama context or full rebuild)',
+    ['mode'],
+    registry=REGISTRY
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    'llm_queue_depth',
+    'LLM requests waiting for a scheduler slot',
+    ['priority'],
+    registry=REGISTRY
+)
+
+LLM_QUEUE_WAIT = Histogram(
+    'llm_queue_wait_seconds',
+    'Time LLM requests waited for a scheduler slot',
+    ['priority'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+    registry=REGISTRY
+)
+
+LLM_SLOTS_IN_USE = Gauge(
+    'llm_slots_in_use',
+    'LLM scheduler slots currently held',
+    registry=REGISTRY
+)
+
+LLM_SINGLE_FLIGHT = Counter(
+    'llm_single_flight_total',
+    'Intent LLM calls by single-flight role (leader ran the call, followers shared it)',
+    ['role'],
+    registry=REGISTRY
+)
+
+INTENT_RESOLUTION_PATH = Counter(
+    'intent_resolution_path_total',
+    'Recognized intents by resolution path (grammar, cache, llm)',
+    ['path'],
+    registry=REGISTRY
+)
+
+INTENT_CACHE_HITS = Counter(
+    'intent_cache_hits_total',
+    'Intent cache hits by tier',
+    ['tier'],
+    registry=REGISTRY
+)
+
+INTENT_CACHE_MISSES = Counter(
+    'intent_cache_misses_total',
+    'Intent cache misses (both tiers)',
+    registry=REGISTRY
+)
+
+INTENT_CACHE_EVICTIONS = Counter(
+    'intent_cache_evictions_total',
+    'Entries dropped from the in-process intent cache',
+    ['reason'],
+    registry=REGISTRY
+)
+
 DATABASE_QUERY_LATENCY = Histogram(
     'db_query_duration_seconds',
     'Database query latency in seconds',
@@ -125,6 +503,255 @@ def record_llm_request(model: str, duration: float, success: bool = True):
     LLM_REQUEST_COUNT.labels(model=model, status=status).inc()
 
 
+def record_llm_usage(model: str, usage: Dict[str, Optional[int]]):
+    """Record token counts, throughput and model load time of one LLM request"""
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens is not None:
+            LLM_TOKENS.labels(model=model, kind=kind).observe(tokens)
+
+    for phase, tokens, duration_ms in (
+        ("prompt_eval", usage.get("prompt_tokens"), usage.get("prompt_eval_ms")),
+        ("eval", usage.get("completion_tokens"), usage.get("eval_ms")),
+    ):
+        if tokens and duration_ms:
+            LLM_TOKENS_PER_SECOND.labels(model=model, phase=phase).observe(
+                tokens / (duration_ms / 1000)
+            )
+
+    if usage.get("load_ms") is not None:
+        LLM_MODEL_LOAD.labels(model=model).observe(usage["load_ms"] / 1000)
+
+
+def record_llm_stream(
+    model: str,
+    time_to_first_token: Optional[float],
+    time_to_json_complete: Optional[float],
+    early_stop: bool = False,
+):
+    """Record streaming LLM generation metrics"""
+    if time_to_first_token is not None:
+        LLM_TIME_TO_FIRST_TOKEN.labels(model=model).observe(time_to_first_token)
+    if time_to_json_complete is not None:
+        LLM_TIME_TO_JSON_COMPLETE.labels(model=model).observe(time_to_json_complete)
+    if early_stop:
+        LLM_STREAM_EARLY_STOPS.labels(model=model).inc()
+
+
+def record_entity_index_refresh(mode: str, duration: float, changed: int):
+    """Record an entity index refresh (full, incremental or failed)"""
+    ENTITY_INDEX_REFRESH.labels(mode=mode).observe(duration)
+    ENTITY_INDEX_CHANGES.inc(changed)
+
+
+def record_entity_context(count: int):
+    """Record how many entities were retrieved into the prompt"""
+    ENTITY_CONTEXT_SIZE.observe(count)
+
+
+def record_entity_resolution(method: str, score: float):
+    """Record how an intent target was resolved and its score"""
+    ENTITY_RESOLUTION.labels(method=method).inc()
+    ENTITY_RESOLUTION_SCORE.observe(score)
+
+
+def record_response_render(path: str):
+    """Record which path rendered a spoken response"""
+    RESPONSE_RENDER_PATH.labels(path=path).inc()
+
+
+_CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def record_circuit_transition(circuit: str, from_state: Optional[str], to_state: str):
+    """Record a circuit breaker state change (from_state None = initial state)"""
+    CIRCUIT_STATE.labels(circuit=circuit).set(_CIRCUIT_STATE_VALUES[to_state])
+    if from_state is not None:
+        CIRCUIT_TRANSITIONS.labels(circuit=circuit, from_state=from_state, to_state=to_state).inc()
+
+
+def record_llm_latency_quantiles(model: str, prompt_size: str, quantiles: Dict[float, float]):
+    """Export rolling latency quantiles of one prompt size bucket"""
+    for q, seconds in quantiles.items():
+        LLM_LATENCY_QUANTILE.labels(
+            model=model, prompt_size=prompt_size, quantile=str(q)
+        ).set(seconds)
+
+
+def record_llm_timeout_budget(model: str, source: str, seconds: float):
+    """Record the deadline given to an LLM call (source: adaptive or fixed)"""
+    LLM_TIMEOUT_BUDGET.labels(model=model, source=source).observe(seconds)
+
+
+def record_llm_timeout(model: str, source: str):
+    """Record an LLM call that hit its deadline"""
+    LLM_TIMEOUTS.labels(model=model, source=source).inc()
+
+
+def record_llm_hedge(model: str, outcome: str):
+    """Record a hedging decision or outcome"""
+    LLM_HEDGED_REQUESTS.labels(model=model, outcome=outcome).inc()
+
+
+def record_intent_stream_event(event: str, seconds: float):
+    """Record when a streaming intent request reached an event (intent, first_sentence, done)"""
+    INTENT_STREAM_LATENCY.labels(event=event).observe(seconds)
+
+
+def record_intent_stages(timings: Dict[str, float]):
+    """Record the wall time (seconds) of each intent pipeline stage"""
+    for stage, seconds in timings.items():
+        INTENT_STAGE_LATENCY.labels(stage=stage).observe(seconds)
+
+
+def record_ha_request(instance: str, operation: str, duration: float, error: Optional[str] = None):
+    """Record one Home Assistant API attempt (error: failure reason, None on success)"""
+    HA_REQUEST_LATENCY.labels(instance=instance, operation=operation).observe(duration)
+    if error is not None:
+        HA_REQUEST_ERRORS.labels(instance=instance, operation=operation, reason=error).inc()
+
+
+def record_ha_retry(instance: str, operation: str):
+    """Record a retried Home Assistant API call"""
+    HA_RETRIES.labels(instance=instance, operation=operation).inc()
+
+
+def record_ha_client_pools(count: int):
+    """Set the number of open per-user HA connection pools"""
+    HA_CLIENT_POOLS.set(count)
+
+
+def record_audit_queue_depth(depth: int):
+    """Set the number of audit rows waiting to be written"""
+    AUDIT_QUEUE_DEPTH.set(depth)
+
+
+def record_audit_dropped(reason: str, rows: int = 1):
+    """Record audit rows lost (queue_full, write_failed, shutdown)"""
+    AUDIT_RECORDS_DROPPED.labels(reason=reason).inc(rows)
+
+
+def record_audit_written(rows: int, seconds: float):
+    """Record one bulk audit insert"""
+    AUDIT_RECORDS_WRITTEN.inc(rows)
+    AUDIT_FLUSH_DURATION.observe(seconds)
+
+
+def record_ws_connection(delta: int):
+    """Track an edge WebSocket connection opening (+1) or closing (-1)"""
+    WS_CONNECTIONS.inc(delta)
+
+
+def record_ws_message(kind: str):
+    """Record an edge WebSocket frame by type"""
+    WS_MESSAGES.labels(type=kind).inc()
+
+
+def record_model_residency(backend: str, resident: bool):
+    """Record whether the model is loaded on a backend"""
+    OLLAMA_MODEL_RESIDENT.labels(backend=backend).set(1 if resident else 0)
+
+
+def record_model_load(backend: str, reason: str, duration: float, success: bool):
+    """Record a keeper-issued model load or keep-alive refresh"""
+    outcome = "success" if success else "error"
+    OLLAMA_MODEL_LOADS.labels(backend=backend, reason=reason, outcome=outcome).inc()
+    if success and reason != "refresh":
+        OLLAMA_MODEL_LOAD_DURATION.labels(backend=backend, reason=reason).observe(duration)
+
+
+def record_llm_parse(model: str, outcome: str):
+    """Record how the LLM intent output was parsed (failed = the user will have to repeat)"""
+    LLM_PARSE_RESULTS.labels(model=model, outcome=outcome).inc()
+
+
+_llm_pool_totals: Dict[str, Dict[str, int]] = {}
+
+
+def record_llm_pool_acquire(backend: str, in_use: int, waited: bool = False):
+    """Record an Ollama request taking a pooled connection"""
+    LLM_POOL_CONNECTIONS_IN_USE.labels(backend=backend).set(in_use)
+    if waited:
+        LLM_POOL_WAITS.labels(backend=backend).inc()
+
+
+def record_llm_pool_release(backend: str, in_use: int, new_connection: bool):
+    """Record an Ollama request returning its pooled connection"""
+    LLM_POOL_CONNECTIONS_IN_USE.labels(backend=backend).set(in_use)
+    origin = "new" if new_connection else "reused"
+    LLM_POOL_CONNECTIONS.labels(backend=backend, origin=origin).inc()
+    totals = _llm_pool_totals.setdefault(backend, {"new": 0, "reused": 0})
+    totals[origin] += 1
+    LLM_POOL_REUSE_RATIO.labels(backend=backend).set(
+        totals["reused"] / (totals["new"] + totals["reused"])
+    )
+
+
+def record_ollama_backend_state(
+    backend: str, in_flight: int, latency_ewma: Optional[float], healthy: bool
+):
+    """Record routing statistics of one Ollama backend"""
+    OLLAMA_BACKEND_IN_FLIGHT.labels(backend=backend).set(in_flight)
+    if latency_ewma is not None:
+        OLLAMA_BACKEND_LATENCY.labels(backend=backend).set(latency_ewma)
+    OLLAMA_BACKEND_HEALTHY.labels(backend=backend).set(1 if healthy else 0)
+
+
+def record_ollama_backend_request(backend: str, success: bool):
+    """Record a request outcome on one Ollama backend"""
+    OLLAMA_BACKEND_REQUESTS.labels(backend=backend, status="success" if success else "error").inc()
+
+
+def record_ollama_backend_ejection(backend: str):
+    """Record an Ollama backend being ejected from rotation"""
+    OLLAMA_BACKEND_EJECTIONS.labels(backend=backend).inc()
+
+
+def record_llm_session_context(reused: bool):
+    """Record whether a session LLM call reused stored context tokens"""
+    LLM_SESSION_CONTEXT.labels(mode="reused" if reused else "rebuilt").inc()
+
+
+def record_llm_queue_depth(priority: str, depth: int):
+    """Record the LLM scheduler queue depth for a priority class"""
+    LLM_QUEUE_DEPTH.labels(priority=priority).set(depth)
+
+
+def record_llm_queue_wait(priority: str, duration: float):
+    """Record how long a request waited for an LLM slot"""
+    LLM_QUEUE_WAIT.labels(priority=priority).observe(duration)
+
+
+def record_llm_slots_in_use(in_use: int):
+    """Record the number of LLM scheduler slots in use"""
+    LLM_SLOTS_IN_USE.set(in_use)
+
+
+def record_single_flight(role: str):
+    """Record a single-flight outcome (leader, local_follower or remote_follower)"""
+    LLM_SINGLE_FLIGHT.labels(role=role).inc()
+
+
+def record_intent_path(path: str):
+    """Record which path recognized an intent (grammar, cache or llm)"""
+    INTENT_RESOLUTION_PATH.labels(path=path).inc()
+
+
+def record_intent_cache_hit(tier: str):
+    """Record an intent cache hit in the given tier (local or redis)"""
+    INTENT_CACHE_HITS.labels(tier=tier).inc()
+
+
+def record_intent_cache_miss():
+    """Record an intent cache miss"""
+    INTENT_CACHE_MISSES.inc()
+
+
+def record_intent_cache_eviction(reason: str):
+    """Record an in-process intent cache eviction (capacity or expired)"""
+    INTENT_CACHE_EVICTIONS.labels(reason=reason).inc()
+
+
 def record_db_query(operation: str, duration: float):
     """Record database query metrics"""
     DATABASE_QUERY_LATENCY.labels(operation=operation).observe(duration)
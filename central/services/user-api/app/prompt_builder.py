@@ -0,0 +1,115 @@
+"""
+Prompt construction for LLM intent recognition
+
+The prompt is laid out so that Ollama can reuse the evaluated KV cache:
+the static system prompt is a byte-identical prefix (sent as ``system``),
+and everything that changes per request comes last: the append-only
+conversation history, then the entities retrieved for this utterance,
+then the utterance itself.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.context_budget import SUMMARY_ROLE, select_history
+
+# Bump whenever the prompt layout or system prompt changes (invalidates cached intents)
+PROMPT_VERSION = "4"
+
+SYSTEM_PROMPT = """You are a Home Assistant voice command interpreter specialized in Hungarian smart home control.
+
+Your task is to understand user voice commands and convert them into structured Home Assistant intents.
+
+You must respond ONLY with a valid JSON object (no markdown, no explanation, no code blocks) with this exact structure:
+{
+  "intent": "turn_on|turn_off|get_status|toggle|set_brightness|set_temperature|get_info|unknown",
+  "target": {"type": "entity|device|area|unknown", "name": "entity_id_or_name_or_empty_string"},
+  "action": "on|off|increase|decrease|set|unknown",
+  "parameters": {},
+  "confidence": 0.0-1.0,
+  "response": "Response text in Hungarian to speak back to user"
+}
+
+Rules:
+- Always respond with valid JSON, no extra text
+- If unsure, set confidence to 0.0 and ask for clarification in the response field
+- Use Hungarian language for all responses
+- Keep responses concise (1-2 sentences)
+- Be context-aware from previous messages"""  # noqa: E501
+
+
+class IntentPrompt(NamedTuple):
+    """Prompt split into its cacheable prefix and volatile tail"""
+    system: str
+    prompt: str
+
+
+def build_system_prompt() -> str:
+    """Build the stable prompt prefix (identical for every request and user)"""
+    return SYSTEM_PROMPT
+
+
+def prompt_history(session_context: Optional[List[Any]]) -> List[Any]:
+    """Session entries that fit the prompt's history token budget"""
+    return select_history(session_context, settings.llm_history_token_budget)
+
+
+def render_history(session_context: Optional[List[Any]]) -> str:
+    """Render previous session messages, oldest first, one line per message"""
+    lines = []
+    for msg in prompt_history(session_context):
+        if isinstance(msg, dict):
+            if msg.get("role") == SUMMARY_ROLE:
+                lines.append(f"Earlier requests: {msg.get('content', '')}")
+                continue
+            role = "Assistant" if msg.get("role") == "assistant" else "User"
+            lines.append(f"{role}: {msg.get('content', '')}")
+        else:
+            # Simple string format
+            lines.append(f"User: {msg}")
+    return "\n".join(lines)
+
+
+def build_user_prompt(
+    user_text: str,
+    session_context: Optional[List[Any]] = None,
+    ha_context: Optional[str] = None,
+) -> str:
+    """
+    Build the volatile part of the prompt
+
+    History is rendered append-only, so the previous request's history is
+    itself a prefix of the next one within a session. The entity context
+    is retrieved per utterance, so it follows the history.
+    """
+    sections = []
+    history = render_history(session_context)
+    if history:
+        sections.append(f"Previous messages:\n{history}")
+    if ha_context:
+        sections.append(f"Available Home Assistant entities:\n{ha_context}")
+    if not sections:
+        return user_text
+    return "\n\n".join(sections + [f"Command: {user_text}"])
+
+
+def build_intent_prompt(
+    user_text: str,
+    ha_context: Optional[str] = None,
+    session_context: Optional[List[Dict[str, Any]]] = None,
+) -> IntentPrompt:
+    """
+    Build the intent recognition prompt
+
+    Args:
+        user_text: User input
+        ha_context: Home Assistant entities retrieved for this utterance
+        session_context: Previous messages in this session
+
+    Returns:
+        IntentPrompt with ``system`` (stable prefix) and ``prompt`` (volatile tail)
+    """
+    return IntentPrompt(
+        system=build_system_prompt(),
+        prompt=build_user_prompt(user_text, session_context, ha_context),
+    )
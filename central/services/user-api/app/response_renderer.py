@@ -0,0 +1,286 @@
+"""
+Spoken response rendering from per-intent Hungarian templates
+"""
+
+import re
+from string import Formatter
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
+
+import structlog
+
+from app.config import settings
+from app.llm_service import ollama_service
+from app.prometheus_metrics import record_response_render
+
+logger = structlog.get_logger()
+
+FALLBACK_RESPONSE = "Parancs végrehajtva."
+# Asked back instead of executing a doubtful intent (see ha_result["clarify"])
+CLARIFY_RESPONSE = "Nem értettem pontosan, mit szeretnél. Megismételnéd?"
+CLARIFY_TARGET_RESPONSE = (
+    "Nem vagyok biztos benne, melyik eszközre gondolsz: {name}. Megismételnéd pontosabban?"
+)
+
+# Sentence end: terminal punctuation, whitespace, then a capitalized word.
+# "a 3. emelet" (ordinal) and "21,5 fok" stay in one sentence.
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])\s+(?=[\"„(]?[A-ZÁÉÍÓÖŐÚÜŰ])")
+# Abbreviations that are followed by a capitalized word mid-sentence
+_ABBREVIATIONS = frozenset({"pl", "kb", "dr", "ill", "ún", "id"})
+
+# (intent, outcome) -> template; outcome is "success" or "error"
+_TEMPLATES = {
+    ("turn_on", "success"): "Bekapcsoltam: {name}.",
+    ("turn_off", "success"): "Kikapcsoltam: {name}.",
+    ("toggle", "success"): "Átkapcsoltam: {name}.",
+    ("set_brightness", "success"): "{name} fényereje most {brightness_pct} százalék.",
+    ("set_temperature", "success"): "A hőmérsékletet {temperature} fokra állítottam.",
+    ("get_status", "success"): "{name} állapota: {state}.",
+    ("turn_on", "error"): "Nem sikerült bekapcsolni: {name}.",
+    ("turn_off", "error"): "Nem sikerült kikapcsolni: {name}.",
+    ("toggle", "error"): "Nem sikerült átkapcsolni: {name}.",
+    ("set_brightness", "error"): "Nem sikerült beállítani a fényerőt: {name}.",
+    ("set_temperature", "error"): "Nem sikerült beállítani a hőmérsékletet.",
+    ("get_status", "error"): "Nem sikerült lekérdezni: {name}.",
+}
+
+# Template text with the fields it needs, parsed once at import
+_COMPILED: Dict[Tuple[str, str], Tuple[str, FrozenSet[str]]] = {
+    key: (template, frozenset(field for _, field, _, _ in Formatter().parse(template) if field))
+    for key, template in _TEMPLATES.items()
+}
+
+# Intents whose response reports the entity state read from HA
+_STATE_INTENTS = frozenset(
+    intent for (intent, _), (_, fields) in _COMPILED.items() if "state" in fields
+)
+
+# HA result fields (besides success) that can change the rendered response
+_RESULT_FIELDS = ("clarify", "error", "entity_id", "friendly_name", "state", "unit_of_measurement")
+
+_STATE_WORDS = {
+    "on": "bekapcsolva",
+    "off": "kikapcsolva",
+    "open": "nyitva",
+    "closed": "zárva",
+    "locked": "zárva",
+    "unlocked": "nyitva",
+    "unavailable": "nem elérhető",
+}
+
+
+def friendly_name(entity_id: str) -> str:
+    """Readable name from an entity ID ("light.nappali_lampa" -> "nappali lampa")"""
+    object_id = entity_id.split(".", 1)[1] if "." in entity_id else entity_id
+    return object_id.replace("_", " ").strip()
+
+
+def _format_number(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:g}".replace(".", ",")
+    return str(value)
+
+
+def _template_fields(intent_data: Dict[str, Any], ha_result: Dict[str, Any]) -> Dict[str, str]:
+    target = intent_data.get("target") or {}
+    name = ha_result.get("friendly_name") or friendly_name(
+        ha_result.get("entity_id") or target.get("name") or ""
+    )
+    fields = {"name": name} if name else {}
+
+    for key, value in (intent_data.get("parameters") or {}).items():
+        if isinstance(value, (int, float)):
+            fields[key] = _format_number(value)
+
+    state = ha_result.get("state")
+    if state is not None:
+        fields["state"] = _STATE_WORDS.get(str(state), _format_number(state))
+        unit = ha_result.get("unit_of_measurement")
+        if unit:
+            fields["state"] = f"{fields['state']} {unit}"
+    return fields
+
+
+def render_template(intent_data: Dict[str, Any], ha_result: Dict[str, Any]) -> Optional[str]:
+    """
+    Render the confirmation for an executed intent from its template
+
+    Args:
+        intent_data: Recognized intent
+        ha_result: Home Assistant execution result (``success``, ``error``,
+            ``entity_id``, ``friendly_name``, ``state``), or ``clarify``
+            ("intent" or "target") if the intent was not executed
+
+    Returns:
+        The response text, or None if there is no template for this intent
+        and outcome or the result lacks a field the template needs
+    """
+    if ha_result.get("clarify"):
+        name = (intent_data.get("target") or {}).get("name")
+        if ha_result["clarify"] == "target" and name:
+            return CLARIFY_TARGET_RESPONSE.format(name=name)
+        return CLARIFY_RESPONSE
+    outcome = "success" if ha_result.get("success", True) else "error"
+    compiled = _COMPILED.get((intent_data.get("intent"), outcome))
+    if compiled is None:
+        return None
+    template, required = compiled
+    fields = _template_fields(intent_data, ha_result)
+    if not required <= fields.keys():
+        return None
+    text = template.format(**fields)
+    return text[0].upper() + text[1:]
+
+
+def reads_state(intent_data: Dict[str, Any]) -> bool:
+    """Whether the response depends on the entity state, i.e. cannot be rendered before execution"""
+    return intent_data.get("intent") in _STATE_INTENTS
+
+
+def renders_alike(ha_result: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    """Whether two HA results give the same response for an intent"""
+    if ha_result.get("success", True) != other.get("success", True):
+        return False
+    return all(ha_result.get(field) == other.get(field) for field in _RESULT_FIELDS)
+
+
+class SentenceBuffer:
+    """
+    Split streamed text into sentences as they complete
+
+    A sentence is complete once the next one has started, so the last
+    sentence is only returned by ``flush``.
+    """
+
+    def __init__(self):
+        self._text = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add text; returns the sentences it completed"""
+        self._text += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_BREAK.finditer(self._text):
+            sentence = self._text[start:match.start()].strip()
+            words = sentence.split()
+            if words and words[-1].rstrip(".").lower() in _ABBREVIATIONS:
+                continue
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._text = self._text[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """The remaining text (the last sentence), if any"""
+        text, self._text = self._text.strip(), ""
+        return text or None
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a complete text into sentences"""
+    buffer = SentenceBuffer()
+    sentences = buffer.feed(text)
+    last = buffer.flush()
+    return sentences + [last] if last else sentences
+
+
+class ResponseRenderer:
+    """
+    Choose how the spoken response is produced
+
+    Templates cover the common intents without another inference. The LLM
+    (``OllamaService.generate_response``) is only asked when
+    LLM_RESPONSE_GENERATION_ENABLED is set and no template fits, e.g. an
+    HA error with details. Otherwise the response the model gave during
+    intent recognition is used.
+    """
+
+    async def render(
+        self,
+        intent_data: Dict[str, Any],
+        ha_result: Dict[str, Any],
+        user_text: str,
+    ) -> str:
+        """
+        Render the response for an executed intent
+
+        Args:
+            intent_data: Recognized intent
+            ha_result: Home Assistant execution result
+            user_text: Original user text (for the LLM path)
+
+        Returns:
+            Response text to speak back
+        """
+        text = render_template(intent_data, ha_result)
+        if text is not None:
+            record_response_render("template")
+            return text
+
+        if settings.llm_response_generation_enabled:
+            result = ha_result.get("error") or ha_result.get("state") or "executed"
+            record_response_render("llm")
+            return await ollama_service.generate_response(
+                intent=intent_data.get("intent") or "unknown",
+                result=str(result),
+                user_text=user_text,
+            )
+
+        if intent_data.get("response"):
+            record_response_render("intent")
+            return intent_data["response"]
+
+        record_response_render("fallback")
+        return FALLBACK_RESPONSE
+
+    async def render_stream(
+        self,
+        intent_data: Dict[str, Any],
+        ha_result: Dict[str, Any],
+        user_text: str,
+    ) -> AsyncIterator[str]:
+        """
+        Render the response sentence by sentence
+
+        Same paths as ``render``; on the LLM path each sentence is yielded
+        as soon as the model has finished it, so speech synthesis can start
+        before the generation ends.
+
+        Yields:
+            Response sentences in order
+        """
+        if (
+            not settings.llm_response_generation_enabled
+            or render_template(intent_data, ha_result) is not None
+        ):
+            for sentence in split_sentences(await self.render(intent_data, ha_result, user_text)):
+                yield sentence
+            return
+
+        record_response_render("llm")
+        buffer = SentenceBuffer()
+        emitted = False
+        try:
+            async for token in ollama_service.stream_response(
+                intent=intent_data.get("intent") or "unknown",
+                result=str(ha_result.get("error") or ha_result.get("state") or "executed"),
+                user_text=user_text,
+            ):
+                for sentence in buffer.feed(token):
+                    emitted = True
+                    yield sentence
+        except Exception as e:
+            logger.warning("Response streaming failed", error=str(e))
+            if not emitted:
+                yield FALLBACK_RESPONSE
+            return
+
+        last = buffer.flush()
+        if last:
+            yield last
+        elif not emitted:
+            yield FALLBACK_RESPONSE
+
+
+# Singleton instance
+response_renderer = ResponseRenderer()
@@ -2,10 +2,11 @@
 Health check endpoints
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 from typing import Dict
 from app.constants import ComponentStatus
+from app.model_residency import model_keeper
 
 router = APIRouter()
 
@@ -23,14 +24,18 @@ async def health_check() -> HealthResponse:
     return HealthResponse(status="ok")
 
 @router.get("/ready", response_model=ReadyResponse)
-async def readiness_check() -> ReadyResponse:
+async def readiness_check(response: Response) -> ReadyResponse:
     """Readiness probe - checks dependencies"""
-    # TODO: Check database, Redis, Ollama connectivity
+    # Not ready until the model is loaded, so no voice command pays the cold load
+    ready = model_keeper.ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    # TODO: Check database and Redis connectivity
     return ReadyResponse(
-        status="ready",
+        status="ready" if ready else "warming_up",
         components={
             "database": ComponentStatus.CONNECTED.value,
             "redis": ComponentStatus.CONNECTED.value,
-            "ollama": ComponentStatus.CONNECTED.value,
+            "ollama": (ComponentStatus.CONNECTED if ready else ComponentStatus.DISCONNECTED).value,
         }
     )
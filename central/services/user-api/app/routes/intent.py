@@ -2,10 +2,13 @@
 Intent processing endpoints - the core pipeline
 """
 
-from fastapi import APIRouter, HTTPException, status, Header, Depends
+from fastapi import APIRouter, HTTPException, status, Header, Depends, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import json
 import time
 import uuid
 import structlog
@@ -17,15 +20,36 @@ from app.constants import (
     VALIDATION_TEXT_TOO_LONG,
     VALIDATION_USER_ID_REQUIRED,
     VALIDATION_DEVICE_ID_REQUIRED,
+    INTENT_MIN_CONFIDENCE,
     IntentStatus,
+    RequestPriority,
 )
+from app.audit_writer import audit_writer
+from app.config import settings
 from app.exceptions import AuthenticationError, AuthorizationError, LLMError
 from app.database import get_db
+from app.entity_index import EntityIndex, entity_index_cache
+from app.entity_resolver import EntityResolution, resolve_target
+from app.fallback_classifier import classify as classify_fallback
+from app.ha_client import HAInstance, load_instance
+from app.ha_executor import execute_intent
+from app.intent_cache import build_cache_key, intent_cache
+from app.intent_grammar import match_intent
+from app.llm_scheduler import llm_scheduler
 from app.llm_service import ollama_service
 from app.models import AuditLog
+from app.prometheus_metrics import (
+    record_intent_path,
+    record_intent_stages,
+    record_intent_stream_event,
+    record_llm_session_context,
+)
 from app.redis_client import get_redis
+from app.response_renderer import reads_state, renders_alike, response_renderer
 from app.security import get_user_id_from_token
-from app.session_store import append_session_context, build_context_entry, get_session_context
+from app.single_flight import build_flight_key, single_flight
+from app.session_store import SessionWriteBuffer, build_context_entry, llm_context_fingerprint
+from app.stage_graph import Stage, StageGraph
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
@@ -54,6 +78,17 @@ class IntentResponse(BaseModel):
     status: str  # Use IntentStatus enum values
     latency_ms: int
     confidence: Optional[float] = None
+    resolution_score: Optional[float] = None  # Match score of entity_id against the user's entities
+
+class BatchItemResult(BaseModel):
+    index: int  # Position in the request list
+    status_code: int
+    result: Optional[IntentResponse] = None
+    error: Optional[str] = None
+
+class BatchIntentResponse(BaseModel):
+    results: List[BatchItemResult]
+    latency_ms: int
 
 class ErrorResponse(BaseModel):
     request_id: str
@@ -61,9 +96,31 @@ class ErrorResponse(BaseModel):
     message: str
     error_code: str
 
+def authenticate(authorization: Optional[str], request_id: str) -> str:
+    """
+    Validate the bearer token
+    
+    Returns:
+        The authenticated user ID
+        
+    Raises:
+        AuthenticationError: If the header is missing or the token is invalid
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        logger.warning("auth_failed", request_id=request_id)
+        raise AuthenticationError("Missing or invalid authorization token")
+    
+    token: str = authorization.split(" ")[1]
+    try:
+        return get_user_id_from_token(token)
+    except Exception as e:
+        logger.warning("token_validation_failed", request_id=request_id, error=str(e))
+        raise AuthenticationError("Invalid token")
+
 @router.post("/intent", response_model=IntentResponse)
 async def process_intent(
     request: IntentRequest,
+    response: Response,
     authorization: str = Header(None),
     db: AsyncSession = Depends(get_db),
     redis_client: redis.Redis = Depends(get_redis),
@@ -71,164 +128,674 @@ async def process_intent(
     """
     Core intent processing endpoint
     
-    Flow:
+    Flow (see INTENT_PIPELINE; independent stages overlap):
     1. Authenticate user (JWT)
-    2. Load session context
-    3. Call LLM service for intent recognition
-    4. Execute intent on per-user HA instance
-    5. Generate response
-    6. Log to audit trail
+    2. Load session context | load the user's entity index
+    3. Recognize intent (grammar, cache or LLM)
+    4. Execute intent on per-user HA instance | render the expected response
+    5. Generate response (the early render unless HA answered otherwise)
+    6. Log to audit trail | write session context
+    
+    Stage timings are returned in a ``Server-Timing`` header.
+    """
+    state = IntentState(
+        request,
+        db=db,
+        redis_client=redis_client,
+        sessions=SessionWriteBuffer(redis_client),
+        authorization=authorization,
+    )
+    result = await run_intent(state)
+    response.headers["Server-Timing"] = server_timing(state)
+    return result
+
+@router.post("/intent/stream")
+async def process_intent_stream(
+    request: IntentRequest,
+    authorization: str = Header(None),
+    accept: str = Header("text/event-stream"),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+):
+    """
+    Streaming variant of /intent, so the satellite can start TTS early
+    
+    Events, as Server-Sent Events (NDJSON lines with ``Accept:
+    application/x-ndjson``):
+    - intent: the recognized intent, as soon as it is known
+    - response: one per sentence of the spoken response
+    - done: the full IntentResponse plus ``ttfb_ms`` (first sentence) and
+      ``stage_ms`` (stage timings; headers are sent before they are known)
+    - error: ``status_code`` and ``detail`` if processing failed
+    
+    Authentication errors are returned before the stream starts.
     """
     request_id = str(uuid.uuid4())
-    start_time = time.time()
+    state = IntentState(
+        request,
+        db=db,
+        redis_client=redis_client,
+        sessions=SessionWriteBuffer(redis_client),
+        request_id=request_id,
+        user_id=authenticate(authorization, request_id),
+        # Commit here: the stream outlives the request handler
+        commit_audit=True,
+    )
+    ndjson = "application/x-ndjson" in (accept or "")
     
-    try:
-        # 1. Authenticate
-        if not authorization or not authorization.startswith("Bearer "):
-            logger.warning("auth_failed", request_id=request_id, user_id=request.user_id)
-            raise AuthenticationError("Missing or invalid authorization token")
-        
-        token: str = authorization.split(" ")[1]
+    def event(name: str, data: Dict[str, Any]) -> str:
+        if ndjson:
+            return json.dumps({"event": name, **data}, ensure_ascii=False) + "\n"
+        return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    async def events():
         try:
-            user_id = get_user_id_from_token(token)
-        except Exception as e:
-            logger.warning("token_validation_failed", request_id=request_id, error=str(e))
-            raise AuthenticationError("Invalid token")
-
-        if request.user_id != user_id:
-            logger.warning(
-                "user_id_mismatch",
-                request_id=request_id,
-                token_user_id=user_id,
-                request_user_id=request.user_id,
+            await RECOGNITION_PIPELINE.run(state)
+            record_intent_stream_event("intent", time.time() - state.start_time)
+            yield event("intent", {
+                "request_id": request_id,
+                "intent": state.intent_data.get("intent", "unknown"),
+                "entity_id": state.entity_id,
+                "confidence": state.confidence,
+                "resolution_score": state.resolution.score if state.resolution else None,
+            })
+            
+            # Sentences are streamed from the actual HA result, so no early render here
+            await EXECUTION_PIPELINE.run(state)
+            render_start = time.perf_counter()
+            sentences: List[str] = []
+            ttfb_ms = None
+            stream = response_renderer.render_stream(
+                state.intent_data, state.ha_response, request.text
             )
-            raise AuthorizationError("User ID mismatch")
-        
-        logger.info(
-            "intent_received",
-            request_id=request_id,
-            user_id=request.user_id,
-            device_id=request.device_id,
-            text=request.text[:50],
+            async for sentence in stream:
+                if ttfb_ms is None:
+                    elapsed = time.time() - state.start_time
+                    record_intent_stream_event("first_sentence", elapsed)
+                    ttfb_ms = int(elapsed * 1000)
+                sentences.append(sentence)
+                yield event("response", {"text": sentence})
+            state.timings["render"] = time.perf_counter() - render_start
+            state.set_response_text(" ".join(sentences))
+            
+            await COMPLETION_PIPELINE.run(state)
+            response = finish_intent(state)
+            record_intent_stream_event("done", time.time() - state.start_time)
+            yield event(
+                "done",
+                {**response.model_dump(), "ttfb_ms": ttfb_ms, "stage_ms": state.stage_ms()},
+            )
+        except HTTPException as e:
+            yield event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            error = internal_error(state, e)
+            yield event("error", {"status_code": error.status_code, "detail": error.detail})
+        finally:
+            record_intent_stages(state.timings)
+    
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Marks an HA instance or entity index that the pipeline still has to load
+_NOT_LOADED: Any = object()
+
+class IntentState:
+    """State of one request, shared by the pipeline stages"""
+    
+    __slots__ = (
+        "request",
+        "request_id",
+        "user_id",
+        "authorization",
+        "start_time",
+        "db",
+        "redis_client",
+        "sessions",
+        "priority",
+        "commit_audit",
+        "flush_sessions",
+        "timings",
+        "session_context",
+        "ha_instance",
+        "entity_index",
+        "intent_data",
+        "intent_path",
+        "resolution",
+        "llm_usage",
+        "new_llm_context",
+        "ha_response",
+        "draft",
+        "response_text",
+        "latency_ms",
+    )
+    
+    def __init__(
+        self,
+        request: IntentRequest,
+        db: AsyncSession,
+        redis_client: redis.Redis,
+        sessions: SessionWriteBuffer,
+        request_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        authorization: Optional[str] = None,
+        ha_instance: Optional[HAInstance] = _NOT_LOADED,
+        entity_index: Optional[EntityIndex] = _NOT_LOADED,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        commit_audit: bool = False,
+        flush_sessions: bool = True,
+    ):
+        """
+        Args:
+            request: The intent request
+            db: Database session (audit rows are added to it)
+            redis_client: Redis client (intent cache, single-flight)
+            sessions: Session store buffer
+            request_id: Request ID (generated if omitted)
+            user_id: User ID of an already validated token; without it the
+                ``authorization`` header is validated by the auth stage
+            authorization: Authorization header value
+            ha_instance: The user's HA instance if already loaded (None
+                without one); loaded by the pipeline if omitted
+            entity_index: The user's entity index if already loaded (None
+                without an HA instance); loaded by the pipeline if omitted
+            priority: LLM scheduling priority
+            commit_audit: Without AUDIT_ASYNC_ENABLED, commit the audit row
+                in the pipeline (otherwise the caller commits, e.g. get_db
+                after the response is sent)
+            flush_sessions: Flush the session buffer in the pipeline
+                (otherwise the caller flushes, e.g. once per batch)
+        """
+        self.request = request
+        self.request_id = request_id or str(uuid.uuid4())
+        self.user_id = user_id
+        self.authorization = authorization
+        self.start_time = time.time()
+        self.db = db
+        self.redis_client = redis_client
+        self.sessions = sessions
+        self.priority = priority
+        self.commit_audit = commit_audit
+        self.flush_sessions = flush_sessions
+        self.timings: Dict[str, float] = {}
+        self.session_context: List[Dict[str, Any]] = []
+        self.ha_instance = ha_instance
+        self.entity_index = entity_index
+        self.intent_data: Dict[str, Any] = {}
+        self.intent_path = "grammar"
+        self.resolution: Optional[EntityResolution] = None
+        self.llm_usage: Dict[str, Any] = {}
+        self.new_llm_context: Optional[List[int]] = None
+        self.ha_response: Dict[str, Any] = {}
+        # (assumed HA result, response text)
+        self.draft: Optional[Tuple[Dict[str, Any], str]] = None
+        self.response_text = ""
+        self.latency_ms = 0
+    
+    @property
+    def confidence(self) -> float:
+        return self.intent_data.get("confidence", 0.0)
+    
+    @property
+    def entity_id(self) -> Optional[str]:
+        target = self.intent_data.get("target") or {}
+        return target.get("entity_id") or target.get("name")
+    
+    @property
+    def clarification(self) -> Optional[str]:
+        # Asking back beats acting on a guess: "intent" if the intent is doubtful,
+        # "target" if the named entity matched nothing clearly
+        if self.intent_data.get("intent", "unknown") == "unknown":
+            return None
+        if self.confidence < INTENT_MIN_CONFIDENCE:
+            return "intent"
+        if self.resolution is not None and self.resolution.entity_id is None:
+            return "target"
+        return None
+    
+    @property
+    def status(self) -> IntentStatus:
+        if self.ha_response.get("clarify"):
+            return IntentStatus.NEEDS_CLARIFICATION
+        # The intent was understood; ERROR if HA failed to carry it out
+        return IntentStatus.SUCCESS if self.ha_response.get("success", True) else IntentStatus.ERROR
+    
+    @property
+    def use_llm_context(self) -> bool:
+        # Sessions carry Ollama's context tokens so follow-ups send only the new turn
+        return settings.llm_session_context_enabled and self.request.session_id is not None
+    
+    def stage_ms(self) -> Dict[str, float]:
+        """Wall time of the stages run so far, in milliseconds"""
+        return {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()}
+    
+    def set_response_text(self, text: str) -> None:
+        """Store the final response; the reported latency ends here"""
+        self.response_text = text
+        self.latency_ms = int((time.time() - self.start_time) * 1000)
+
+async def run_intent(state: IntentState) -> IntentResponse:
+    """
+    Process one intent request through INTENT_PIPELINE
+    
+    Shared by the single, batch and WebSocket endpoints. Audit rows go to
+    the background writer, or with AUDIT_ASYNC_ENABLED off are added to
+    ``state.db`` (committed only if ``state.commit_audit`` is set), so
+    one session can serve concurrent calls given a preloaded index.
+    
+    Returns:
+        The intent response
+    
+    Raises:
+        HTTPException: 401/403 on authentication errors, 503 if the LLM is
+            down and fallback mode is off, 500 on any other failure
+    """
+    try:
+        await INTENT_PIPELINE.run(state)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error(state, e)
+    finally:
+        # Failed requests too: a timed-out stage is what moved the latency
+        record_intent_stages(state.timings)
+    return finish_intent(state)
+
+def server_timing(state: IntentState) -> str:
+    """``Server-Timing`` header value: one metric per stage plus the total"""
+    metrics = [f"{name};dur={ms}" for name, ms in state.stage_ms().items()]
+    metrics.append(f"total;dur={round((time.time() - state.start_time) * 1000, 1)}")
+    return ", ".join(metrics)
+
+def internal_error(state: IntentState, error: Exception) -> HTTPException:
+    """Log an unexpected failure and turn it into a 500"""
+    latency_ms = int((time.time() - state.start_time) * 1000)
+    logger.error(
+        "intent_error",
+        request_id=state.request_id,
+        user_id=state.request.user_id,
+        error=str(error),
+        latency_ms=latency_ms,
+    )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Failed to process intent"
+    )
+
+def finish_intent(state: IntentState) -> IntentResponse:
+    """Log the completed request with its stage timings and build the response"""
+    logger.info(
+        "intent_success",
+        request_id=state.request_id,
+        user_id=state.request.user_id,
+        intent=state.intent_data.get("intent"),
+        confidence=state.confidence,
+        latency_ms=state.latency_ms,
+        stage_ms=state.stage_ms(),
+    )
+    return IntentResponse(
+        request_id=state.request_id,
+        intent=state.intent_data.get("intent", "unknown"),
+        entity_id=state.entity_id,
+        response=state.response_text,
+        status=state.status.value,
+        confidence=state.confidence,
+        resolution_score=state.resolution.score if state.resolution else None,
+        latency_ms=state.latency_ms,
+    )
+
+async def _authorize(state: IntentState) -> None:
+    """Stage auth: validate the token (unless done by the caller) and the user ID"""
+    request = state.request
+    if state.user_id is None:
+        state.user_id = authenticate(state.authorization, state.request_id)
+    
+    if request.user_id != state.user_id:
+        logger.warning(
+            "user_id_mismatch",
+            request_id=state.request_id,
+            token_user_id=state.user_id,
+            request_user_id=request.user_id,
         )
+        raise AuthorizationError("User ID mismatch")
+    
+    logger.info(
+        "intent_received",
+        request_id=state.request_id,
+        user_id=request.user_id,
+        device_id=request.device_id,
+        text=request.text[:50],
+    )
+
+async def _load_session(state: IntentState) -> None:
+    """Stage session_load: session history and Ollama context tokens, one Redis round trip"""
+    session_id = state.request.session_id
+    await state.sessions.load(state.user_id, session_id, llm_context=state.use_llm_context)
+    state.session_context = await state.sessions.get_session_context(state.user_id, session_id)
+
+async def _load_entity_index(state: IntentState) -> None:
+    """Stage entity_index: the user's HA instance and entities (runs alongside session_load)"""
+    if state.ha_instance is _NOT_LOADED:
+        state.ha_instance = await load_instance(state.db, state.user_id)
+    if state.entity_index is _NOT_LOADED:
+        state.entity_index = await entity_index_cache.get_index(state.ha_instance)
+
+async def _recognize(state: IntentState) -> None:
+    """Stage llm: recognize the intent (grammar, exact-match cache, then LLM) and resolve it"""
+    request = state.request
+    request_id = state.request_id
+    user_id = state.user_id
+    session_context = state.session_context
+    entity_index = state.entity_index
+    
+    cache_key = None
+    intent_data = None
+    intent_path = "grammar"
+    if settings.feature_intent_grammar:
+        intent_data = match_intent(request.text)
+    
+    ha_context = None
+    if intent_data is None and entity_index is not None:
+        # Only the entities relevant to this utterance reach the prompt
+        ha_context = entity_index_cache.build_ha_context(entity_index, request.text)
+    
+    if intent_data is None and settings.feature_llm_caching:
+        intent_path = "cache"
+        cache_key = build_cache_key(request.text, session_context, ha_context)
+        intent_data = await intent_cache.get(state.redis_client, cache_key)
+    
+    use_llm_context = state.use_llm_context
+    # Keep a session on one Ollama node so its KV-cache prefix stays warm
+    affinity_key = f"{user_id}:{request.session_id}" if request.session_id else str(user_id)
+    
+    if intent_data is None:
+        intent_path = "llm"
+        llm_context = None
+        if use_llm_context:
+            # Already buffered by session_load
+            llm_context = await state.sessions.get_llm_context(
+                user_id,
+                request.session_id,
+                fingerprint=llm_context_fingerprint(ollama_service.model, session_context),
+            )
+            record_llm_session_context(reused=llm_context is not None)
         
-        # 2. Load session context
-        session_context = await get_session_context(
-            redis_client,
-            user_id=user_id,
-            session_id=request.session_id,
-        )
+        async def call_llm():
+            # Do not queue for a slot while Ollama is known to be down
+            ollama_service.breaker.reject_if_open()
+            async with llm_scheduler.slot(user_id, state.priority):
+                return await ollama_service.process_intent(
+                    user_text=request.text,
+                    ha_context=ha_context,
+                    session_context=session_context,
+                    llm_context=llm_context,
+                    return_context=use_llm_context,
+                    affinity_key=affinity_key,
+                )
         
-        # 3. Call LLM service to recognize intent
         try:
-            intent_data = await ollama_service.process_intent(
-                user_text=request.text,
-                ha_context=None,  # TODO: Load from user's HA instance
-                session_context=session_context,
-            )
+            if settings.llm_single_flight_enabled:
+                intent_data = await single_flight.do(
+                    state.redis_client,
+                    build_flight_key(user_id, request.text, session_context, ha_context),
+                    call_llm,
+                )
+            else:
+                intent_data = await call_llm()
         except LLMError as e:
             logger.error("llm_processing_failed", request_id=request_id, error=str(e))
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="LLM service unavailable"
-            )
-        
-        # Check confidence threshold
-        confidence = intent_data.get("confidence", 0.0)
-        if confidence < 0.5:
-            logger.warning(
-                "low_confidence_intent",
-                request_id=request_id,
-                intent=intent_data.get("intent"),
-                confidence=confidence,
-            )
+            if not settings.feature_ha_fallback_mode:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="LLM service unavailable"
+                )
+            # Degraded mode: answer from the rule-based classifier
+            intent_path = "fallback"
+            intent_data = classify_fallback(request.text, entity_index)
+            cache_key = None
         
-        # 4. Execute on per-user HA instance
-        # TODO: Call per-user HA instance based on user_id
-        # For now, return LLM response directly
-        ha_response = {
-            "state": "executed",
-            "entity_id": intent_data.get("target", {}).get("name", "unknown")
-        }
-        
-        # 5. Generate response text (from LLM or enhanced based on HA result)
-        response_text = intent_data.get("response", "Parancs feldolgozva.")
-        
-        # 6. Log to audit trail
-        latency_ms = int((time.time() - start_time) * 1000)
-        
-        logger.info(
-            "intent_success",
+        state.new_llm_context = intent_data.pop("llm_context", None)
+        state.llm_usage = intent_data.pop("llm_usage", None) or {}
+        if cache_key:
+            await intent_cache.set(state.redis_client, cache_key, intent_data)
+    
+    record_intent_path(intent_path)
+    logger.info(
+        "intent_recognized",
+        request_id=request_id,
+        path=intent_path,
+        intent=intent_data.get("intent"),
+    )
+    
+    # Map the free-text target to a concrete entity of the user's home
+    state.resolution = resolve_target(entity_index, intent_data, request.text)
+    state.intent_data = intent_data
+    state.intent_path = intent_path
+    
+    # Check confidence threshold
+    if state.confidence < INTENT_MIN_CONFIDENCE:
+        logger.warning(
+            "low_confidence_intent",
             request_id=request_id,
-            user_id=request.user_id,
             intent=intent_data.get("intent"),
-            confidence=confidence,
-            latency_ms=latency_ms,
-        )
-        
-        db.add(
-            AuditLog(
-                timestamp=datetime.utcnow(),
-                user_id=uuid.UUID(user_id),
-                device_id=request.device_id,
-                input_text=request.text,
-                intent=intent_data,
-                ha_response=ha_response,
-                status=IntentStatus.SUCCESS.value,
-                latency_ms=latency_ms,
-                llm_tokens=intent_data.get("token_count"),
-                request_id=request_id,
-            )
+            confidence=state.confidence,
         )
 
-        await append_session_context(
-            redis_client,
-            user_id=user_id,
-            session_id=request.session_id,
-            entry=build_context_entry("user", request.text),
-        )
-        await append_session_context(
-            redis_client,
-            user_id=user_id,
-            session_id=request.session_id,
-            entry=build_context_entry("assistant", response_text),
-        )
-        
-        return IntentResponse(
-            request_id=request_id,
-            intent=intent_data.get("intent", "unknown"),
-            entity_id=intent_data.get("target", {}).get("name"),
-            response=response_text,
-            status=IntentStatus.SUCCESS.value,
-            confidence=confidence,
-            latency_ms=latency_ms,
+def expected_ha_result(state: IntentState) -> Dict[str, Any]:
+    """The HA result of a successful execution, as far as it is known in advance"""
+    target = state.intent_data.get("target") or {}
+    ha_result = {
+        "success": True,
+        "entity_id": state.entity_id or "unknown"
+    }
+    entity_id = target.get("entity_id")
+    entity = None
+    if entity_id and state.entity_index is not None:
+        entity = state.entity_index.get(entity_id)
+    if entity is not None:
+        ha_result["friendly_name"] = entity.get("name")
+    return ha_result
+
+async def _execute(state: IntentState) -> None:
+    """Stage ha_exec: execute the intent on the user's HA instance, unless it must ask back first"""
+    if state.clarification is not None:
+        logger.info(
+            "intent_needs_clarification",
+            request_id=state.request_id,
+            intent=state.intent_data.get("intent"),
+            reason=state.clarification,
+            confidence=state.confidence,
         )
-        
-    except HTTPException:
-        raise
+        state.ha_response = {"success": False, "clarify": state.clarification}
+        return
+    state.ha_response = await execute_intent(
+        state.ha_instance,
+        state.intent_data,
+        state.entity_index,
+        expected=expected_ha_result(state),
+    )
+
+async def _render_draft(state: IntentState) -> None:
+    """Stage render_draft: render the response for a successful execution while HA runs"""
+    if reads_state(state.intent_data) or state.clarification is not None:
+        return
+    expected = expected_ha_result(state)
+    try:
+        text = await response_renderer.render(state.intent_data, expected, state.request.text)
     except Exception as e:
-        latency_ms = int((time.time() - start_time) * 1000)
-        logger.error(
-            "intent_error",
-            request_id=request_id,
-            user_id=request.user_id,
-            error=str(e),
-            latency_ms=latency_ms,
-        )
-        
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to process intent"
+        # Only an optimization: the render stage renders again
+        logger.warning("response_draft_failed", request_id=state.request_id, error=str(e))
+        return
+    state.draft = (expected, text)
+
+async def _render(state: IntentState) -> None:
+    """Stage render: keep the draft if HA answered as expected, else render the actual result"""
+    if state.draft is not None and renders_alike(state.draft[0], state.ha_response):
+        state.set_response_text(state.draft[1])
+        return
+    # Templates; LLM only if opted in and no template fits
+    state.set_response_text(
+        await response_renderer.render(state.intent_data, state.ha_response, state.request.text)
+    )
+
+async def _write_audit(state: IntentState) -> None:
+    """Stage audit: audit row (runs alongside session_write)"""
+    request = state.request
+    llm_usage = state.llm_usage
+    row = dict(
+        timestamp=datetime.utcnow(),
+        user_id=uuid.UUID(state.user_id),
+        device_id=request.device_id,
+        input_text=request.text,
+        intent=state.intent_data,
+        ha_response=state.ha_response,
+        status=state.status.value,
+        latency_ms=state.latency_ms,
+        llm_tokens=llm_usage.get("total_tokens"),
+        llm_prompt_tokens=llm_usage.get("prompt_tokens"),
+        llm_completion_tokens=llm_usage.get("completion_tokens"),
+        llm_prompt_eval_ms=llm_usage.get("prompt_eval_ms"),
+        llm_eval_ms=llm_usage.get("eval_ms"),
+        llm_load_ms=llm_usage.get("load_ms"),
+        # Stages up to the response; audit and session_write are still running
+        stage_timings_ms=state.stage_ms(),
+        error_message=state.ha_response.get("error"),
+        request_id=state.request_id,
+    )
+    if settings.audit_async_enabled:
+        # Written in bulk by the background writer, off the request path
+        audit_writer.submit(row)
+        return
+    state.db.add(AuditLog(**row))
+    if state.commit_audit:
+        await state.db.commit()
+
+async def _write_session(state: IntentState) -> None:
+    """Stage session_write: both turns (and context tokens) in one Redis pipeline"""
+    request = state.request
+    sessions = state.sessions
+    await sessions.append(
+        state.user_id, request.session_id, build_context_entry("user", request.text)
+    )
+    updated_context = await sessions.append(
+        state.user_id,
+        request.session_id,
+        build_context_entry("assistant", state.response_text),
+    )
+    if state.new_llm_context:
+        sessions.set_llm_context(
+            state.user_id,
+            request.session_id,
+            tokens=state.new_llm_context,
+            fingerprint=llm_context_fingerprint(ollama_service.model, updated_context),
         )
+    if state.flush_sessions:
+        await sessions.flush()
+
+# Pipeline stages; each starts as soon as the stages it depends on are done
+RECOGNITION_STAGES = [
+    Stage("auth", _authorize),
+    Stage("session_load", _load_session, ("auth",)),
+    Stage("entity_index", _load_entity_index, ("auth",)),
+    Stage("llm", _recognize, ("session_load", "entity_index")),
+]
+EXECUTION_STAGES = [
+    Stage("ha_exec", _execute, ("llm",)),
+]
+COMPLETION_STAGES = [
+    Stage("audit", _write_audit, ("render",)),
+    Stage("session_write", _write_session, ("render",)),
+]
+
+INTENT_PIPELINE = StageGraph(
+    RECOGNITION_STAGES
+    + EXECUTION_STAGES
+    + [
+        Stage("render_draft", _render_draft, ("llm",)),
+        Stage("render", _render, ("ha_exec", "render_draft")),
+    ]
+    + COMPLETION_STAGES
+)
+# Parts of the pipeline, for the streaming endpoint which renders in between
+RECOGNITION_PIPELINE = StageGraph(RECOGNITION_STAGES)
+EXECUTION_PIPELINE = StageGraph(EXECUTION_STAGES)
+COMPLETION_PIPELINE = StageGraph(COMPLETION_STAGES)
 
-@router.post("/intent/batch")
+@router.post("/intent/batch", response_model=BatchIntentResponse)
 async def process_intent_batch(
-    requests: list[IntentRequest],
+    requests: List[IntentRequest],
     authorization: str = Header(None),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
 ):
-    """Batch intent processing"""
-    responses = []
-    for req in requests:
-        single = await process_intent(req, authorization=authorization)
-        responses.append(single)
-    return responses
+    """
+    Batch intent processing (e.g. offline commands replayed by an edge device)
+    
+    The token is validated and the user's entities are loaded once. Items
+    run concurrently, at most ``intent_batch_concurrency`` at a time and
+    at BATCH priority so live voice commands keep precedence for LLM
+    slots. Items of one session run in order, since each turn is context
+    for the next. Session writes go to Redis in one pipeline at the end.
+    
+    Returns:
+        One result per item, in request order, each with its own status code
+    """
+    batch_id = str(uuid.uuid4())
+    start_time = time.time()
+    if len(requests) > settings.intent_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.intent_batch_max_items} items per batch"
+        )
+    
+    user_id = authenticate(authorization, batch_id)
+    ha_instance = await load_instance(db, user_id)
+    entity_index = await entity_index_cache.get_index(ha_instance)
+    sessions = SessionWriteBuffer(redis_client)
+    semaphore = asyncio.Semaphore(settings.intent_batch_concurrency)
+    results: List[Optional[BatchItemResult]] = [None] * len(requests)
+    
+    chains: Dict[Tuple[str, Any], List[int]] = {}
+    for index, item in enumerate(requests):
+        chain_key = ("session", item.session_id) if item.session_id else ("item", index)
+        chains.setdefault(chain_key, []).append(index)
+    
+    async def run_chain(indexes: List[int]) -> None:
+        async with semaphore:
+            for index in indexes:
+                state = IntentState(
+                    requests[index],
+                    db=db,
+                    redis_client=redis_client,
+                    sessions=sessions,
+                    user_id=user_id,
+                    ha_instance=ha_instance,
+                    entity_index=entity_index,
+                    priority=RequestPriority.BATCH,
+                    flush_sessions=False,
+                )
+                try:
+                    response = await run_intent(state)
+                    results[index] = BatchItemResult(
+                        index=index, status_code=status.HTTP_200_OK, result=response
+                    )
+                except HTTPException as e:
+                    results[index] = BatchItemResult(
+                        index=index, status_code=e.status_code, error=str(e.detail)
+                    )
+    
+    await asyncio.gather(*(run_chain(indexes) for indexes in chains.values()))
+    await sessions.flush()
+    
+    latency_ms = int((time.time() - start_time) * 1000)
+    logger.info(
+        "intent_batch_processed",
+        batch_id=batch_id,
+        user_id=user_id,
+        items=len(requests),
+        failed=sum(1 for result in results if result.status_code != status.HTTP_200_OK),
+        latency_ms=latency_ms,
+    )
+    return BatchIntentResponse(results=results, latency_ms=latency_ms)
@@ -0,0 +1,255 @@
+"""
+Persistent WebSocket channel for edge devices
+
+One connection per satellite: the token is checked once, then intent
+messages are multiplexed over the socket with client-chosen correlation
+IDs, skipping per-command HTTP parsing, token decoding and middleware.
+
+Protocol (JSON text frames):
+- client -> server
+  - {"type": "auth", "token": "..."}: first message, unless the upgrade
+    request carried an ``Authorization: Bearer`` header; may be repeated
+    with a fresh token (same user) to extend the connection
+  - {"type": "intent", "id": "...", "user_id", "device_id", "text", "session_id"}
+  - {"type": "ping"} / {"type": "pong"}
+- server -> client
+  - {"type": "ready", "user_id": "..."}
+  - {"type": "result", "id": "...", "result": {IntentResponse}}
+  - {"type": "error", "id": "...", "status_code": 422, "detail": "..."}
+  - {"type": "ping"} every WS_HEARTBEAT_SECONDS / {"type": "pong"}
+
+At most WS_MAX_IN_FLIGHT intents run per connection; beyond that the
+server stops reading, so a flooding client is held back by TCP flow
+control instead of growing a queue here.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple
+
+import redis.asyncio as redis
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.prometheus_metrics import record_ws_connection, record_ws_message
+from app.redis_client import get_redis
+from app.routes.intent import IntentRequest, IntentState, run_intent
+from app.security import verify_token
+from app.session_store import SessionWriteBuffer
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+
+class _AuthFailed(Exception):
+    pass
+
+
+def _verify(token: Optional[str]) -> Tuple[str, float]:
+    """User ID and expiry (epoch seconds) of an access token"""
+    if not token:
+        raise _AuthFailed("Missing token")
+    try:
+        payload = verify_token(token)
+    except HTTPException as e:
+        raise _AuthFailed(str(e.detail))
+    if payload.get("sub") is None:
+        raise _AuthFailed("Token missing user ID")
+    return payload["sub"], float(payload["exp"])
+
+
+class _Connection:
+    """State of one authenticated socket"""
+
+    def __init__(
+        self, websocket: WebSocket, redis_client: redis.Redis, user_id: str, expires_at: float
+    ):
+        self.websocket = websocket
+        self.redis_client = redis_client
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.last_seen = time.monotonic()
+        self.slots = asyncio.Semaphore(settings.ws_max_in_flight)
+        self.tasks: Set[asyncio.Task] = set()
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.tasks)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send one frame; dropped if the socket is already closed"""
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(json.dumps(message, ensure_ascii=False))
+            except (WebSocketDisconnect, RuntimeError) as e:
+                logger.info(
+                    "ws_send_dropped",
+                    user_id=self.user_id,
+                    type=message.get("type"),
+                    error=str(e),
+                )
+
+    async def send_error(self, correlation_id: Any, status_code: int, detail: Any) -> None:
+        record_ws_message("error")
+        await self.send({
+            "type": "error",
+            "id": correlation_id,
+            "status_code": status_code,
+            "detail": detail,
+        })
+
+    async def handle_intent(self, message: Dict[str, Any]) -> None:
+        """Run one intent message and push its result (releases its slot)"""
+        correlation_id = message.get("id")
+        try:
+            fields = {key: value for key, value in message.items() if key not in ("type", "id")}
+            try:
+                request = IntentRequest(**fields)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors()[0]["msg"]
+                )
+
+            # Own DB session per message: an AsyncSession must not be shared by concurrent tasks
+            async with AsyncSessionLocal() as db:
+                state = IntentState(
+                    request,
+                    db=db,
+                    redis_client=self.redis_client,
+                    sessions=SessionWriteBuffer(self.redis_client),
+                    user_id=self.user_id,
+                    commit_audit=True,
+                )
+                response = await run_intent(state)
+            record_ws_message("result")
+            await self.send(
+                {"type": "result", "id": correlation_id, "result": response.model_dump()}
+            )
+        except HTTPException as e:
+            await self.send_error(correlation_id, e.status_code, e.detail)
+        except Exception as e:
+            logger.error("ws_intent_failed", user_id=self.user_id, error=str(e))
+            await self.send_error(
+                correlation_id, status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to process intent"
+            )
+        finally:
+            self.slots.release()
+
+    async def heartbeat(self) -> None:
+        """Ping the client; close idle connections and ones whose token expired"""
+        while True:
+            await asyncio.sleep(settings.ws_heartbeat_seconds)
+            if time.time() >= self.expires_at:
+                await self.websocket.close(
+                    code=status.WS_1008_POLICY_VIOLATION, reason="Token expired"
+                )
+                return
+            # A connection busy with intents is not idle, even if reading is paused
+            idle = time.monotonic() - self.last_seen
+            if not self.in_flight and idle > settings.ws_idle_timeout_seconds:
+                await self.websocket.close(code=status.WS_1001_GOING_AWAY, reason="Idle timeout")
+                return
+            await self.send({"type": "ping"})
+
+
+async def _authenticate(websocket: WebSocket) -> Tuple[str, float]:
+    """Authenticate from the upgrade header, else from the first message"""
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        return _verify(authorization.split(" ", 1)[1])
+
+    try:
+        raw = await asyncio.wait_for(
+            websocket.receive_text(), timeout=settings.ws_auth_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        raise _AuthFailed("No auth message")
+    try:
+        message = json.loads(raw)
+    except json.JSONDecodeError:
+        raise _AuthFailed("Invalid auth message")
+    if not isinstance(message, dict) or message.get("type") != "auth":
+        raise _AuthFailed("First message must be auth")
+    return _verify(message.get("token"))
+
+
+@router.websocket("/intent/ws")
+async def intent_websocket(
+    websocket: WebSocket,
+    redis_client: redis.Redis = Depends(get_redis),
+):
+    """Intent processing over a persistent WebSocket (see the module docstring)"""
+    connection_id = str(uuid.uuid4())
+    await websocket.accept()
+    try:
+        user_id, expires_at = await _authenticate(websocket)
+    except _AuthFailed as e:
+        logger.warning("ws_auth_failed", connection_id=connection_id, error=str(e))
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+        return
+    except WebSocketDisconnect:
+        return
+
+    conn = _Connection(websocket, redis_client, user_id, expires_at)
+    record_ws_connection(1)
+    logger.info("ws_connected", connection_id=connection_id, user_id=user_id)
+    heartbeat = asyncio.create_task(conn.heartbeat())
+    try:
+        await conn.send({"type": "ready", "user_id": user_id})
+        while True:
+            # Backpressure: with all slots taken, stop reading until one frees up
+            await conn.slots.acquire()
+            try:
+                raw = await websocket.receive_text()
+            except BaseException:
+                conn.slots.release()
+                raise
+            conn.last_seen = time.monotonic()
+
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                message = None
+            kind = message.get("type") if isinstance(message, dict) else None
+            record_ws_message(kind or "invalid")
+
+            if kind == "intent":
+                task = asyncio.create_task(conn.handle_intent(message))
+                conn.tasks.add(task)
+                task.add_done_callback(conn.tasks.discard)
+                continue
+            conn.slots.release()
+
+            if kind == "ping":
+                await conn.send({"type": "pong"})
+            elif kind == "pong":
+                pass
+            elif kind == "auth":
+                try:
+                    renewed_user_id, renewed_expires_at = _verify(message.get("token"))
+                    if renewed_user_id != user_id:
+                        raise _AuthFailed("User ID mismatch")
+                except _AuthFailed as e:
+                    await conn.send_error(message.get("id"), status.HTTP_401_UNAUTHORIZED, str(e))
+                else:
+                    conn.expires_at = renewed_expires_at
+                    await conn.send({"type": "ready", "user_id": user_id})
+            else:
+                correlation_id = message.get("id") if isinstance(message, dict) else None
+                await conn.send_error(
+                    correlation_id, status.HTTP_400_BAD_REQUEST, "Unknown message type"
+                )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeat.cancel()
+        for task in list(conn.tasks):
+            task.cancel()
+        record_ws_connection(-1)
+        logger.info("ws_disconnected", connection_id=connection_id, user_id=user_id)
@@ -2,6 +2,7 @@
 Session context storage in Redis
 """
 
+import hashlib
 import json
 from datetime import datetime
 from typing import Any, Dict, List, Optional
@@ -9,8 +10,12 @@ from typing import Any, Dict, List, Optional
 import redis.asyncio as redis
 
 from app.config import settings
+from app.context_budget import compact_history, estimate_tokens
+from app.intent_cache import hash_context
+from app.prompt_builder import PROMPT_VERSION
 
 SESSION_PREFIX = "session_context:"
+LLM_CONTEXT_PREFIX = "session_llm_context:"
 
 
 def _build_session_key(user_id: str, session_id: Optional[str]) -> str:
@@ -19,14 +24,13 @@ def _build_session_key(user_id: str, session_id: Optional[str]) -> str:
     return f"{SESSION_PREFIX}{user_id}"
 
 
-async def get_session_context(
-    client: redis.Redis,
-    user_id: str,
-    session_id: Optional[str],
-) -> List[Dict[str, Any]]:
-    """Load session context for a user/session"""
-    key = _build_session_key(user_id, session_id)
-    raw = await client.get(key)
+def _build_llm_context_key(user_id: str, session_id: Optional[str]) -> str:
+    if session_id:
+        return f"{LLM_CONTEXT_PREFIX}{user_id}:{session_id}"
+    return f"{LLM_CONTEXT_PREFIX}{user_id}"
+
+
+def _parse_session_context(raw: Optional[str]) -> List[Dict[str, Any]]:
     if not raw:
         return []
     try:
@@ -38,25 +42,137 @@ async def get_session_context(
     return []
 
 
-async def append_session_context(
-    client: redis.Redis,
-    user_id: str,
-    session_id: Optional[str],
-    entry: Dict[str, Any],
-) -> List[Dict[str, Any]]:
-    """Append an entry and trim to configured context window"""
-    key = _build_session_key(user_id, session_id)
-    context = await get_session_context(client, user_id, session_id)
-    context.append(entry)
-    trimmed = context[-settings.llm_context_window :]
-    await client.set(key, json.dumps(trimmed), ex=settings.session_ttl_seconds)
-    return trimmed
+def _compact(context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return compact_history(
+        context,
+        budget_tokens=settings.llm_history_token_budget,
+        summary_max_tokens=settings.llm_history_summary_max_tokens,
+        max_entries=settings.llm_context_window,
+    )
 
 
 def build_context_entry(role: str, content: str) -> Dict[str, Any]:
-    """Build a standardized context entry"""
+    """Build a standardized context entry (with its token estimate)"""
     return {
         "role": role,
         "content": content,
         "timestamp": datetime.utcnow().isoformat(),
+        "tokens": estimate_tokens(content),
     }
+
+
+def llm_context_fingerprint(
+    model: str,
+    session_context: List[Dict[str, Any]],
+    ha_context: Optional[str] = None,
+) -> str:
+    """Fingerprint of everything a stored Ollama context must agree with"""
+    raw = f"{PROMPT_VERSION}\x00{model}\x00{hash_context(session_context, ha_context)}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _parse_llm_context(raw: Optional[str], fingerprint: str) -> Optional[List[int]]:
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+        return None
+    tokens = data.get("tokens")
+    if not isinstance(tokens, list) or len(tokens) > settings.llm_context_max_tokens:
+        return None
+    return tokens
+
+
+class SessionWriteBuffer:
+    """
+    Session reads and writes of one request or batch
+
+    Session history and Ollama context tokens are read from Redis once,
+    then kept and updated in memory, so consecutive turns of a session in
+    a batch see each other. ``flush`` writes everything in one pipeline.
+    """
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self._contexts: Dict[str, List[Dict[str, Any]]] = {}
+        self._llm_contexts: Dict[str, Optional[str]] = {}
+        self._dirty: Dict[str, str] = {}
+
+    async def load(
+        self, user_id: str, session_id: Optional[str], llm_context: bool = False
+    ) -> None:
+        """
+        Read the session history, and optionally its context tokens, in one round trip
+
+        Keys already buffered are skipped; later getters are served from memory.
+        """
+        session_key = _build_session_key(user_id, session_id)
+        keys = [session_key] if session_key not in self._contexts else []
+        llm_key = _build_llm_context_key(user_id, session_id)
+        if llm_context and llm_key not in self._llm_contexts:
+            keys.append(llm_key)
+        if not keys:
+            return
+        for key, value in zip(keys, await self.client.mget(keys)):
+            if key == session_key:
+                self._contexts.setdefault(key, _parse_session_context(value))
+            else:
+                self._llm_contexts.setdefault(key, value)
+
+    async def get_session_context(
+        self, user_id: str, session_id: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Session history (a copy; use append to change it)"""
+        key = _build_session_key(user_id, session_id)
+        if key not in self._contexts:
+            context = _parse_session_context(await self.client.get(key))
+            # A concurrent reader may have loaded (and appended to) it meanwhile
+            self._contexts.setdefault(key, context)
+        return list(self._contexts[key])
+
+    async def append(
+        self, user_id: str, session_id: Optional[str], entry: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Append an entry, compacting turns over budget into a summary; written on flush"""
+        key = _build_session_key(user_id, session_id)
+        context = await self.get_session_context(user_id, session_id)
+        context.append(entry)
+        self._contexts[key] = _compact(context)
+        self._dirty[key] = json.dumps(self._contexts[key], ensure_ascii=False)
+        return list(self._contexts[key])
+
+    async def get_llm_context(
+        self, user_id: str, session_id: Optional[str], fingerprint: str
+    ) -> Optional[List[int]]:
+        """
+        Ollama context tokens of the session
+
+        Returns None (forcing a full prompt rebuild) if nothing is stored, the
+        entry expired, it no longer matches the session history/prompt/model,
+        or it grew past the configured token limit.
+        """
+        key = _build_llm_context_key(user_id, session_id)
+        if key not in self._llm_contexts:
+            self._llm_contexts.setdefault(key, await self.client.get(key))
+        return _parse_llm_context(self._llm_contexts[key], fingerprint)
+
+    def set_llm_context(
+        self, user_id: str, session_id: Optional[str], tokens: List[int], fingerprint: str
+    ) -> None:
+        """Store Ollama context tokens next to the session, with the same TTL; written on flush"""
+        key = _build_llm_context_key(user_id, session_id)
+        value = json.dumps({"fingerprint": fingerprint, "tokens": tokens})
+        self._llm_contexts[key] = self._dirty[key] = value
+
+    async def flush(self) -> None:
+        """Write all changed keys in one Redis round trip"""
+        if not self._dirty:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in self._dirty.items():
+            pipe.set(key, value, ex=settings.session_ttl_seconds)
+        await pipe.execute()
+        self._dirty.clear()
@@ -0,0 +1,176 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+from app.intent_cache import hash_context, normalize_utterance
+from app.prometheus_metrics import record_single_flight
+
+logger = structlog.get_logger()
+
+SINGLE_FLIGHT_LOCK_PREFIX = "single_flight_lock:"
+SINGLE_FLIGHT_RESULT_PREFIX = "single_flight_result:"
+
+# Keys that belong to the caller that ran the call and must not be shared
+_PRIVATE_KEYS = ("llm_context", "llm_usage")
+
+
+def build_flight_key(
+    user_id: str,
+    text: str,
+    session_context: Optional[List[Dict[str, Any]]] = None,
+    ha_context: Optional[str] = None,
+) -> str:
+    """Build the coalescing key from user, normalized text and context hash"""
+    raw = f"{user_id}\x00{normalize_utterance(text)}\x00{hash_context(session_context, ha_context)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _shared_copy(result: Dict[str, Any]) -> Dict[str, Any]:
+    shared = copy.deepcopy(result)
+    for key in _PRIVATE_KEYS:
+        shared.pop(key, None)
+    return shared
+
+
+class SingleFlight:
+    """
+    Run at most one LLM call per key at a time
+
+    Within a worker, concurrent callers with the same key await the same
+    future. Across workers and replicas, the first caller takes a short
+    Redis lock and publishes its result under a result key with a short
+    TTL; the others poll for that result instead of calling the LLM. If
+    the leader fails or its lock expires without a result, waiting callers
+    run the call themselves. Redis errors degrade to no coalescing.
+    """
+
+    def __init__(
+        self, lock_ttl_seconds: int, result_ttl_seconds: int, poll_interval_seconds: float
+    ):
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    async def do(
+        self,
+        client: redis.Redis,
+        key: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Run fn once per key, sharing the result with concurrent duplicates
+
+        Args:
+            client: Redis client used for cross-worker coordination
+            key: Key from build_flight_key()
+            fn: Coroutine factory performing the actual call
+
+        Returns:
+            The result of fn; followers receive a copy without private keys
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            record_single_flight("local_follower")
+            return _shared_copy(await asyncio.shield(future))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run_distributed(client, key, fn)
+            # Followers copy from a snapshot, so the caller may mutate its own result
+            future.set_result(_shared_copy(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception without followers is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_distributed(
+        self,
+        client: redis.Redis,
+        key: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        lock_key = f"{SINGLE_FLIGHT_LOCK_PREFIX}{key}"
+        result_key = f"{SINGLE_FLIGHT_RESULT_PREFIX}{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await client.set(lock_key, token, nx=True, ex=self.lock_ttl_seconds)
+        except Exception as e:
+            logger.warning("single_flight_lock_failed", error=str(e))
+            record_single_flight("leader")
+            return await fn()
+
+        if not acquired:
+            shared = await self._wait_for_result(client, lock_key, result_key)
+            if shared is not None:
+                record_single_flight("remote_follower")
+                return shared
+            # Leader failed or timed out; do the work ourselves
+
+        record_single_flight("leader")
+        try:
+            result = await fn()
+            try:
+                await client.set(
+                    result_key,
+                    json.dumps(_shared_copy(result), ensure_ascii=False),
+                    ex=self.result_ttl_seconds,
+                )
+            except Exception as e:
+                logger.warning("single_flight_publish_failed", error=str(e))
+            return result
+        finally:
+            if acquired:
+                try:
+                    if await client.get(lock_key) == token:
+                        await client.delete(lock_key)
+                except Exception as e:
+                    logger.warning("single_flight_unlock_failed", error=str(e))
+
+    async def _wait_for_result(
+        self,
+        client: redis.Redis,
+        lock_key: str,
+        result_key: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Poll for the leader's result until it appears or the lock disappears"""
+        deadline = time.monotonic() + self.lock_ttl_seconds
+        try:
+            while time.monotonic() < deadline:
+                raw = await client.get(result_key)
+                if raw is not None:
+                    return json.loads(raw)
+                if await client.get(lock_key) is None:
+                    # Lock released: pick up a result published just before release
+                    raw = await client.get(result_key)
+                    return json.loads(raw) if raw is not None else None
+                await asyncio.sleep(self.poll_interval_seconds)
+        except Exception as e:
+            logger.warning("single_flight_wait_failed", error=str(e))
+        return None
+
+
+# Singleton instance
+single_flight = SingleFlight(
+    lock_ttl_seconds=settings.single_flight_lock_ttl_seconds,
+    result_ttl_seconds=settings.single_flight_result_ttl_seconds,
+    poll_interval_seconds=settings.single_flight_poll_interval_ms / 1000,
+)
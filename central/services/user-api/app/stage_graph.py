@@ -0,0 +1,67 @@
+"""
+Minimal dependency graph runner for request pipelines
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Tuple
+
+
+class Stage(NamedTuple):
+    """One unit of pipeline work"""
+    name: str
+    run: Callable[[Any], Awaitable[None]]  # Reads and writes the shared state
+    depends: Tuple[str, ...] = ()
+
+
+class StageGraph:
+    """
+    Run stages concurrently, each as soon as its dependencies are done
+
+    Stages exchange data through one shared state object, which must have
+    a ``timings`` dict; each stage's wall time (seconds) is stored there
+    under its name. Dependencies on stages outside the graph count as
+    already satisfied, so a pipeline can be run in parts.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate stage name")
+        seen = set()
+        for stage in stages:
+            # Listing order must be a topological order (this also rules out cycles)
+            missing = [dep for dep in stage.depends if dep in names and dep not in seen]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on later stages {missing}")
+            seen.add(stage.name)
+        self.stages = stages
+
+    async def run(self, state: Any) -> None:
+        """
+        Run the graph to completion
+
+        Raises:
+            Exception: The first stage failure; all other stages are cancelled
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> None:
+            deps = [tasks[dep] for dep in stage.depends if dep in tasks]
+            if deps:
+                await asyncio.gather(*deps)
+            start_time = time.perf_counter()
+            try:
+                await stage.run(state)
+            finally:
+                state.timings[stage.name] = time.perf_counter() - start_time
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
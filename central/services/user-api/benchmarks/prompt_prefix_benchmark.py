@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Ollama prompt evaluation time, legacy vs prefix-stable prompt layout
+
+Both layouts put the session history first, then the entity context,
+then the command. They differ in how the request is sent:
+
+- legacy: the system prompt is inlined into one ``raw`` prompt rendered
+  with a hand-written Ministral template, and the history is a sliding
+  window of the last 5 messages, so once it is full its start shifts
+  every turn;
+- current (app/prompt_builder.py): the system prompt goes in Ollama's
+  ``system`` field and the model's own template is applied server-side,
+  the history is selected by token budget and grows append-only within it,
+  and ``keep_alive`` is sent with every request.
+
+The prompt_eval gain of the current layout has not been measured yet;
+run this against a live Ollama to get the numbers.
+
+Usage (from central/services/user-api):
+    python benchmarks/prompt_prefix_benchmark.py --base-url http://localhost:11434 --rounds 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.prompt_builder import SYSTEM_PROMPT, build_intent_prompt  # noqa: E402
+
+# Message-count window of the legacy layout
+LEGACY_CONTEXT_TURNS = 5
+
+HA_CONTEXT = "\n".join([
+    "light.nappali_lampa | Nappali lámpa | nappali",
+    "light.konyha_mennyezet | Konyha mennyezeti lámpa | konyha",
+    "switch.kavefozo | Kávéfőző | konyha",
+    "climate.nappali_termosztat | Nappali termosztát | nappali",
+    "cover.haloszoba_redony | Hálószoba redőny | hálószoba",
+])
+
+UTTERANCES = [
+    "kapcsold fel a nappali lámpát",
+    "és a konyhában is",
+    "mennyi most a hőmérséklet?",
+    "húzd fel a redőnyt a hálószobában",
+    "kapcsold ki a kávéfőzőt",
+    "legyen melegebb egy kicsit",
+]
+
+
+def legacy_prompt(user_text, ha_context, session_context):
+    """Prompt layout before the prefix-stable builder (raw template, 5-message window)"""
+    parts = [f"[SYSTEM_PROMPT]{SYSTEM_PROMPT}[/SYSTEM_PROMPT]"]
+    for msg in session_context[-LEGACY_CONTEXT_TURNS:]:
+        if msg["role"] == "user":
+            parts.append(f"[INST]{msg['content']}[/INST]")
+        else:
+            parts.append(msg["content"])
+    parts.append(f"[INST]Available Home Assistant entities:\n{ha_context}[/INST]")
+    parts.append(f"[INST]{user_text}[/INST]")
+    return "\n".join(parts)
+
+
+def run(client, model, layout, rounds, keep_alive):
+    """Replay the conversation and collect prompt_eval stats per request"""
+    durations_ms = []
+    counts = []
+    for _ in range(rounds):
+        history = []
+        for text in UTTERANCES:
+            if layout == "legacy":
+                payload = {"prompt": legacy_prompt(text, HA_CONTEXT, history), "raw": True}
+            else:
+                prompt = build_intent_prompt(text, HA_CONTEXT, history)
+                payload = {
+                    "system": prompt.system,
+                    "prompt": prompt.prompt,
+                    "keep_alive": keep_alive,
+                }
+            payload.update({
+                "model": model,
+                "stream": False,
+                "options": {"temperature": 0.15, "num_predict": 1},
+            })
+            data = client.post("/api/generate", json=payload).json()
+            durations_ms.append(data.get("prompt_eval_duration", 0) / 1e6)
+            counts.append(data.get("prompt_eval_count", 0))
+            history.append({"role": "user", "content": text})
+            history.append({"role": "assistant", "content": "Rendben."})
+    return durations_ms, counts
+
+
+def summarize(name, durations_ms, counts):
+    ordered = sorted(durations_ms)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{name:<8} requests={len(durations_ms):<4} "
+        f"prompt_eval_ms mean={statistics.mean(durations_ms):8.1f} "
+        f"p50={statistics.median(durations_ms):8.1f} p95={p95:8.1f}  "
+        f"evaluated_tokens mean={statistics.mean(counts):6.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--base-url", default=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    )
+    parser.add_argument(
+        "--model", default=os.getenv("OLLAMA_MODEL", "ministral-3:3b-instruct-2512-q4_K_M")
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--keep-alive", default="30m")
+    args = parser.parse_args()
+
+    print("\n=== BENCHMARK: prompt_eval, legacy vs prefix-stable layout ===\n")
+    with httpx.Client(base_url=args.base_url, timeout=300) as client:
+        # Load the model first so neither run pays the cold start
+        client.post(
+            "/api/generate",
+            json={"model": args.model, "prompt": "", "keep_alive": args.keep_alive},
+        )
+        for layout in ("legacy", "prefix"):
+            durations_ms, counts = run(client, args.model, layout, args.rounds, args.keep_alive)
+            summarize(layout, durations_ms, counts)
+
+
+if __name__ == "__main__":
+    main()
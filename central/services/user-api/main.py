@@ -11,11 +11,15 @@ from fastapi.middleware.cors import CORSMiddleware
 import structlog
 
 # Import routes
-from app.routes import intent, auth, health, metrics
+from app.routes import intent, intent_ws, auth, health, metrics
 from app.middleware import RequestIDMiddleware, LoggingMiddleware
 from app.prometheus_metrics import PrometheusMiddleware
 from app.database import init_db, engine
 from app.config import settings
+from app.llm_service import ollama_service
+from app.model_residency import model_keeper
+from app.audit_writer import audit_writer
+from app.ha_client import ha_client_pool
 
 # Configure logging
 structlog.configure(
@@ -49,11 +53,20 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error("Failed to initialize database", error=str(e))
         raise
     
+    await ollama_service.start()
+    await model_keeper.start()
+    await audit_writer.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down...")
     try:
+        await model_keeper.close()
+        # Before the engine goes away: queued audit rows still need it
+        await audit_writer.close()
+        await ha_client_pool.close()
+        await ollama_service.close()
         await engine.dispose()
         logger.info("Application stopped")
     except Exception as e:
@@ -84,6 +97,7 @@ app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(metrics.router, prefix="/api/v1", tags=["monitoring"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(intent.router, prefix="/api/v1", tags=["intent"])
+app.include_router(intent_ws.router, prefix="/api/v1", tags=["intent"])
 
 if __name__ == "__main__":
     import uvicorn
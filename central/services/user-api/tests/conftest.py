@@ -0,0 +1,4 @@
+import os
+
+# app.config requires a JWT secret at import time
+os.environ.setdefault("JWT_SECRET", "test-secret-not-for-production")
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.constants import IntentStatus
+from app.entity_resolver import EntityResolution
+from app.response_renderer import CLARIFY_RESPONSE, render_template
+from app.routes.intent import IntentRequest, IntentState, _execute
+
+
+def make_state(intent_data, resolution=None):
+    request = IntentRequest(user_id="u1", device_id="d1", text="kapcsold fel a lámpát")
+    state = IntentState(
+        request,
+        db=None,
+        redis_client=None,
+        sessions=None,
+        user_id="u1",
+        ha_instance=None,
+        entity_index=None,
+    )
+    state.intent_data = intent_data
+    state.resolution = resolution
+    return state
+
+
+def intent(confidence, name="lámpa"):
+    target = {"type": "entity", "name": name}
+    return {"intent": "turn_on", "target": target, "confidence": confidence}
+
+
+@pytest.mark.parametrize(
+    "intent_data, resolution, reason",
+    [
+        (intent(0.0), None, "intent"),  # e.g. repaired truncated LLM output
+        (intent(0.4), EntityResolution("light.nappali", 0.9, "fuzzy"), "intent"),
+        (intent(0.9), EntityResolution(None, 0.55, "unresolved"), "target"),
+        (intent(0.9), EntityResolution("light.nappali", 0.9, "fuzzy"), None),
+        ({"intent": "unknown", "confidence": 0.0}, None, None),
+    ],
+)
+def test_clarification(intent_data, resolution, reason):
+    assert make_state(intent_data, resolution).clarification == reason
+
+
+def test_doubtful_intent_is_not_executed():
+    state = make_state(intent(0.9), EntityResolution(None, 0.55, "unresolved"))
+    asyncio.run(_execute(state))
+    assert state.ha_response == {"success": False, "clarify": "target"}
+    assert state.status == IntentStatus.NEEDS_CLARIFICATION
+    assert "lámpa" in render_template(state.intent_data, state.ha_response)
+
+
+def test_clarify_response_without_name():
+    ha_result = {"success": False, "clarify": "intent"}
+    assert render_template(intent(0.2, name=""), ha_result) == CLARIFY_RESPONSE
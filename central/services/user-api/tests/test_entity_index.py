@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app import entity_index
+from app.entity_index import EntityIndex, EntityIndexCache, query_text
+from app.ha_client import HAInstance
+
+
+def ha_entity(entity_id, name, area=None):
+    domain = entity_id.split(".")[0]
+    return {"entity_id": entity_id, "domain": domain, "name": name, "area": area, "aliases": []}
+
+
+ENTITIES = [
+    ha_entity("light.nappali_lampa", "Nappali lámpa", "Nappali"),
+    ha_entity("light.haloszoba", "Hálószoba lámpa", "Hálószoba"),
+    ha_entity("switch.kavefozo", "Kávéfőző", "Konyha"),
+    ha_entity("switch.konnektor", "Erkély konnektor", "Erkély"),
+    ha_entity("media_player.tv", "Tévé", "Nappali"),
+    ha_entity("cover.garazskapu", "Garázskapu"),
+]
+
+
+@pytest.fixture
+def index():
+    index = EntityIndex()
+    index.update(ENTITIES)
+    return index
+
+
+@pytest.mark.parametrize(
+    "text, best",
+    [
+        ("kapcsold le a tévét", "media_player.tv"),
+        ("kapcsold fel a lámpát", "light.nappali_lampa"),
+        ("kapcsold fel a hálószobai lámpát", "light.haloszoba"),
+        ("kapcsold be a kávéfőzőt", "switch.kavefozo"),
+        ("nyisd ki a garázskaput", "cover.garazskapu"),
+        ("kapcsold ki a konnektort", "switch.konnektor"),
+    ],
+)
+def test_search_ignores_command_words(index, text, best):
+    results = [entity["entity_id"] for entity in index.search(text, 3)]
+    assert results[0] == best
+
+
+def test_search_lamp_finds_no_switch(index):
+    results = [entity["entity_id"] for entity in index.search("kapcsold fel a lámpát", 8)]
+    assert results == ["light.nappali_lampa", "light.haloszoba"]
+
+
+def test_query_text():
+    assert query_text("Kapcsold le a tévét!") == "tevet"
+    assert query_text("oltsd ki a zöld lámpát") == "zold lampat"
+
+
+def test_update_is_incremental(index):
+    changed = dict(ENTITIES[4], name="Nappali tévé")
+    assert index.update(ENTITIES[:4] + [changed]) == 2  # one changed, one removed
+    assert index.get("cover.garazskapu") is None
+    assert index.get("media_player.tv")["name"] == "Nappali tévé"
+
+
+def test_first_build_wait_is_bounded(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_fetch(instance, deadline=None):
+        await release.wait()
+        return ENTITIES
+
+    monkeypatch.setattr(entity_index, "fetch_entities", slow_fetch)
+    cache = EntityIndexCache(max_users=4, refresh_seconds=300, top_k=8, build_wait_seconds=0.01)
+    instance = HAInstance("user-1", "http://ha.local:8123", "token")
+
+    async def scenario():
+        assert await cache.get_index(instance) is None
+        release.set()
+        await asyncio.sleep(0)
+        index = await cache.get_index(instance)
+        assert index is not None and len(index) == len(ENTITIES)
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+import pytest
+
+from app.entity_index import EntityIndex
+from app.entity_resolver import resolve_target
+
+
+def ha_entity(entity_id, name, area=None):
+    domain = entity_id.split(".")[0]
+    return {"entity_id": entity_id, "domain": domain, "name": name, "area": area, "aliases": []}
+
+
+ENTITIES = [
+    ha_entity("light.nappali_lampa", "Nappali lámpa", "Nappali"),
+    ha_entity("light.haloszoba_lampa", "Hálószoba lámpa", "Hálószoba"),
+    ha_entity("switch.kavefozo", "Kávéfőző", "Konyha"),
+    ha_entity("media_player.tv", "Tévé", "Nappali"),
+]
+
+
+@pytest.fixture
+def index():
+    index = EntityIndex()
+    index.update(ENTITIES)
+    return index
+
+
+@pytest.mark.parametrize(
+    "name, utterance, entity_id, method",
+    [
+        ("light.nappali_lampa", "", "light.nappali_lampa", "exact"),
+        ("nappali lámpa", "kapcsold fel a nappali lámpát", "light.nappali_lampa", "fuzzy"),
+        ("hálószoba lámpa", "kapcsold le a hálószoba lámpát", "light.haloszoba_lampa", "fuzzy"),
+        ("kávéfőző", "kapcsold be a kávéfőzőt", "switch.kavefozo", "fuzzy"),
+        ("tévé", "kapcsold le a tévét", "media_player.tv", "fuzzy"),
+        # Two lamps score alike and no area was said: ask instead of guessing
+        ("lámpa", "kapcsold fel a lámpát", None, "unresolved"),
+        ("porszívó", "indítsd el a porszívót", None, "unresolved"),
+    ],
+)
+def test_resolve_target(index, name, utterance, entity_id, method):
+    intent_data = {"intent": "turn_on", "target": {"type": "entity", "name": name}}
+    resolution = resolve_target(index, intent_data, utterance)
+    assert (resolution.entity_id, resolution.method) == (entity_id, method)
+    assert intent_data["target"].get("entity_id") == entity_id
+
+
+def test_area_target_is_left_alone(index):
+    intent_data = {"intent": "turn_on", "target": {"type": "area", "name": "nappali"}}
+    assert resolve_target(index, intent_data, "kapcsold fel a nappaliban") is None
+    assert "entity_id" not in intent_data["target"]
@@ -0,0 +1,98 @@
+import pytest
+
+from app.entity_index import EntityIndex
+from app.fallback_classifier import FALLBACK_CONFIDENCE, classify
+
+
+def ha_entity(entity_id, name, area=None):
+    domain = entity_id.split(".")[0]
+    return {"entity_id": entity_id, "domain": domain, "name": name, "area": area, "aliases": []}
+
+
+def entity(entity_id):
+    return {"type": "entity", "name": entity_id}
+
+
+NO_TARGET = {"type": "unknown", "name": ""}
+
+
+ENTITIES = [
+    ha_entity("light.nappali_lampa", "Nappali lámpa", "Nappali"),
+    ha_entity("light.haloszoba_lampa", "Hálószoba lámpa", "Hálószoba"),
+    ha_entity("switch.kavefozo", "Kávéfőző", "Konyha"),
+    ha_entity("media_player.tv", "Tévé", "Nappali"),
+    ha_entity("cover.garazskapu", "Garázskapu"),
+    ha_entity("climate.nappali", "Nappali termosztát", "Nappali"),
+]
+
+
+@pytest.fixture
+def index():
+    index = EntityIndex()
+    index.update(ENTITIES)
+    return index
+
+
+@pytest.mark.parametrize(
+    "text, intent, target, parameters",
+    [
+        ("kapcsold ki a tévét", "turn_off", entity("media_player.tv"), {}),
+        ("kapcsold le a nappali lámpát", "turn_off", entity("light.nappali_lampa"), {}),
+        ("Kapcsold be a kávéfőzőt!", "turn_on", entity("switch.kavefozo"), {}),
+        ("nyisd ki a garázskaput", "turn_on", entity("cover.garazskapu"), {}),
+        ("kapcsold át a kávéfőzőt", "toggle", entity("switch.kavefozo"), {}),
+        ("kapcsold fel a hálószobában a lámpát", "turn_on", entity("light.haloszoba_lampa"), {}),
+        ("kapcsold fel a nappaliban", "turn_on", {"type": "area", "name": "nappali"}, {}),
+        (
+            "állítsd a nappali lámpát 50 százalékra",
+            "set_brightness",
+            entity("light.nappali_lampa"),
+            {"brightness_pct": 50},
+        ),
+        ("legyen 21,5 fok", "set_temperature", NO_TARGET, {"temperature": 21.5}),
+        ("milyen állapotban van a garázskapu", "get_status", entity("cover.garazskapu"), {}),
+    ],
+)
+def test_classify(index, text, intent, target, parameters):
+    result = classify(text, index)
+    assert result["intent"] == intent
+    assert result["target"] == target
+    assert result["parameters"] == parameters
+    assert result["confidence"] == FALLBACK_CONFIDENCE
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Two lamps and no area: not clearly named
+        "kapcsold le a lámpát",
+        # Negated: never the opposite of what was asked
+        "ne kapcsold fel a lámpát",
+        "a lámpát ne kapcsold fel",
+        "ne kapcsold ki a tévét",
+        "a garázskaput nem kell kinyitni",
+        "nem kell bekapcsolni a kávéfőzőt",
+        # Two commands
+        "kapcsold fel a lámpát és kapcsold le a tévét",
+        # No such device, no target, no command
+        "kapcsold le a porszívót",
+        "kapcsold ki",
+        "mesélj egy viccet",
+    ],
+)
+def test_classify_unknown(index, text):
+    result = classify(text, index)
+    assert result["intent"] == "unknown"
+    assert result["confidence"] == 0.0
+
+
+def test_classify_without_index():
+    assert classify("kapcsold ki a tévét")["intent"] == "unknown"
+
+
+@pytest.mark.parametrize("text", ["ne kapcsold fel a lámpát", "a lámpát ne kapcsold fel"])
+def test_classify_negated_with_one_lamp(text):
+    index = EntityIndex()
+    index.update([ha_entity("light.lampa", "Lámpa")])
+    assert classify("kapcsold fel a lámpát", index)["target"] == entity("light.lampa")
+    assert classify(text, index)["intent"] == "unknown"
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import ha_client
+from app.ha_client import HAClientPool, HAInstance
+
+
+@pytest.fixture(autouse=True)
+def plain_tokens(monkeypatch):
+    monkeypatch.setattr(ha_client, "decrypt_token", lambda token: token)
+
+
+def instance(user_id, token="token"):
+    return HAInstance(user_id, f"http://{user_id}.ha.local:8123", token)
+
+
+def test_new_client_is_not_evicted_when_others_are_busy():
+    async def scenario():
+        pool = HAClientPool(max_instances=1)
+        busy = pool._client(instance("a"))
+        busy.in_flight = 1
+        entry = pool._client(instance("b"))
+        assert pool._clients["b"] is entry
+        busy.in_flight = 0
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_replaced_client_closes_after_its_last_call():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, json=[])
+
+        pool = HAClientPool(max_instances=4)
+        old = pool._client(instance("a"))
+        old.client = httpx.AsyncClient(
+            base_url=old.instance.base_url, transport=httpx.MockTransport(handler)
+        )
+        call = asyncio.create_task(
+            pool.request(instance("a"), "GET", "/api/states", "fetch_states")
+        )
+        await asyncio.sleep(0.01)
+
+        # New token while the call runs: the old client stays open until it returns
+        pool._client(instance("a", token="new-token"))
+        await asyncio.sleep(0.01)
+        assert not old.client.is_closed
+        release.set()
+        assert (await call).status_code == 200
+        await asyncio.sleep(0.01)
+        assert old.client.is_closed
+        await pool.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import pytest
+
+from app.intent_grammar import match_intent, parse_hungarian_number
+
+
+def entity(name):
+    return {"type": "entity", "name": name}
+
+
+def area(name):
+    return {"type": "area", "name": name}
+
+
+@pytest.mark.parametrize(
+    "text, intent, target, parameters",
+    [
+        ("Kapcsold fel a nappali lámpát!", "turn_on", entity("nappali lámpa"), {}),
+        ("kérlek kapcsold be a lámpát", "turn_on", entity("lámpa"), {}),
+        ("kapcsold le a tévét", "turn_off", entity("tévé"), {}),
+        ("oltsd ki a lámpát a konyhában", "turn_off", entity("konyha lámpa"), {}),
+        ("a lámpát kapcsold ki", "turn_off", entity("lámpa"), {}),
+        ("kapcsold fel a zöld lámpát", "turn_on", entity("zöld lámpa"), {}),
+        ("kapcsold át a ventilátort", "toggle", entity("ventilátor"), {}),
+        ("állítsd a lámpát 50%-ra", "set_brightness", entity("lámpa"), {"brightness_pct": 50}),
+        (
+            "állítsd a lámpát ötven százalékra",
+            "set_brightness",
+            entity("lámpa"),
+            {"brightness_pct": 50},
+        ),
+        (
+            "legyen huszonkét és fél fok a nappaliban",
+            "set_temperature",
+            area("nappali"),
+            {"temperature": 22.5},
+        ),
+        ("hány fok van a konyhában", "get_status", area("konyha"), {"attribute": "temperature"}),
+        ("milyen állapotban van a garázskapu", "get_status", entity("garázskapu"), {}),
+    ],
+)
+def test_match_intent(text, intent, target, parameters):
+    result = match_intent(text)
+    assert result is not None
+    assert result["intent"] == intent
+    assert result["target"] == target
+    assert result["parameters"] == parameters
+    assert result["confidence"] == 1.0
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Compound commands and extra clauses go to the LLM
+        "kapcsold fel a lámpát és kapcsold le a tévét",
+        "kapcsold fel a lámpát kapcsold le a tévét",
+        "kapcsold ki a tévét majd a lámpát",
+        "oltsd le a lámpát meg a tévét",
+        "kapcsold fel a lámpát 5 percre",
+        # Negation: never the opposite of what was asked
+        "a lámpát ne kapcsold fel",
+        "kapcsold fel a lámpát ne",
+        "a lámpát most ne kapcsold ki",
+        "ne kapcsold fel a lámpát",
+        # Time, deferral and other qualifiers
+        "kapcsold fel a lámpát tíz perc múlva",
+        "kapcsold fel a lámpát holnap",
+        "kapcsold ki a tévét este",
+        "kapcsold be a tévét is",
+        "kapcsold le a lámpát azonnal",
+        # Out of range or not a command
+        "állítsd a lámpát 150 százalékra",
+        "mesélj egy viccet",
+        "kapcsold fel",
+        "",
+    ],
+)
+def test_match_intent_falls_through(text):
+    assert match_intent(text) is None
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [
+        ("22", 22.0),
+        ("21,5", 21.5),
+        ("huszonketto", 22.0),
+        ("otvenre", 50.0),
+        ("huszonket es fel", 22.5),
+        ("huszonketto egesz ot", 22.5),
+        ("lampa", None),
+    ],
+)
+def test_parse_hungarian_number(text, value):
+    assert parse_hungarian_number(text) == value
@@ -0,0 +1,29 @@
+import pytest
+
+from app.intent_schema import coerce_intent
+
+
+def test_coerce_intent_drops_model_entity_id():
+    data = coerce_intent({
+        "intent": "turn_off",
+        "target": {"type": "entity", "name": "zár", "entity_id": "lock.bejarati_ajto"},
+        "action": "off",
+        "parameters": {},
+        "confidence": 0.9,
+        "response": "Rendben.",
+    })
+    assert data["target"] == {"type": "entity", "name": "zár"}
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        ({}, {"intent": "unknown", "target": {"type": "unknown", "name": ""}, "action": "unknown",
+              "parameters": {}, "confidence": 0.0, "response": None}),
+        ({"intent": "dance", "target": "light.nappali", "confidence": "1.7"},
+         {"intent": "unknown", "target": {"type": "entity", "name": "light.nappali"},
+          "action": "unknown", "parameters": {}, "confidence": 1.0, "response": None}),
+    ],
+)
+def test_coerce_intent_defaults(data, expected):
+    assert coerce_intent(data) == expected
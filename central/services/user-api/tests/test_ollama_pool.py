@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.llm_service import LLMError, ollama_service
+from app.ollama_pool import OllamaBackend
+
+
+def failing_backend(status_code):
+    backend = OllamaBackend("http://ollama.test:11434")
+    backend._client = httpx.AsyncClient(
+        base_url=backend.url,
+        transport=httpx.MockTransport(lambda request: httpx.Response(status_code)),
+    )
+    return backend
+
+
+def test_consecutive_server_errors_eject_the_backend():
+    async def scenario():
+        backend = failing_backend(500)
+        for _ in range(3):
+            with pytest.raises(LLMError):
+                await ollama_service._generate(backend, {"prompt": "szia"}, timeout=1.0)
+        assert backend.healthy is False
+        assert backend.latency_ewma is None
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_health_check_is_not_a_success():
+    async def scenario():
+        backend = failing_backend(503)
+        backend.consecutive_failures = 1
+        assert await ollama_service.check_health(backend) is False
+        assert backend.consecutive_failures == 2
+        await backend.close()
+
+    asyncio.run(scenario())